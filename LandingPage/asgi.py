@@ -2,6 +2,8 @@
 ASGI config for LandingPage project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Server-Sent Events routes (reviews/live.py) are answered here directly,
+everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LandingPage.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from reviews.live import LiveEventsApp  # noqa: E402  (needs the app registry)
+
+application = LiveEventsApp(django_application)
@@ -0,0 +1,163 @@
+"""
+Read-only serializers compiled from DRF ModelSerializers.
+
+A ModelSerializer builds a model instance per row and resolves every field
+through get_attribute()/to_representation() each time. For read-only list
+responses, CompiledSerializer does that resolution once: every output
+field becomes a getter over one values_list() row, and the rows are turned
+into dicts directly.
+
+    compiled = CompiledSerializer(ReviewSerializer(context=context))
+    data = compiled.serialize(queryset)
+
+The output is the same as serializer.data. Fields render exactly as DRF
+would, and None stays None:
+- plain columns (int, str, bool) are passed through;
+- datetimes are formatted the way DateTimeField does it;
+- files become URLs the way FileField builds them;
+- nested ModelSerializers are compiled over joined columns;
+- other fields fall back to their own to_representation().
+
+Computed fields must be described by the serializer's compile_field() hook
+(their columns and a function over them). A field that cannot be compiled
+raises NotCompilable; serialize_list() then falls back to DRF.
+"""
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# to_representation() of these is the identity for the values the database returns
+PASSTHROUGH = (
+    serializers.IntegerField.to_representation,
+    serializers.CharField.to_representation,
+    serializers.BooleanField.to_representation,
+)
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def _model_field(model, path):
+    """The model field at the end of an ORM path, following relations"""
+    field = None
+    for part in path.split('__'):
+        if field is not None:
+            if not field.is_relation:
+                return None
+            model = field.related_model
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+    return field
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        # Aware values straight from the database; same text as DateTimeField
+        value = value.astimezone(timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _file_converter(field, model_field):
+    storage = model_field.storage
+    request = field.context.get('request')
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+
+    urls = {}  # rows often share a file (e.g. the default profile picture)
+
+    def convert(name):
+        if not name:
+            return None
+        if name not in urls:
+            url = storage.url(name)
+            urls[name] = request.build_absolute_uri(url) if request is not None else url
+        return urls[name]
+    return convert
+
+
+class CompiledSerializer:
+    """Row-to-dict plan for a (bound, read-only) ModelSerializer instance"""
+
+    def __init__(self, serializer):
+        self.columns = []
+        self.getters = self._compile(serializer, '')
+
+    def _column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return self.columns.index(path)
+
+    def _compile(self, serializer, prefix):
+        return [
+            (name, self._getter(serializer, name, field, prefix))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+
+    def _getter(self, serializer, name, field, prefix):
+        hook = getattr(serializer, 'compile_field', None)
+        compiled = hook(name) if hook else None
+        if compiled is not None:
+            columns, function = compiled
+            indexes = [self._column(prefix + column) for column in columns]
+            return lambda row: function(*[row[index] for index in indexes])
+
+        if field.source == '*' or isinstance(field, (serializers.SerializerMethodField,
+                                                     serializers.ListSerializer)):
+            raise NotCompilable(name)
+
+        path = prefix + field.source.replace('.', '__')
+        model = serializer.Meta.model if hasattr(serializer, 'Meta') else None
+        model_field = _model_field(model, path[len(prefix):]) if model else None
+        if model_field is None or not model_field.concrete:
+            raise NotCompilable(name)
+
+        if isinstance(field, serializers.ModelSerializer):
+            # The foreign key tells a missing relation from one with empty columns
+            key = self._column(path)
+            nested = self._compile(field, path + '__')
+            return lambda row: None if row[key] is None else {
+                nested_name: get(row) for nested_name, get in nested
+            }
+
+        index = self._column(path)
+        if type(field).to_representation in PASSTHROUGH:
+            return itemgetter(index)
+        if isinstance(field, serializers.FileField):
+            convert = _file_converter(field, model_field)
+        elif isinstance(field, serializers.DateTimeField):
+            convert = _datetime_converter(field)
+        else:
+            convert = field.to_representation
+
+        def getter(row):
+            value = row[index]
+            return None if value is None else convert(value)
+        return getter
+
+    def serialize(self, queryset):
+        getters = self.getters
+        return [
+            {name: get(row) for name, get in getters}
+            for row in queryset.values_list(*self.columns)
+        ]
+
+
+def serialize_list(serializer_class, queryset, context):
+    """serializer_class(queryset, many=True).data, compiled when the fields allow it"""
+    try:
+        compiled = CompiledSerializer(serializer_class(context=context))
+    except NotCompilable:
+        return serializer_class(queryset, many=True, context=context).data
+    return compiled.serialize(queryset)
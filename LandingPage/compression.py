@@ -0,0 +1,268 @@
+"""
+Response compression: brotli, zstd or gzip, whichever the client accepts
+and the server has (brotli and zstandard are optional; gzip is always there).
+
+CompressionMiddleware replaces django.middleware.gzip.GZipMiddleware:
+- bodies under MIN_SIZE and types that do not compress (images, archives,
+  event streams) are left alone;
+- StreamingHttpResponse bodies are compressed chunk by chunk, flushing after
+  each one so NDJSON/progress streams still arrive as they are produced;
+- responses that already carry a Content-Encoding pass through untouched.
+
+Compression is per request. For hot payloads cache_compressed() keeps the
+rendered, compressed bytes of a DRF view in the Django cache, one entry per
+representation (renderer, encoding, host), and serves them without
+rendering or compressing again. Cached entries are compressed once, so they
+use the slower CACHED_LEVELS. The view's key function decides when entries
+go stale, typically by embedding a version that changes with the data.
+
+Placed below django.middleware.cache.UpdateCacheMiddleware, the middleware
+also makes the site-wide cache store compressed bodies (keyed on
+Accept-Encoding through the Vary header it adds).
+"""
+import gzip
+import hashlib
+import re
+import zlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+DEFAULTS = {
+    'MIN_SIZE': 512,
+    # Content types worth compressing; anything else is sent as is
+    'TYPES': r'^(text/(?!event-stream)|application/(json|.*\+json|x-ndjson|msgpack|javascript|xml)|image/svg\+xml)',
+    # Per-request compression favours speed...
+    'LEVELS': {'br': 4, 'zstd': 3, 'gzip': 6},
+    # ...payloads compressed once and cached favour size
+    'CACHED_LEVELS': {'br': 11, 'zstd': 19, 'gzip': 9},
+    'CACHE_TIMEOUT': 300,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'COMPRESSION', {}).get(name, DEFAULTS[name])
+
+
+class Gzip:
+    name = 'gzip'
+
+    @staticmethod
+    def compress(data, level):
+        return gzip.compress(data, level, mtime=0)
+
+    class Stream:
+        def __init__(self, level):
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+        def chunk(self, data):
+            return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        def finish(self):
+            return self.compressor.flush()
+
+
+class Brotli:
+    name = 'br'
+
+    @staticmethod
+    def compress(data, level):
+        return brotli.compress(data, quality=level)
+
+    class Stream:
+        def __init__(self, level):
+            self.compressor = brotli.Compressor(quality=level)
+
+        def chunk(self, data):
+            return self.compressor.process(data) + self.compressor.flush()
+
+        def finish(self):
+            return self.compressor.finish()
+
+
+class Zstd:
+    name = 'zstd'
+
+    @staticmethod
+    def compress(data, level):
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    class Stream:
+        def __init__(self, level):
+            self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+        def chunk(self, data):
+            return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+        def finish(self):
+            return self.compressor.flush()
+
+
+# In order of preference when the client accepts several equally
+CODECS = {
+    codec.name: codec for codec, module in ((Brotli, brotli), (Zstd, zstandard), (Gzip, gzip))
+    if module is not None
+}
+
+
+def negotiate(accept_encoding):
+    """The codec name to answer an Accept-Encoding header with, or None"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = part.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for name in CODECS:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compressible(response):
+    if response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return re.match(get_setting('TYPES'), content_type) is not None
+
+
+def compress_content(content, name, levels=None):
+    return CODECS[name].compress(content, (levels or get_setting('LEVELS'))[name])
+
+
+def _stream(chunks, name):
+    stream = CODECS[name].Stream(get_setting('LEVELS')[name])
+    for chunk in chunks:
+        if chunk:
+            yield stream.chunk(chunk)
+    yield stream.finish()
+
+
+async def _astream(chunks, name):
+    stream = CODECS[name].Stream(get_setting('LEVELS')[name])
+    async for chunk in chunks:
+        if chunk:
+            yield stream.chunk(chunk)
+    yield stream.finish()
+
+
+def _set_encoding(response, name):
+    response.headers['Content-Encoding'] = name
+    # The compressed bytes differ, the resource does not
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not compressible(response):
+            return response
+        if not response.streaming and len(response.content) < get_setting('MIN_SIZE'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        name = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if name is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _astream(response.streaming_content, name)
+            else:
+                response.streaming_content = _stream(response.streaming_content, name)
+            del response.headers['Content-Length']
+        else:
+            compressed = compress_content(response.content, name)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        _set_encoding(response, name)
+        return response
+
+
+def cache_compressed(key, timeout=None):
+    """
+    Cache a DRF function view's rendered, compressed 200 responses.
+
+    Goes below @api_view, so authentication, permissions and content
+    negotiation still run on every request. `key(request, *args, **kwargs)`
+    names the payload (including its version) or returns None to skip the
+    cache; the representation is added to it here.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            name = key(request, *args, **kwargs)
+            renderer = getattr(request, 'accepted_renderer', None)
+            if name is None or renderer is None or renderer.format == 'api':
+                return view(request, *args, **kwargs)
+
+            encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING'))
+            representation = '\n'.join((
+                name, request.get_full_path(), request.scheme, request.get_host(),
+                request.accepted_media_type, encoding or 'identity',
+            ))
+            cache_key = 'compressed:' + hashlib.sha1(representation.encode()).hexdigest()
+            entry = cache.get(cache_key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or getattr(response, 'data', None) is None:
+                    return response
+                entry = _render_entry(request, response, encoding)
+                cache.set(cache_key, entry, get_setting('CACHE_TIMEOUT') if timeout is None else timeout)
+
+            content, content_type, content_encoding = entry
+            response = HttpResponse(content, content_type=content_type)
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if content_encoding:
+                response.headers['Content-Encoding'] = content_encoding
+            return response
+        return wrapped
+    return decorator
+
+
+def _render_entry(request, response, encoding):
+    """(body, content type, content encoding) for a DRF Response"""
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = {
+        'request': request, 'response': response, 'view': request.parser_context.get('view'),
+    }
+    response.render()
+    content, content_type = response.content, response['Content-Type']
+    if (encoding is None or len(content) < get_setting('MIN_SIZE')
+            or not compressible(response)):
+        return content, content_type, None
+    compressed = compress_content(content, encoding, get_setting('CACHED_LEVELS'))
+    if len(compressed) >= len(content):
+        return content, content_type, None
+    return compressed, content_type, encoding
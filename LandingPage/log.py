@@ -0,0 +1,156 @@
+"""
+Non-blocking JSON logging.
+
+BackgroundHandler puts records on an in-process queue and returns; a
+listener thread formats and writes them. Request threads therefore never
+wait on stdout/stderr, and message formatting (the "%s" arguments) happens
+on the listener thread, only for records that are actually written.
+
+    LOGGING['handlers']['background'] = {
+        'class': 'LandingPage.log.BackgroundHandler',
+        'formatter': 'json',
+        'filters': ['sampling'],
+    }
+
+JSONFormatter writes one object per line: time, level, logger, message,
+exception text and any `extra` fields. Tokens are redacted on the way out:
+values under keys such as "password", "token" or "authorization", bearer
+credentials and anything shaped like a JWT.
+
+SamplingFilter keeps a fraction of the records below WARNING for the
+loggers it is given rates for (and their children), in the calling thread
+before anything is queued. Kept records carry their sample_rate.
+
+Arguments are formatted later than usual, so do not mutate objects after
+logging them.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+REDACTED = '[redacted]'
+SENSITIVE_KEYS = re.compile(r'pass(word)?|secret|token|authorization|cookie|refresh|access|api[_-]?key', re.I)
+SENSITIVE_VALUES = re.compile(
+    r'(?i:bearer|token|jwt)\s+[\w.~+/=-]+'
+    r'|eyJ[\w-]+\.[\w-]+\.[\w-]*'
+)
+
+# Attributes every LogRecord has; the rest came in through `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def redact(value):
+    if isinstance(value, str):
+        return SENSITIVE_VALUES.sub(REDACTED, value)
+    if isinstance(value, Mapping):
+        return {
+            key: REDACTED if isinstance(key, str) and SENSITIVE_KEYS.search(key) else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple, set)):
+        return [redact(item) for item in value]
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        args = record.args
+        if isinstance(args, Mapping):
+            args = redact(args)
+        elif args:
+            args = tuple(redact(arg) for arg in args)
+        message = str(record.msg) % args if args else str(record.msg)
+
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(message),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = REDACTED if SENSITIVE_KEYS.search(key) else redact(value)
+        if record.exc_info:
+            entry['exception'] = redact(self.formatException(record.exc_info))
+        elif record.exc_text:
+            entry['exception'] = redact(record.exc_text)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep `rates[logger name]` of the records below WARNING"""
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        if rate >= 1:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Queue records for a listener thread that writes them to `stream`
+    (stderr by default) with this handler's formatter.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.stream = stream
+        self.listener = None
+        self.pid = None
+
+    def prepare(self, record):
+        # Formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        super().enqueue(record)
+
+    def start(self):
+        """(Re)start the listener; a forked worker needs its own thread"""
+        self.queue = queue.SimpleQueue()
+        target = logging.StreamHandler(self.stream or sys.stderr)
+        target.setFormatter(self.formatter or JSONFormatter())
+        self.listener = QueueListener(self.queue, target)
+        self.listener.start()
+        self.pid = os.getpid()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out what is still queued"""
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self.pid = None
+
+    def close(self):
+        self.stop()
+        super().close()
@@ -0,0 +1,85 @@
+"""
+Per-route middleware chains.
+
+RouteMiddleware sits at the end of MIDDLEWARE and runs one of several
+inner chains, chosen by the request path. settings.ROUTE_MIDDLEWARE lists
+(path regex, middleware paths) pairs; the first regex that matches
+request.path_info wins, and a path matching none runs no inner middleware.
+
+The JWT API needs no sessions, CSRF tokens, messages or frame options, so
+its requests skip those (and the session lookup that comes with a cookie),
+while /admin/ and the template views keep the full chain.
+
+Inner chains are built the way Django builds MIDDLEWARE (sync only), and
+their process_view(), process_template_response() and process_exception()
+hooks run in the same order they would have there.
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class Chain:
+    def __init__(self, middleware_paths, get_response):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler = get_response
+        for middleware_path in reversed(middleware_paths):
+            try:
+                middleware = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if middleware is None:
+                raise ImproperlyConfigured(f'Middleware factory {middleware_path} returned None.')
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_middleware.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.handler = handler
+
+
+class RouteMiddleware:
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.routes = [
+            (re.compile(pattern), Chain(middleware_paths, get_response))
+            for pattern, middleware_paths in settings.ROUTE_MIDDLEWARE
+        ]
+        self.default = Chain([], get_response)
+
+    def chain_for(self, path):
+        for pattern, chain in self.routes:
+            if pattern.match(path):
+                return chain
+        return self.default
+
+    def __call__(self, request):
+        request.middleware_chain = chain = self.chain_for(request.path_info)
+        return chain.handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in request.middleware_chain.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+
+    def process_template_response(self, request, response):
+        for process_template_response in request.middleware_chain.template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in request.middleware_chain.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
@@ -0,0 +1,189 @@
+"""
+Sparse fieldsets for the review, feedback and profile APIs.
+
+    ?fields=id,rating,comment         only these fields
+    ?fields=rating,user.username      dotted names pick fields of a relation
+                                      (and expand it)
+    ?expand=user                      render the relation as an object
+                                      rather than its id
+
+Without either parameter responses are unchanged. With them, the selection
+also shapes the query, not just the output:
+- only() loads the columns behind the selected fields;
+- select_related() joins only the relations that are expanded;
+- computed flags are annotated only when they are asked for;
+- list endpoints fetch plain values() rows when every selected field is a
+  stored column, so no model instances or method fields are built.
+
+Selections apply to reads; serializers bound to request data keep all
+their fields.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+
+
+class Projection:
+    """The fields a request selected; `fields` is None when all are wanted"""
+
+    def __init__(self, fields=None, expand=(), nested=None):
+        self.fields = fields
+        self.expand = set(expand)
+        self.nested = nested or {}
+
+    @classmethod
+    def from_request(cls, request):
+        """Parse ?fields= and ?expand=; None when the request uses neither"""
+        params = getattr(request, 'query_params', {})
+
+        def names(key):
+            return [name.strip() for name in params.get(key, '').split(',') if name.strip()]
+
+        fields, expand = names('fields'), names('expand')
+        if not fields and not expand:
+            return None
+
+        top, nested = [], {}
+        for name in fields:
+            head, _, rest = name.partition('.')
+            if head not in top:
+                top.append(head)
+            if rest:
+                nested.setdefault(head, set()).add(rest)
+                expand.append(head)
+        return cls(fields=top or None, expand=expand, nested=nested)
+
+    def selects(self, name):
+        return self.fields is None or name in self.fields
+
+
+def _unknown(names, known, param):
+    unknown = sorted(set(names) - set(known))
+    if unknown:
+        raise serializers.ValidationError({
+            param: [f'Unknown field "{name}".' for name in unknown]
+        })
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin that narrows its fields to the Projection in
+    context['projection'].
+
+    Meta.expandable_fields names nested serializer fields; unless expanded
+    they render as the related id. Meta.field_sources maps computed fields
+    to the ORM paths they read. Subclasses may override annotate_projection()
+    to annotate what their method fields need.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        projection = self.context.get('projection')
+        if projection is None or hasattr(self, 'initial_data') or not self._is_root():
+            return fields
+
+        expandable = getattr(self.Meta, 'expandable_fields', [])
+        _unknown(projection.fields or (), fields, 'fields')
+        _unknown(projection.expand, expandable, 'expand')
+
+        selected = {name: field for name, field in fields.items() if projection.selects(name)}
+        for name in expandable:
+            if name not in selected:
+                continue
+            if name not in projection.expand:
+                selected[name] = serializers.IntegerField(source=f'{name}_id', read_only=True)
+            elif name in projection.nested:
+                nested = selected[name]
+                _unknown(projection.nested[name], nested.fields, 'fields')
+                for key in list(nested.fields):
+                    if key not in projection.nested[name]:
+                        del nested.fields[key]
+        return selected
+
+    def _is_root(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    @classmethod
+    def annotate_projection(cls, queryset, fields, request):
+        return queryset
+
+    @classmethod
+    def project(cls, queryset, projection, request=None, rows=False):
+        """
+        Narrow `queryset` to what `projection` renders. With `rows`, return
+        values() dicts when every selected field is a stored column.
+        """
+        fields = cls(context={'projection': projection, 'request': request}).fields
+        model = queryset.model
+        field_sources = getattr(cls.Meta, 'field_sources', {})
+        columns, related, plain = [], [], True
+
+        for name, field in fields.items():
+            if isinstance(field, serializers.BaseSerializer):
+                related.append(name)
+                columns.append(name)
+                columns += [f'{name}__{column}' for column in _columns(field)]
+                plain = False
+            elif name in field_sources:
+                columns += field_sources[name]
+                related += {path.split('__')[0] for path in field_sources[name] if '__' in path}
+                plain = False
+            elif field.source.endswith('_id') and field.source[:-3] in getattr(cls.Meta, 'expandable_fields', []):
+                columns.append(field.source)
+            else:
+                source = field.source.replace('.', '__')
+                model_field = _model_field(model, source)
+                if '__' in source:
+                    related.append(source.split('__')[0])
+                    plain = False
+                elif model_field is None or isinstance(model_field, models.FileField):
+                    # A property, or a file that needs its storage to build a URL
+                    plain = False
+                if model_field is not None or '__' in source:
+                    columns.append(source)
+
+        if related:
+            queryset = queryset.select_related(*dict.fromkeys(related))
+            columns += related
+        queryset = cls.annotate_projection(queryset, fields, request)
+        if projection is None:
+            return queryset
+        if rows and plain:
+            return queryset.values(*dict.fromkeys(columns))
+        return queryset.only(*dict.fromkeys(columns))
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _columns(serializer):
+    """Stored columns read by a nested serializer's (plain) fields"""
+    model = serializer.Meta.model
+    return [
+        field.source for field in serializer.fields.values()
+        if isinstance(_model_field(model, field.source), models.Field)
+    ]
+
+
+class ProjectionMixin:
+    """Generic view mixin: hands the request's Projection to the serializer"""
+
+    def get_projection(self):
+        if not hasattr(self, '_projection'):
+            self._projection = Projection.from_request(self.request)
+        return self._projection
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['projection'] = self.get_projection()
+        return context
+
+    def project(self, queryset, rows=False):
+        return self.get_serializer_class().project(
+            queryset, self.get_projection(), self.request, rows=rows
+        )
@@ -0,0 +1,152 @@
+"""
+Response renderers.
+
+FastJSONRenderer: JSON through orjson, byte for byte the same as DRF's
+JSONRenderer.
+
+orjson already matches the compact, non-ASCII-escaping output DRF is
+configured for. The remaining differences are patched up or avoided:
+- UTC datetimes end in "Z" (OPT_UTC_Z);
+- U+2028/U+2029 are escaped after encoding;
+- integer dict keys are stringified (OPT_NON_STR_KEYS);
+- anything orjson does not know goes through DRF's encoder.default().
+
+Floats are the one case orjson formats differently: below 1e-4 or from
+1e16 up it avoids Python's exponent style. Output that might hold such a
+number, or anything orjson cannot encode, is rendered again by the stdlib
+path. The same happens for indented output and whenever orjson is not
+installed.
+
+orjson also writes NaN and Infinity as null, where DRF raises ValueError
+(STRICT_JSON) or writes NaN. Output that contains null is therefore checked
+for non-finite numbers in the data, and those take the stdlib path too.
+
+MessagePackRenderer: the same data as MessagePack, for clients that send
+"Accept: application/msgpack" (or ?format=msgpack). Values are those the
+JSON renderer would produce, so datetimes stay ISO 8601 strings.
+
+With "Accept: application/msgpack; layout=columnar" (or ?layout=columnar)
+every non-empty list of objects sharing the same keys is sent column-wise,
+one array per field instead of the field names repeated on every row:
+
+    [{"id": 1, "rating": 5}, {"id": 2, "rating": 4}]
+    -> {"$columns": {"id": [1, 2], "rating": [5, 4]}}
+
+Nested lists of objects are turned into columns the same way.
+"""
+import math
+from decimal import Decimal
+
+import msgpack
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Digits all read as "0", so the exponent check is three substring searches
+# (a regex over the whole body costs several times more). Conservative: also matches
+# hex digests, which then take the stdlib path.
+_DIGITS_AS_ZERO = bytes(48 if 48 <= c <= 57 else c for c in range(256))
+_default = JSONEncoder().default
+
+
+def _divergent_number(ret):
+    """Might `ret` hold a float orjson formats differently from the stdlib?"""
+    if b'0.0000' in ret:
+        return True
+    digits = ret.translate(_DIGITS_AS_ZERO)
+    return b'0e0' in digits or b'0e-0' in digits
+
+
+def _non_finite(data):
+    """Does `data` hold a NaN or infinite float (or Decimal)?"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, Decimal) and not value.is_finite():
+            return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.encoder_class is not JSONEncoder
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default,
+                               option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # orjson writes NaN and Infinity as null without complaint
+        if _divergent_number(ret) or (b'null' in ret and _non_finite(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+COLUMNS = '$columns'
+
+
+def to_columns(data):
+    """Lists of same-keyed objects -> {"$columns": {key: values}}, recursively"""
+    if isinstance(data, dict):
+        return {key: to_columns(value) for key, value in data.items()}
+    if not isinstance(data, (list, tuple)):
+        return data
+    if data and all(isinstance(row, dict) for row in data):
+        keys = data[0].keys()
+        if keys and all(row.keys() == keys for row in data):
+            return {COLUMNS: {key: to_columns([row[key] for row in data]) for key in keys}}
+    return [to_columns(value) for value in data]
+
+
+def from_columns(data):
+    """Inverse of to_columns(), for clients and tests"""
+    if isinstance(data, dict):
+        if data.keys() == {COLUMNS}:
+            columns = {key: from_columns(values) for key, values in data[COLUMNS].items()}
+            return [dict(zip(columns, row)) for row in zip(*columns.values())]
+        return {key: from_columns(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [from_columns(value) for value in data]
+    return data
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def get_layout(self, accepted_media_type, renderer_context):
+        request = renderer_context.get('request')
+        layout = request.query_params.get('layout') if hasattr(request, 'query_params') else None
+        if accepted_media_type:
+            layout = parse_header_parameters(accepted_media_type)[1].get('layout', layout)
+        return layout
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_layout(accepted_media_type, renderer_context) == 'columnar':
+            data = to_columns(data)
+            response = renderer_context.get('response')
+            if response is not None:
+                response['Content-Type'] = f'{self.media_type}; layout=columnar'
+        return msgpack.packb(data, default=_default, use_bin_type=True)
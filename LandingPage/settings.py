@@ -16,6 +16,8 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +48,7 @@ INSTALLED_APPS = [
     'accounts', 
     "corsheaders",
     'reviews',
+    'verification',
 ]
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
@@ -57,11 +60,191 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'LandingPage.renderers.FastJSONRenderer',  # orjson, same bytes as JSONRenderer
+        'LandingPage.renderers.MessagePackRenderer',  # Accept: application/msgpack
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'LandingPage.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    # Token buckets for LandingPage.throttling (burst size / refill period)
+    'DEFAULT_THROTTLE_RATES': {
+        'quick_review': '30/min',
+        'review_helpful': '120/min',
+        'token': '20/min',
+    },
+}
+
+# Shared token buckets (see LandingPage/throttling.py): one mmap'd file per
+# host, so every worker process draws from the same limits.
+THROTTLE_BUCKETS = {
+    'PATH': '/tmp/verifeed-throttle',
+    'SETS': 16384,
+    'LEASE_FRACTION': 0.05,
+    'LEASE_SECONDS': 1.0,
 }
 
 
+# Coalesced quick_review ingest (see reviews/ingest.py). When enabled,
+# quick reviews are answered with 202 + receipt and written in batches.
+# Receipts are ReviewReceipt rows; an id with no row reads as pending for
+# PENDING_SECONDS after it was issued.
+REVIEW_INGEST = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_BATCH': 500,
+    'RECEIPT_TTL': 60 * 60,
+    'PENDING_SECONDS': 60,
+    'POLICY': 'replace',
+}
+
+# Server-Sent Events for live review updates (see reviews/live.py). Workers
+# exchange events over Unix datagram sockets in SOCKET_DIR, so the stream
+# is only served by the ASGI application on a POSIX host.
+LIVE_EVENTS = {
+    'ENABLED': True,
+    'SOCKET_DIR': '/tmp/verifeed-live',
+    'HEARTBEAT_SECONDS': 15,
+    'QUEUE_SIZE': 64,
+}
+
+# Deepfake verification (see verification/). DETECTOR is a dotted path to a
+# verification.detectors.BaseDetector subclass; cached verdicts expire after
+# TTL or as soon as the detector reports a different model_version.
+VERIFICATION = {
+    'DETECTOR': 'verification.detectors.StubDetector',
+    'TTL': timedelta(days=7),
+    # Near-duplicate matching on 64-bit perceptual hashes
+    'PHASH_INDEX_DIR': BASE_DIR / 'var' / 'phash',
+    'PHASH_RADIUS': 6,
+    # Processes used by manage.py run_detection_workers
+    'WORKERS': 2,
+    # POST /api/verification/verify/batch/; queued jobs are only followed
+    # (for up to BATCH_WAIT_SECONDS) when served over ASGI
+    'BATCH_MAX_ITEMS': 100,
+    'BATCH_WAIT_SECONDS': 20,
+    # Resumable uploads under /api/verification/uploads/
+    'UPLOAD_MAX_SIZE': 2 * 1024 ** 3,
+    'UPLOAD_TTL': timedelta(days=1),
+}
+
+# Response compression (see LandingPage/compression.py). Bodies under
+# MIN_SIZE go out as they are; CACHED_LEVELS apply to payloads compressed
+# once and kept in the cache (the service review summary).
+COMPRESSION = {
+    'MIN_SIZE': 512,
+    'LEVELS': {'br': 4, 'zstd': 3, 'gzip': 6},
+    'CACHED_LEVELS': {'br': 11, 'zstd': 19, 'gzip': 9},
+    'CACHE_TIMEOUT': 300,
+}
+
+# JSON logs written by a background thread (see LandingPage/log.py). Rates
+# sample the high-volume request logs; warnings and errors are always kept.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'LandingPage.log.JSONFormatter'},
+    },
+    'filters': {
+        'sampling': {
+            '()': 'LandingPage.log.SamplingFilter',
+            'rates': {'reviews.requests': 0.01},
+        },
+    },
+    'handlers': {
+        'background': {
+            'class': 'LandingPage.log.BackgroundHandler',
+            'formatter': 'json',
+            'filters': ['sampling'],
+        },
+    },
+    'loggers': {
+        name: {'handlers': ['background'], 'level': 'INFO', 'propagate': False}
+        for name in ('reviews', 'accounts', 'verification')
+    },
+}
+
+# Trending services (see reviews/trending.py). Changing HALF_LIFE needs
+# manage.py compact_trends --rebuild.
+TRENDING = {
+    'HALF_LIFE': timedelta(hours=6),
+    'MIN_VOLUME': 0.05,
+}
+
+# Bayesian leaderboard: each service starts as PRIOR_WEIGHT reviews of
+# PRIOR_MEAN stars. After changing these, run `manage.py rebuild_leaderboard`.
+LEADERBOARD = {
+    'PRIOR_MEAN': 3.0,
+    'PRIOR_WEIGHT': 10,
+    'REFRESH_SECONDS': 2,
+}
+
+# Columnar copies of the review tables for reporting (reviews/snapshots.py).
+# Refresh with `manage.py snapshot_analytics`; read with analytics_report.
+ANALYTICS = {
+    'SNAPSHOT_DIR': BASE_DIR / 'var' / 'analytics',
+}
+
+# Near-duplicate review detection (reviews/duplicates.py). Reviews whose
+# estimated text similarity reaches THRESHOLD are flagged as NearDuplicate.
+# After changing NUM_PERM, BANDS or SHINGLE run
+# `manage.py backfill_review_signatures --rebuild`.
+SPAM_DETECTION = {
+    'NUM_PERM': 128,
+    'BANDS': 16,
+    'SHINGLE': 5,
+    'THRESHOLD': 0.8,
+}
+
+# Retention (reviews/retention.py): `manage.py purge_retention` archives rows
+# older than AGE to gzipped JSON lines under ARCHIVE_DIR, then deletes them
+# in DELETE_CHUNK-row statements. Only list tables nothing references.
+# Purged helpful votes are taken off helpful_count (BEFORE_DELETE), so a
+# user whose old vote was purged can vote again without counting twice.
+RETENTION = {
+    'ARCHIVE_DIR': BASE_DIR / 'var' / 'archive',
+    'BATCH_SIZE': 5000,
+    'DELETE_CHUNK': 1000,
+    'PAUSE_SECONDS': 0.05,
+    'POLICIES': {
+        'reviews.Feedback': {'AGE': timedelta(days=365)},
+        'reviews.ReviewHelpful': {
+            'AGE': timedelta(days=2 * 365),
+            'BEFORE_DELETE': 'reviews.retention.forget_helpful_votes',
+        },
+        # Ingest receipts are only read for REVIEW_INGEST['RECEIPT_TTL']
+        'reviews.ReviewReceipt': {'AGE': timedelta(days=1), 'ARCHIVE': False},
+    },
+}
+
+# Account deletion (accounts/deletion.py) removes reviews, votes and
+# feedback CHUNK_SIZE rows per statement and transaction.
+ACCOUNT_DELETION = {
+    'CHUNK_SIZE': 1000,
+}
+
+# Bulk account import (accounts/provisioning.py): `manage.py import_users`
+# hashes passwords on PROCESSES worker processes (default: one per CPU) and
+# inserts rows CHUNK_SIZE at a time. POST /api/accounts/bulk-import/ runs in
+# the web worker without a pool, so it takes at most SYNC_MAX_ROWS rows.
+BULK_IMPORT = {
+    'CHUNK_SIZE': 500,
+    'MAX_ROWS': 10000,
+    'SYNC_MAX_ROWS': 25,
+}
+
+# What happens when a user reviews a service twice: 'reject', 'replace'
+# or 'keep_newest' (see reviews/services.py)
+REVIEW_SUBMISSION_POLICY = 'reject'
+
+
 # Media files configuration
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -92,16 +275,29 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'LandingPage.compression.CompressionMiddleware',  # br/zstd/gzip
     'corsheaders.middleware.CorsMiddleware',  
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    
+    'LandingPage.middleware.RouteMiddleware',  # the rest, per path (below)
+]
+
+# Middleware chosen by path (see LandingPage/middleware.py); first match wins.
+# The JWT API skips sessions, CSRF, messages and frame options; /admin/ and
+# the web/ template views run the full chain.
+ROUTE_MIDDLEWARE = [
+    (r'^/api/(?!web/)', []),
+    (r'', [
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.middleware.csrf.CsrfViewMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+        'django.contrib.messages.middleware.MessageMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]),
 ]
 
+# The admin looks for these in MIDDLEWARE; ROUTE_MIDDLEWARE runs them for it
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 CORS_ALLOW_ALL_ORIGINS = True  
 
 ROOT_URLCONF = 'LandingPage.urls'
@@ -215,6 +411,12 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024   # 5MB
 CORS_ALLOW_ALL_ORIGINS = True  # Only for development
 CORS_ALLOW_CREDENTIALS = True
 
+# Resumable upload (tus) headers for the browser extension
+CORS_ALLOW_HEADERS = [*default_headers, 'tus-resumable', 'upload-length', 'upload-metadata',
+                      'upload-offset', 'upload-checksum']
+CORS_EXPOSE_HEADERS = ['location', 'tus-resumable', 'tus-version', 'tus-extension', 'tus-max-size',
+                       'upload-offset', 'upload-length', 'upload-crc32', 'upload-expires']
+
 # In production, use specific origins:
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:5173",
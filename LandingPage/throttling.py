@@ -0,0 +1,222 @@
+"""
+Token-bucket throttles shared by every worker process on a host.
+
+Buckets live in a memory-mapped file (THROTTLE_BUCKETS['PATH']) rather than
+the cache, so a decision costs no network round trip. The file is a fixed
+hash table of 4-way sets; each entry holds a key hash, the tokens left and
+when they were last refilled. A set is updated under an fcntl record lock
+on its own bytes, so workers only contend for the same set.
+
+Most decisions do not touch the file at all: a worker takes a small lease
+of tokens (LEASE_FRACTION of the bucket) and spends it locally until it
+runs out or LEASE_SECONDS pass. Leased tokens are already gone from the
+shared bucket, so the limit is never exceeded; unspent ones just expire.
+
+Rates use DRF's DEFAULT_THROTTLE_RATES ("30/min" = a bucket of 30 refilled
+over a minute). Views pick a scope with `throttle_scope`, or function views
+use a scoped class:
+
+    @throttle_classes([UserBucketThrottle.for_scope('quick_review')])
+
+A scope without a configured rate is not throttled. An evicted bucket
+(the set was full) starts over full.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no cross-process locking (Windows)
+    fcntl = None
+
+DEFAULTS = {
+    'PATH': '/tmp/verifeed-throttle',
+    'SETS': 16384,
+    'LEASE_FRACTION': 0.05,
+    'LEASE_SECONDS': 1.0,
+}
+
+MAGIC = b'VFBUCKT1'
+HEADER = struct.Struct('<8sQ')
+ENTRY = struct.Struct('<Qdd')  # key hash, tokens, refilled at (monotonic)
+WAYS = 4
+SET_SIZE = WAYS * ENTRY.size
+MAX_LEASES = 10000
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_setting(name):
+    return getattr(settings, 'THROTTLE_BUCKETS', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """'30/min' -> (capacity 30, 0.5 tokens per second)"""
+    try:
+        count, period = rate.split('/')
+        capacity = int(count)
+        return capacity, capacity / DURATIONS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ImproperlyConfigured(f'Invalid throttle rate "{rate}".')
+
+
+def key_hash(key):
+    # 0 marks an empty entry
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+
+class _Locked:
+    """fcntl record lock on one set of the file (plus a thread lock)"""
+
+    def __init__(self, table, offset):
+        self.table, self.offset = table, offset
+
+    def __enter__(self):
+        self.table.thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.lockf(self.table.fd, fcntl.LOCK_EX, SET_SIZE, self.offset)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.lockf(self.table.fd, fcntl.LOCK_UN, SET_SIZE, self.offset)
+        self.table.thread_lock.release()
+
+
+class BucketTable:
+    def __init__(self, path, sets):
+        self.sets = sets
+        self.thread_lock = threading.Lock()
+        size = HEADER.size + sets * SET_SIZE
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self.fd, HEADER.size, 0)
+            if os.fstat(self.fd).st_size != size or header != HEADER.pack(MAGIC, sets):
+                # New file or another layout: start empty
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, sets), 0)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.map = mmap.mmap(self.fd, size)
+
+    def take(self, key, capacity, rate, wanted, now):
+        """Refill `key`'s bucket, take up to `wanted` whole tokens; -> (taken, tokens left)"""
+        offset = HEADER.size + key % self.sets * SET_SIZE
+        with _Locked(self, offset):
+            position, victim = None, None
+            for way in range(WAYS):
+                entry = offset + way * ENTRY.size
+                entry_key, tokens, refilled = ENTRY.unpack_from(self.map, entry)
+                if entry_key == key:
+                    position = entry
+                    break
+                if victim is None or refilled < victim[1]:
+                    victim = (entry, refilled)
+            if position is None:
+                position, tokens, refilled = victim[0], capacity, now
+
+            # refilled > now only after a reboot (monotonic clock restarted)
+            tokens = min(capacity, tokens + max(now - refilled, 0) * rate)
+            taken = min(wanted, int(tokens))
+            tokens -= taken
+            ENTRY.pack_into(self.map, position, key, tokens, now)
+        return taken, tokens
+
+
+class Buckets:
+    """Per-process view of the shared buckets, with local token leases"""
+
+    def __init__(self):
+        self.table = BucketTable(get_setting('PATH'), get_setting('SETS'))
+        self.lease_fraction = get_setting('LEASE_FRACTION')
+        self.lease_seconds = get_setting('LEASE_SECONDS')
+        self.leases = {}  # key -> [tokens, expires at]
+        self.lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """Take one token; -> seconds to wait, or None when allowed"""
+        now = time.monotonic()
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is not None and lease[0] >= 1 and lease[1] > now:
+                lease[0] -= 1
+                return None
+
+        wanted = max(1, int(capacity * self.lease_fraction))
+        taken, left = self.table.take(key_hash(key), capacity, rate, wanted, now)
+        if not taken:
+            return (1 - left) / rate if rate else None
+
+        with self.lock:
+            if len(self.leases) >= MAX_LEASES:
+                self.leases = {k: v for k, v in self.leases.items() if v[1] > now and v[0] >= 1}
+            self.leases[key] = [taken - 1, now + self.lease_seconds]
+        return None
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def get_buckets():
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                _buckets = Buckets()
+    return _buckets
+
+
+class BucketThrottle(BaseThrottle):
+    """Base class: subclasses say whose bucket a request draws from"""
+    scope = None
+
+    @classmethod
+    def for_scope(cls, scope):
+        return type(f'{cls.__name__}_{scope}', (cls,), {'scope': scope})
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = self.scope or getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None:
+            return True
+        capacity, per_second = parse_rate(rate)
+        self.wait_seconds = get_buckets().consume(
+            f'{scope}:{self.get_ident_key(request)}', capacity, per_second
+        )
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserBucketThrottle(BucketThrottle):
+    """One bucket per user; anonymous requests share one per client IP"""
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class IPBucketThrottle(BucketThrottle):
+    """One bucket per client IP (see NUM_PROXIES for X-Forwarded-For)"""
+
+    def get_ident_key(self, request):
+        return f'ip:{self.get_ident(request)}'
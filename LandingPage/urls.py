@@ -4,15 +4,19 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .throttling import IPBucketThrottle
 
 router = DefaultRouter()
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
+    path('api/verification/', include('verification.urls')),
     path('api/', include('reviews.urls')), 
-    path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/", TokenObtainPairView.as_view(throttle_classes=[IPBucketThrottle.for_scope('token')]),
+         name="token_obtain_pair"),
+    path("api/token/refresh/", TokenRefreshView.as_view(throttle_classes=[IPBucketThrottle.for_scope('token')]),
+         name="token_refresh"),
 ]
 
 # Serve media files in development
@@ -0,0 +1,140 @@
+"""
+Account deletion without Django's collector.
+
+user.delete() loads every review, every vote on those reviews, the user's
+own votes and feedback into memory, then deletes them object by object.
+delete_account() removes the heavy tables with set-based statements
+instead, CHUNK_SIZE primary keys at a time, each chunk in its own short
+transaction:
+
+1. The user's helpful votes: the reviews they voted on lose one
+   helpful_count each (one UPDATE per chunk, which also bumps updated_at),
+   then the votes go.
+2. The user's reviews: other users' votes on them, their duplicate-detection
+   rows and the reviews themselves.
+3. Their feedback.
+
+Steps 1 and 2 log their ReviewChange entries with record_changes() in the
+chunk's transaction, so the sync feed, summaries and the leaderboard hear
+about each chunk as it commits (reviews_changed, with the rating deltas of
+the removed reviews) rather than only once the account is gone.
+
+What is left (verification jobs, uploads, tokens, admin log entries) is
+small, so user.delete() cascades it as usual. The avatar and uploaded media
+are removed by a background thread after the user row is gone.
+
+A run that is interrupted can simply be repeated: each step only looks at
+rows that still belong to the user.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+
+from reviews.models import (
+    Feedback, NearDuplicate, Review, ReviewBand, ReviewChange, ReviewHelpful, ReviewSignature,
+)
+from reviews.signals import record_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CHUNK_SIZE': 1000,
+}
+DEFAULT_PICTURE = 'profile_pics/default.jpg'
+
+_file_remover = ThreadPoolExecutor(max_workers=1, thread_name_prefix='account-files')
+
+
+def get_setting(name):
+    return getattr(settings, 'ACCOUNT_DELETION', {}).get(name, DEFAULTS[name])
+
+
+def _chunks(queryset, fields, size):
+    """Lists of `fields` rows, lowest pk first, until the queryset is empty"""
+    while True:
+        rows = list(queryset.order_by('pk').values_list(*fields)[:size])
+        if not rows:
+            return
+        yield rows
+
+
+def _raw_delete(model, pks):
+    """DELETE by primary key, without loading rows or sending signals"""
+    meta, quote = model._meta, connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} WHERE {quote(meta.pk.column)} IN ({placeholders})', pks
+        )
+        return cursor.rowcount
+
+
+def _remove_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError as exc:
+            logger.warning("Could not remove %s: %s", name, exc)
+
+
+def user_files(user):
+    names = [
+        *user.detection_jobs.exclude(media='').values_list('media', flat=True),
+        *user.upload_sessions.values_list('path', flat=True),
+    ]
+    if user.profile_picture and user.profile_picture.name != DEFAULT_PICTURE:
+        names.append(user.profile_picture.name)
+    return names
+
+
+def delete_account(user):
+    """Delete `user` and everything they own; -> {table: rows deleted}"""
+    size = get_setting('CHUNK_SIZE')
+    counts = {'helpful_votes': 0, 'reviews': 0, 'feedback': 0}
+
+    votes = ReviewHelpful.objects.filter(user=user)
+    for rows in _chunks(votes, ['pk', 'review_id'], size):
+        with transaction.atomic():
+            reviews = Review.objects.filter(pk__in=[review_id for _, review_id in rows])
+            voted = list(reviews.values_list('pk', 'service_name'))
+            reviews.update(helpful_count=Greatest(F('helpful_count') - 1, 0), updated_at=Now())
+            counts['helpful_votes'] += _raw_delete(ReviewHelpful, [pk for pk, _ in rows])
+            # Ratings are untouched: (0, 0) spares the leaderboard a recount
+            record_changes(
+                [(pk, service_name, ReviewChange.UPDATE) for pk, service_name in voted],
+                rating_deltas={service_name: (0, 0) for _, service_name in voted},
+            )
+
+    for rows in _chunks(Review.objects.filter(user=user), ['pk', 'service_name', 'rating'], size):
+        review_ids = [pk for pk, _, _ in rows]
+        deltas = {}
+        for _, service_name, rating in rows:
+            reviews, total = deltas.get(service_name, (0, 0))
+            deltas[service_name] = (reviews - 1, total - rating)
+        with transaction.atomic():
+            ReviewHelpful.objects.filter(review_id__in=review_ids).delete()
+            NearDuplicate.objects.filter(review_id__in=review_ids).delete()
+            NearDuplicate.objects.filter(duplicate_of_id__in=review_ids).delete()
+            ReviewBand.objects.filter(review_id__in=review_ids).delete()
+            ReviewSignature.objects.filter(review_id__in=review_ids).delete()
+            record_changes(
+                [(pk, service_name, ReviewChange.DELETE) for pk, service_name, _ in rows],
+                rating_deltas=deltas,
+            )
+            counts['reviews'] += _raw_delete(Review, review_ids)
+
+    for rows in _chunks(Feedback.objects.filter(user=user), ['pk'], size):
+        counts['feedback'] += _raw_delete(Feedback, [pk for pk, in rows])
+
+    user_id, files = user.pk, user_files(user)
+    with transaction.atomic():
+        user.delete()
+        transaction.on_commit(lambda: _file_remover.submit(_remove_files, files))
+
+    logger.info("Deleted account %s: %s", user_id, counts)
+    return counts
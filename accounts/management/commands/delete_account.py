@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.deletion import delete_account
+
+
+class Command(BaseCommand):
+    help = "Delete accounts with their reviews, votes and feedback in chunked set-based statements"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='+')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        for username in options['usernames']:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'No user "{username}"')
+            counts = delete_account(user)
+            summary = ', '.join(f"{count} {table.replace('_', ' ')}" for table, count in counts.items())
+            self.stdout.write(self.style.SUCCESS(f"Deleted {username} ({summary})"))
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import provisioning
+
+
+class Command(BaseCommand):
+    help = "Create accounts from a CSV or NDJSON file, hashing passwords on a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=provisioning.FORMATS,
+                            help="Default: from the file extension")
+        parser.add_argument('--avatars', action='store_true', help="Generate an initials avatar per user")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the rows")
+        parser.add_argument('--processes', type=int)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or provisioning.guess_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as f:
+                report = provisioning.provision(
+                    provisioning.read_rows(f, fmt), avatars=options['avatars'],
+                    dry_run=options['dry_run'], processes=options['processes'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        verb = 'Validated' if options['dry_run'] else 'Created'
+        count = report['valid'] if options['dry_run'] else report['created']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} of {report['rows']} accounts in {report['seconds']}s "
+            f"({len(report['errors'])} rejected)"
+        ))
@@ -0,0 +1,240 @@
+"""
+Bulk account provisioning from CSV or NDJSON.
+
+    manage.py import_users partners.csv --avatars
+    POST /api/accounts/bulk-import/   (staff; multipart "file", small files)
+
+Columns are username, email and optionally full_name, password and
+birthday (YYYY-MM-DD). A row without a password gets an unusable one, so
+the user has to reset it first.
+
+Rows go through a pipeline instead of one UserSerializer.create() each:
+
+1. BulkUserSerializer validates each row; no database access.
+2. Usernames and emails are checked case-insensitively against the rest of
+   the file, then against existing accounts with one query per CHUNK_SIZE
+   names.
+3. Passwords are hashed on a process pool (PROCESSES workers). This is
+   where the time goes: each hash is a deliberately slow PBKDF2. With
+   avatars, the same workers draw an initials avatar for each user.
+4. Accounts are inserted with bulk_create, CHUNK_SIZE rows per transaction.
+   If a chunk conflicts with an account created meanwhile, its rows are
+   inserted one by one and the conflicting ones are reported.
+
+Every rejected row is reported as {'line': n, 'errors': {...}}; the other
+rows are still created.
+
+The endpoint runs inside a web worker, so it never forks a pool: it hashes
+in its own process and takes at most SYNC_MAX_ROWS rows (each hash costs
+around half a second). Larger files go through `manage.py import_users`.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connections, transaction
+from django.db.models.functions import Lower
+from PIL import Image, ImageDraw, ImageFont
+
+from .deletion import DEFAULT_PICTURE
+from .models import CustomUser
+from .serializers import BulkUserSerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'PROCESSES': os.cpu_count(),
+    'CHUNK_SIZE': 500,
+    'MAX_ROWS': 10000,
+    'SYNC_MAX_ROWS': 25,
+}
+FORMATS = ('csv', 'ndjson')
+AVATAR_SIZE = 200
+
+
+class TooManyRows(ValueError):
+    pass
+
+
+def get_setting(name):
+    return getattr(settings, 'BULK_IMPORT', {}).get(name, DEFAULTS[name])
+
+
+def guess_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """(line number, row dict or None when unparsable) for a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Empty cells mean "not given"
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+    elif fmt == 'ndjson':
+        for line, data in enumerate(text, 1):
+            if not data.strip():
+                continue
+            try:
+                row = json.loads(data)
+            except ValueError:
+                row = None
+            yield line, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f'Unknown format "{fmt}". Choose from: {", ".join(FORMATS)}.')
+
+
+def initials_avatar(username, full_name):
+    """PNG bytes: the user's initials on a colour picked from the username"""
+    digest = hashlib.blake2b(username.encode(), digest_size=3).digest()
+    background = tuple(64 + byte // 2 for byte in digest)
+    initials = ''.join(part[0] for part in (full_name or username).split()[:2]).upper() or '?'
+
+    image = Image.new('RGB', (AVATAR_SIZE, AVATAR_SIZE), background)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=AVATAR_SIZE * 2 // 5)
+    draw.text((AVATAR_SIZE / 2, AVATAR_SIZE / 2), initials, fill='white', font=font, anchor='mm')
+    output = io.BytesIO()
+    image.save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+
+def _prepare(job):
+    """Worker: (password, username, full_name, avatar?) -> (hash, avatar bytes or None)"""
+    password, username, full_name, avatar = job
+    return make_password(password or None), initials_avatar(username, full_name) if avatar else None
+
+
+def _existing(field, values, size):
+    """The lowercased `values` already taken in `field`"""
+    values, taken = sorted(values), set()
+    for start in range(0, len(values), size):
+        taken.update(
+            CustomUser.objects.annotate(value=Lower(field))
+            .filter(value__in=values[start:start + size])
+            .values_list('value', flat=True)
+        )
+    return taken
+
+
+def validate(rows):
+    """-> ([(line, validated data)], [error entries])"""
+    valid, errors = [], []
+    seen = {'username': {}, 'email': {}}
+    for line, row in rows:
+        if row is None:
+            errors.append({'line': line, 'errors': {'row': ['Not a JSON object.']}})
+            continue
+        serializer = BulkUserSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'line': line, 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        duplicates = {
+            field: [f'Same as line {seen[field][data[field].lower()]}.']
+            for field in seen if data[field].lower() in seen[field]
+        }
+        if duplicates:
+            errors.append({'line': line, 'errors': duplicates})
+            continue
+        for field in seen:
+            seen[field][data[field].lower()] = line
+        valid.append((line, data))
+
+    size = get_setting('CHUNK_SIZE')
+    taken = {field: _existing(field, names, size) for field, names in seen.items()}
+    messages = {'username': 'This username is already taken.', 'email': 'This email is already registered.'}
+    accepted = []
+    for line, data in valid:
+        conflicts = {field: [messages[field]] for field in taken if data[field].lower() in taken[field]}
+        if conflicts:
+            errors.append({'line': line, 'errors': conflicts})
+        else:
+            accepted.append((line, data))
+    return accepted, errors
+
+
+def _user(data, password, avatar_name):
+    first_name, _, last_name = data['full_name'].strip().partition(' ')
+    user = CustomUser(
+        username=data['username'], email=data['email'], password=password,
+        first_name=first_name, last_name=last_name.strip(), birthday=data['birthday'],
+    )
+    if avatar_name:
+        user.profile_picture = avatar_name
+    return user
+
+
+def _insert(chunk, errors):
+    """bulk_create one chunk; on a conflict, fall back to row by row"""
+    try:
+        with transaction.atomic():
+            CustomUser.objects.bulk_create([user for _, user in chunk])
+        return len(chunk)
+    except IntegrityError:
+        pass
+
+    created = 0
+    for line, user in chunk:
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+            created += 1
+        except IntegrityError:
+            errors.append({'line': line, 'errors': {'row': ['Username or email was taken during the import.']}})
+            if user.profile_picture.name != DEFAULT_PICTURE:
+                default_storage.delete(user.profile_picture.name)
+    return created
+
+
+def provision(rows, avatars=False, dry_run=False, processes=None, max_rows=None):
+    """
+    Create accounts from (line, row) pairs; -> report dict. With
+    processes=1 the work stays in this process.
+    """
+    started = time.monotonic()
+    rows = list(rows)
+    max_rows = max_rows or get_setting('MAX_ROWS')
+    if len(rows) > max_rows:
+        raise TooManyRows(f"Too many rows ({len(rows)}); the limit is {max_rows}.")
+    accepted, errors = validate(rows)
+    report = {'rows': len(rows), 'valid': len(accepted), 'created': 0, 'errors': errors}
+    if dry_run or not accepted:
+        report['seconds'] = round(time.monotonic() - started, 2)
+        return report
+
+    processes = processes or get_setting('PROCESSES')
+    jobs = [(data['password'], data['username'], data['full_name'], avatars) for _, data in accepted]
+    if processes == 1:
+        prepared = list(map(_prepare, jobs))
+    else:
+        # Forked workers must not share this process's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            prepared = list(pool.map(_prepare, jobs, chunksize=max(1, len(jobs) // (processes * 4))))
+
+    users = []
+    for (line, data), (password, avatar) in zip(accepted, prepared):
+        avatar_name = default_storage.save(f"profile_pics/{data['username']}.png", ContentFile(avatar)) \
+            if avatar else None
+        users.append((line, _user(data, password, avatar_name)))
+
+    size = get_setting('CHUNK_SIZE')
+    for start in range(0, len(users), size):
+        report['created'] += _insert(users[start:start + size], errors)
+
+    errors.sort(key=lambda error: error['line'])
+    report['seconds'] = round(time.monotonic() - started, 2)
+    logger.info("Bulk import: %s of %s rows created in %ss",
+                report['created'], report['rows'], report['seconds'])
+    return report
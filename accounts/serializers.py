@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.contrib.auth import authenticate
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from LandingPage.projection import SparseFieldsMixin
 from .models import CustomUser
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
@@ -68,7 +70,24 @@ class UserSerializer(serializers.ModelSerializer):
         
         return user
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class BulkUserSerializer(serializers.Serializer):
+    """One row of a bulk import (provisioning.py checks uniqueness for the whole file)"""
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    full_name = serializers.CharField(required=False, allow_blank=True, default='')
+    password = serializers.CharField(required=False, allow_blank=True, default='')
+    birthday = serializers.DateField(required=False, allow_null=True, default=None)
+
+    def validate_password(self, value):
+        # Blank: the account gets an unusable password until it is reset
+        if value:
+            try:
+                validate_password(value)
+            except ValidationError as e:
+                raise serializers.ValidationError(list(e.messages))
+        return value
+
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     profile_picture_url = serializers.SerializerMethodField()
     full_name = serializers.SerializerMethodField()
 
@@ -77,6 +96,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'first_name', 'last_name', 'email', 'username', 
                  'profile_picture', 'profile_picture_url', 'full_name']
         read_only_fields = ['id', 'username', 'email']
+        field_sources = {'profile_picture_url': ['profile_picture'],
+                         'full_name': ['first_name', 'last_name']}
 
     def get_profile_picture_url(self, obj):
         """Return full URL for profile picture"""
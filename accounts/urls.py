@@ -1,6 +1,7 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import MyTokenObtainPairView, register_user, profile_view, logout_view, upload_profile_picture, remove_profile_picture
+from LandingPage.throttling import IPBucketThrottle
+from .views import MyTokenObtainPairView, register_user, profile_view, logout_view, upload_profile_picture, remove_profile_picture, delete_account_view, bulk_import_users
 
 
 app_name = 'accounts'
@@ -8,9 +9,12 @@ app_name = 'accounts'
 urlpatterns = [
     path('register/', register_user, name='register'),
     path('token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', TokenRefreshView.as_view(throttle_classes=[IPBucketThrottle.for_scope('token')]),
+         name='token_refresh'),
     path('profile/', profile_view, name='profile'),
     path('logout/', logout_view, name='logout'),
       path('upload-profile-picture/', upload_profile_picture, name='upload_profile_picture'),
     path('remove-profile-picture/', remove_profile_picture, name='remove_profile_picture'),
+    path('delete-account/', delete_account_view, name='delete_account'),
+    path('bulk-import/', bulk_import_users, name='bulk_import_users'),
 ]
@@ -1,10 +1,15 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, parser_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
 from .serializers import UserProfileSerializer, UserSerializer, MyTokenObtainPairSerializer
 from .models import CustomUser
+from .deletion import delete_account
+from . import provisioning
+from LandingPage.parsers import MessagePackParser
+from LandingPage.projection import Projection
+from LandingPage.throttling import IPBucketThrottle
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 import logging
@@ -14,12 +19,14 @@ logger = logging.getLogger(__name__)
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_classes = [IPBucketThrottle]
+    throttle_scope = 'token'
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
-@parser_classes([MultiPartParser, FormParser])
+@parser_classes([MultiPartParser, FormParser, MessagePackParser])
 def register_user(request):
-    logger.info(f"Registration attempt with data keys: {list(request.data.keys())}")
+    logger.info("Registration attempt with data keys: %s", list(request.data.keys()))
     
     serializer = UserSerializer(data=request.data)
     
@@ -51,11 +58,11 @@ def register_user(request):
                 }
             }
             
-            logger.info(f"User {user.username} registered successfully")
+            logger.info("User %s registered successfully", user.username)
             return Response(response_data, status=status.HTTP_201_CREATED)
             
         except IntegrityError as e:
-            logger.error(f"Database integrity error during registration: {str(e)}")
+            logger.error("Database integrity error during registration: %s", e)
             
             # Provide specific error messages
             error_msg = str(e).lower()
@@ -76,14 +83,14 @@ def register_user(request):
                 )
         
         except Exception as e:
-            logger.error(f"Unexpected error during registration: {str(e)}")
+            logger.exception("Unexpected error during registration: %s", e)
             return Response(
                 {'error': 'Registration failed. Please try again.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
     # Validation errors
-    logger.error(f"Registration validation failed: {serializer.errors}")
+    logger.error("Registration validation failed: %s", serializer.errors)
     return Response(
         {'error': 'Invalid data.', 'details': serializer.errors},
         status=status.HTTP_400_BAD_REQUEST
@@ -91,16 +98,19 @@ def register_user(request):
 
 @api_view(['GET', 'PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
-@parser_classes([MultiPartParser, FormParser])
+@parser_classes([MultiPartParser, FormParser, MessagePackParser])
 def profile_view(request):
     user = request.user
     
     if request.method == 'GET':
-        serializer = UserProfileSerializer(user, context={'request': request})
+        serializer = UserProfileSerializer(user, context={
+            'request': request,
+            'projection': Projection.from_request(request)
+        })
         return Response(serializer.data)
     
     elif request.method in ['PUT', 'PATCH']:
-        logger.info(f"Profile update for {user.username} with data: {list(request.data.keys())}")
+        logger.info("Profile update for %s with data: %s", user.username, list(request.data.keys()))
         
         # Handle file upload specifically
         partial = request.method == 'PATCH'
@@ -114,14 +124,14 @@ def profile_view(request):
         if serializer.is_valid():
             updated_user = serializer.save()
             
-            logger.info(f"Profile updated successfully for {user.username}")
+            logger.info("Profile updated successfully for %s", user.username)
             
             return Response({
                 'message': 'Profile updated successfully.',
                 'user': UserProfileSerializer(updated_user, context={'request': request}).data
             })
         
-        logger.error(f"Profile update failed for {user.username}: {serializer.errors}")
+        logger.error("Profile update failed for %s: %s", user.username, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -133,7 +143,7 @@ def logout_view(request):
             token = RefreshToken(refresh_token)
             token.blacklist()
     except Exception as e:
-        logger.warning(f"Token blacklist failed: {e}")
+        logger.warning("Token blacklist failed: %s", e)
     
     return Response({"message": "Logged out successfully"})
 
@@ -179,7 +189,7 @@ def upload_profile_picture(request):
     
     profile_picture_url = request.build_absolute_uri(user.profile_picture.url)
     
-    logger.info(f"Profile picture updated for {user.username}")
+    logger.info("Profile picture updated for %s", user.username)
     
     return Response({
         'message': 'Profile picture updated successfully.',
@@ -204,9 +214,65 @@ def remove_profile_picture(request):
     user.profile_picture = 'profile_pics/default.jpg'
     user.save()
     
-    logger.info(f"Profile picture removed for {user.username}")
+    logger.info("Profile picture removed for %s", user.username)
     
     return Response({
         'message': 'Profile picture removed successfully.',
         'profile_picture_url': request.build_absolute_uri(user.profile_picture.url)
-    })
\ No newline at end of file
+    })
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def delete_account_view(request):
+    """Delete the account and all its reviews, votes and feedback (password required)"""
+    user = request.user
+    
+    password = request.data.get('password')
+    if not password or not user.check_password(password):
+        return Response({
+            'error': 'Password is incorrect.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    counts = delete_account(user)
+    
+    return Response({
+        'message': 'Account deleted successfully.',
+        'deleted': counts
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser, FormParser])
+def bulk_import_users(request):
+    """
+    Create accounts from a small uploaded CSV or NDJSON file (see
+    provisioning.py); larger files go through manage.py import_users
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({
+            'error': 'No file provided'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    fmt = request.data.get('format') or provisioning.guess_format(upload.name)
+    flags = {
+        name: str(request.data.get(name, '')).lower() in ('1', 'true', 'yes', 'on')
+        for name in ('avatars', 'dry_run')
+    }
+    try:
+        report = provisioning.provision(
+            provisioning.read_rows(upload, fmt), processes=1,
+            max_rows=provisioning.get_setting('SYNC_MAX_ROWS'), **flags,
+        )
+    except provisioning.TooManyRows as e:
+        return Response({
+            'error': f'{e} Import larger files with manage.py import_users.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    logger.info("Bulk import by %s: %s created, %s rejected",
+                request.user.username, report['created'], len(report['errors']))
+    return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK)
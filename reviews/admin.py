@@ -1,12 +1,28 @@
 from django.contrib import admin
-from .models import Review, ReviewHelpful
+from . import duplicates
+from .models import NearDuplicate, Review, ReviewHelpful
+
+class NearDuplicateFilter(admin.SimpleListFilter):
+    title = 'near-duplicate'
+    parameter_name = 'near_duplicate'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Flagged'), ('no', 'Not flagged')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(near_duplicates__isnull=False).distinct()
+        if self.value() == 'no':
+            return queryset.filter(near_duplicates__isnull=True)
+        return queryset
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['service_name', 'user', 'rating', 'is_verified', 'created_at', 'helpful_count']
-    list_filter = ['rating', 'is_verified', 'created_at']
+    list_filter = ['rating', 'is_verified', 'created_at', NearDuplicateFilter]
     search_fields = ['service_name', 'user__username', 'title', 'comment']
     readonly_fields = ['created_at', 'updated_at', 'helpful_count']
+    actions = ['find_near_duplicates']
     
     fieldsets = (
         (None, {
@@ -18,7 +34,21 @@ class ReviewAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Find near-duplicates of selected reviews')
+    def find_near_duplicates(self, request, queryset):
+        rows = list(queryset.values_list('id', 'title', 'comment'))
+        flags = duplicates.check_reviews(rows, force=True)
+        self.message_user(request, f'Checked {len(rows)} reviews: {len(flags)} near-duplicate pairs found.')
+
 @admin.register(ReviewHelpful)
 class ReviewHelpfulAdmin(admin.ModelAdmin):
     list_display = ['review', 'user', 'created_at']
-    list_filter = ['created_at']
\ No newline at end of file
+    list_filter = ['created_at']
+
+@admin.register(NearDuplicate)
+class NearDuplicateAdmin(admin.ModelAdmin):
+    list_display = ['review', 'duplicate_of', 'similarity', 'created_at']
+    list_filter = ['created_at']
+    list_select_related = ['review__user', 'duplicate_of__user']
+    raw_id_fields = ['review', 'duplicate_of']
+    search_fields = ['review__comment', 'review__service_name', 'review__user__username']
@@ -0,0 +1,135 @@
+"""
+Reports computed from the columnar snapshots (see snapshots.py).
+
+Everything here works on memory-mapped .npy columns with vectorized NumPy
+operations and never queries the database, so reports can scan all of
+history without loading the tables the site serves from. Figures are as of
+the last `manage.py snapshot_analytics`.
+
+Periods are 'day', 'week' (starting Monday) or 'month', in UTC. `start`
+and `end` are dates bounding the reviews counted, end exclusive.
+"""
+import numpy as np
+
+PERIODS = ('day', 'week', 'month')
+
+
+def period_ordinals(created_at, period):
+    """Sequential period numbers for datetime64 values"""
+    days = created_at.astype('<M8[D]').astype('<i8')
+    if period == 'day':
+        return days
+    if period == 'week':
+        # Day 0 (1970-01-01) was a Thursday
+        return (days + 3) // 7
+    if period == 'month':
+        return created_at.astype('<M8[M]').astype('<i8')
+    raise ValueError(f'Unknown period "{period}". Choose from: {", ".join(PERIODS)}.')
+
+
+def period_labels(ordinals, period):
+    if period == 'day':
+        starts = ordinals.astype('<M8[D]')
+    elif period == 'week':
+        starts = (ordinals * 7 - 3).astype('<M8[D]')
+    else:
+        starts = ordinals.astype('<M8[M]').astype('<M8[D]')
+    return [str(start) for start in starts]
+
+
+def _stars(ratings):
+    """Ratings clipped to 1..5, as trending.record_reviews does"""
+    # Rows written before ratings were range-checked may hold 0 or less
+    return np.clip(ratings, 1, 5)
+
+
+def _average(total, count):
+    return round(float(total) / int(count), 2) if count else None
+
+
+def rating_distribution(snapshot, service_name=None, start=None, end=None):
+    """Reviews per star rating, overall or for one service"""
+    counts = np.zeros(6, np.int64)
+    code = snapshot.service_code(service_name) if service_name else None
+    if service_name is None or code is not None:
+        for part in snapshot.partitions('reviews', ['service', 'rating'], start, end):
+            ratings = part['rating'] if code is None else part['rating'][part['service'] == code]
+            counts += np.bincount(_stars(ratings), minlength=6)
+
+    reviews = int(counts.sum())
+    return {
+        'reviews': reviews,
+        'average_rating': _average(counts @ np.arange(6), reviews),
+        'counts': {str(stars): int(counts[stars]) for stars in range(1, 6)},
+    }
+
+
+def service_timeseries(snapshot, service_name, period='day', start=None, end=None):
+    """Per period: reviews written, their average rating and helpful votes cast"""
+    code = snapshot.service_code(service_name)
+    if code is None:
+        return []
+
+    reviews = snapshot.columns('reviews', ['service', 'rating', 'created_at'], start, end)
+    mine = reviews['service'] == code
+    review_periods = period_ordinals(reviews['created_at'][mine], period)
+    ratings = _stars(reviews['rating'][mine])
+
+    # Votes in the range, on any of the service's reviews (whenever written)
+    every_review = snapshot.columns('reviews', ['id', 'service'])
+    service_ids = every_review['id'][every_review['service'] == code]
+    votes = snapshot.columns('helpful', ['review_id', 'created_at'], start, end)
+    vote_periods = period_ordinals(votes['created_at'][np.isin(votes['review_id'], service_ids)], period)
+
+    ordinals = np.union1d(review_periods, vote_periods)
+    review_index = np.searchsorted(ordinals, review_periods)
+    counts = np.bincount(review_index, minlength=len(ordinals))
+    totals = np.bincount(review_index, weights=ratings, minlength=len(ordinals))
+    helpful = np.bincount(np.searchsorted(ordinals, vote_periods), minlength=len(ordinals))
+
+    return [
+        {
+            'period': label,
+            'reviews': int(count),
+            'average_rating': _average(total, count),
+            'helpful_votes': int(votes_cast),
+        }
+        for label, count, total, votes_cast in zip(period_labels(ordinals, period), counts, totals, helpful)
+    ]
+
+
+def reviewer_cohorts(snapshot, period='month', start=None, end=None):
+    """
+    Reviewers grouped by the period of their first review. `active[k]` is
+    how many of them reviewed again k periods later (active[0] is everyone).
+    Cohorts whose first period starts in [start, end) are returned.
+    """
+    reviews = snapshot.columns('reviews', ['user_id', 'created_at'])
+    if not len(reviews['user_id']):
+        return []
+    periods = period_ordinals(reviews['created_at'], period)
+    _, user_index = np.unique(reviews['user_id'], return_inverse=True)
+
+    # One entry per (reviewer, period they reviewed in), sorted by reviewer then period
+    first_period, span = periods.min(), periods.max() - periods.min() + 1
+    active = np.unique(user_index * span + (periods - first_period))
+    active_users, active_periods = np.divmod(active, span)
+    active_periods += first_period
+
+    # A reviewer's first entry is their cohort
+    starts = np.flatnonzero(np.r_[True, active_users[1:] != active_users[:-1]])
+    cohort = np.repeat(active_periods[starts], np.diff(np.r_[starts, len(active)]))
+    age = active_periods - cohort
+
+    cohorts, cohort_index = np.unique(cohort, return_inverse=True)
+    width = int(age.max()) + 1
+    matrix = np.bincount(cohort_index * width + age, minlength=len(cohorts) * width).reshape(len(cohorts), width)
+
+    labels = period_labels(cohorts, period)
+    results = []
+    for label, row in zip(labels, matrix):
+        if (start and label < start.isoformat()) or (end and label >= end.isoformat()):
+            continue
+        last = np.flatnonzero(row)[-1]
+        results.append({'cohort': label, 'reviewers': int(row[0]), 'active': row[:last + 1].tolist()})
+    return results
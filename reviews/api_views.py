@@ -1,11 +1,14 @@
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Avg, Count, Q
 from .models import Review
 from .serializers import ReviewSerializer
+from .services import ReviewConflict, submit_review
+from .summaries import MAX_RECENT, MAX_SERVICES, build_summaries
+from . import leaderboard, sync, trending
 
 @api_view(['GET'])
 @authentication_classes([TokenAuthentication])
@@ -58,6 +61,122 @@ def service_review_summary(request, service_name):
         ).data
     })
 
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def service_review_summaries(request):
+    """Summaries for many services at once (the extension's page scan)"""
+    if request.method == 'POST':
+        service_names = request.data.get('services') or []
+        recent = request.data.get('recent', 0)
+    else:
+        service_names = request.query_params.get('services', '').split(',')
+        recent = request.query_params.get('recent', 0)
+    
+    if not isinstance(service_names, list):
+        return Response({
+            'error': 'services must be a list of service names'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    service_names = [str(name).strip() for name in service_names if str(name).strip()]
+    if not service_names:
+        return Response({
+            'error': 'services is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(service_names) > MAX_SERVICES:
+        return Response({
+            'error': f'At most {MAX_SERVICES} services per request'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        recent = min(max(int(recent), 0), MAX_RECENT)
+    except (ValueError, TypeError):
+        return Response({
+            'error': f'recent must be an integer between 0 and {MAX_RECENT}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'summaries': build_summaries(service_names, recent=recent, request=request)
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def trending_services(request):
+    """Services with the most review activity right now (decayed counters)"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), trending.MAX_TOP)
+    except ValueError:
+        return Response({
+            'error': f'limit must be an integer between 1 and {trending.MAX_TOP}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'services': trending.top(limit)})
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def service_leaderboard(request):
+    """Services ranked by Bayesian average rating; ?offset=&limit= page through it"""
+    try:
+        offset = max(int(request.query_params.get('offset', 0)), 0)
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), leaderboard.MAX_PAGE)
+    except ValueError:
+        return Response({
+            'error': f'offset must be a non-negative integer and limit between 1 and {leaderboard.MAX_PAGE}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    count, results = leaderboard.board.page(offset, limit)
+    return Response({'count': count, 'results': results})
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def service_rank(request, service_name):
+    """A service's place on the leaderboard"""
+    entry = leaderboard.board.rank(service_name)
+    if entry is None:
+        return Response({
+            'error': 'Service has no reviews'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(entry)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def review_sync_feed(request):
+    """Review creates, updates and tombstones since the client's sync token"""
+    service_names = sorted({
+        name.strip() for name in request.query_params.get('services', '').split(',')
+        if name.strip()
+    })
+    if not service_names:
+        return Response({
+            'error': 'services is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if len(service_names) > sync.MAX_SERVICES:
+        return Response({
+            'error': f'At most {sync.MAX_SERVICES} services per request'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = min(max(int(request.query_params.get('limit', sync.DEFAULT_LIMIT)), 1), sync.MAX_LIMIT)
+    except ValueError:
+        return Response({
+            'error': f'limit must be an integer between 1 and {sync.MAX_LIMIT}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        feed = sync.build_feed(
+            service_names,
+            token=request.query_params.get('token'),
+            limit=limit,
+            request=request
+        )
+    except sync.InvalidSyncToken as e:
+        # The client has to drop its replica and start a fresh snapshot
+        return Response({
+            'error': str(e),
+            'resync': True
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(feed)
+
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
 @permission_classes([IsAuthenticated])
@@ -72,18 +191,6 @@ def quick_review(request):
             'error': 'service_name and rating are required'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Check if user already reviewed this service
-    existing_review = Review.objects.filter(
-        user=request.user,
-        service_name=service_name
-    ).first()
-    
-    if existing_review:
-        return Response({
-            'error': 'You have already reviewed this service',
-            'existing_review_id': existing_review.id
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
     try:
         rating = int(rating)
         if not 1 <= rating <= 5:
@@ -93,14 +200,21 @@ def quick_review(request):
             'error': 'Invalid rating. Must be an integer between 1 and 5'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    review = Review.objects.create(
-        user=request.user,
-        service_name=service_name,
-        rating=rating,
-        comment=comment
-    )
+    # The duplicate check happens inside the INSERT (see services.py)
+    try:
+        review, created = submit_review(
+            request.user,
+            service_name=service_name,
+            rating=rating,
+            comment=comment
+        )
+    except ReviewConflict as e:
+        return Response({
+            'error': 'You have already reviewed this service',
+            'existing_review_id': e.review.id
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     return Response({
         'message': 'Review submitted successfully',
         'review': ReviewSerializer(review, context={'request': request}).data
-    }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+    }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
\ No newline at end of file
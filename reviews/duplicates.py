@@ -0,0 +1,225 @@
+"""
+Near-duplicate review detection with MinHash and locality-sensitive hashing.
+
+A review's text (title and comment, lowercased, punctuation runs turned
+into single spaces) is cut into overlapping SHINGLE-character shingles. Its
+MinHash signature keeps, for each of NUM_PERM hash functions, the smallest
+hash of any shingle. Two signatures agree at a position with probability
+equal to the Jaccard similarity of their shingle sets, so the share of
+equal positions estimates it.
+
+The signature is cut into BANDS bands and each band is hashed into a
+ReviewBand row. Reviews sharing a band key are candidates: with r =
+NUM_PERM / BANDS positions per band, a pair of similarity s becomes one
+with probability 1 - (1 - s^r)^BANDS (0.95 at s = 0.8 and 0.24 at 0.6 with
+the defaults). Checking a review is one indexed lookup of its BANDS keys
+and a comparison with at most MAX_CANDIDATES signatures, however many
+reviews are indexed.
+
+Candidates estimated at THRESHOLD or above become NearDuplicate rows,
+newer review against older. Reviews are checked once they commit
+(reviews_changed); edits that leave the text alone, such as helpful votes,
+cost one signature comparison. `manage.py backfill_review_signatures`
+indexes existing reviews on a process pool, then flags pairs that share a
+bucket. Texts shorter than MIN_LENGTH are not indexed: short stock phrases
+are expected to repeat.
+
+Changing NUM_PERM, BANDS, SHINGLE or SEED invalidates stored signatures;
+run the backfill with --rebuild afterwards.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.dispatch import receiver
+
+from .models import NearDuplicate, Review, ReviewBand, ReviewChange, ReviewSignature
+from .signals import reviews_changed
+
+DEFAULTS = {
+    'NUM_PERM': 128,
+    'BANDS': 16,
+    'SHINGLE': 5,
+    'THRESHOLD': 0.8,
+    'MIN_LENGTH': 20,
+    'MAX_CANDIDATES': 50,
+    'SEED': 1,
+}
+_SEPARATORS = re.compile(r'[\W_]+')
+PAIR_BATCH = 10000
+LOAD_BATCH = 1000
+
+
+def get_setting(name):
+    return getattr(settings, 'SPAM_DETECTION', {}).get(name, DEFAULTS[name])
+
+
+def normalize(text):
+    return _SEPARATORS.sub(' ', text.lower()).strip()
+
+
+def review_text(title, comment):
+    return f'{title or ""} {comment or ""}'
+
+
+@lru_cache
+def _hash_functions(num_perm, seed):
+    # Multiply-shift hashing: h(x) = ((a * x + b) mod 2^64) >> 32, a odd
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 64, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 64, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def minhash(text):
+    """Signature (uint32 array) of `text`, or None when it is too short"""
+    text = normalize(text)
+    if len(text) < get_setting('MIN_LENGTH'):
+        return None
+    size = get_setting('SHINGLE')
+    shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+    hashes = np.fromiter((_hash64(shingle.encode()) for shingle in shingles), np.uint64, len(shingles))
+    a, b = _hash_functions(get_setting('NUM_PERM'), get_setting('SEED'))
+    return ((hashes[:, None] * a + b) >> np.uint64(32)).min(axis=0).astype('<u4')
+
+
+def band_keys(signature):
+    bands = get_setting('BANDS')
+    if len(signature) % bands:
+        raise ValueError('SPAM_DETECTION NUM_PERM must be a multiple of BANDS.')
+    # Signed: stored in a BigIntegerField
+    return [
+        _hash64(bytes([band]) + rows.tobytes()) - 2 ** 63
+        for band, rows in enumerate(np.split(signature, bands))
+    ]
+
+
+def signatures_for(rows):
+    """{review_id: signature} for (id, title, comment) rows; the CPU-bound part"""
+    signatures = {}
+    for review_id, title, comment in rows:
+        signature = minhash(review_text(title, comment))
+        if signature is not None:
+            signatures[review_id] = signature
+    return signatures
+
+
+def _load(review_ids):
+    review_ids, signatures = list(review_ids), {}
+    for start in range(0, len(review_ids), LOAD_BATCH):
+        rows = ReviewSignature.objects.filter(
+            review_id__in=review_ids[start:start + LOAD_BATCH]
+        ).values_list('review_id', 'minhash')
+        signatures.update((review_id, np.frombuffer(bytes(data), '<u4')) for review_id, data in rows)
+    return signatures
+
+
+def store(signatures, replace=()):
+    """Save signatures and their band keys, dropping what `replace` ids had"""
+    with transaction.atomic():
+        if replace:
+            ReviewBand.objects.filter(review_id__in=replace).delete()
+            ReviewSignature.objects.filter(review_id__in=replace).delete()
+            NearDuplicate.objects.filter(Q(review_id__in=replace) | Q(duplicate_of_id__in=replace)).delete()
+        ReviewSignature.objects.bulk_create([
+            ReviewSignature(review_id=review_id, minhash=signature.tobytes())
+            for review_id, signature in signatures.items()
+        ])
+        ReviewBand.objects.bulk_create([
+            ReviewBand(review_id=review_id, key=key)
+            for review_id, signature in signatures.items()
+            for key in band_keys(signature)
+        ])
+
+
+def _flag(pairs, similarities):
+    threshold = get_setting('THRESHOLD')
+    flags = list({
+        (max(pair), min(pair)): NearDuplicate(
+            review_id=max(pair), duplicate_of_id=min(pair), similarity=float(similarity)
+        )
+        for pair, similarity in zip(pairs, similarities)
+        if similarity >= threshold
+    }.values())
+    NearDuplicate.objects.bulk_create(flags, ignore_conflicts=True)
+    return flags
+
+
+def find_duplicates(signatures):
+    """Flag indexed reviews that nearly match the given {review_id: signature}"""
+    pairs, similarities = [], []
+    for review_id, signature in signatures.items():
+        candidates = list(
+            ReviewBand.objects.filter(key__in=band_keys(signature))
+            .exclude(review_id=review_id)
+            .values_list('review_id', flat=True)
+            .distinct()[:get_setting('MAX_CANDIDATES')]
+        )
+        if not candidates:
+            continue
+        others = _load(candidates)
+        matrix = np.array(list(others.values()))
+        pairs += [(review_id, other) for other in others]
+        similarities += list((matrix == signature).mean(axis=1))
+    return _flag(pairs, similarities)
+
+
+def check_reviews(rows, force=False):
+    """
+    Index (id, title, comment) rows whose text changed, or all of them with
+    `force`, and flag their near-duplicates
+    """
+    rows = list(rows)
+    signatures = signatures_for(rows)
+    stored = _load([review_id for review_id, _, _ in rows])
+    changed = {
+        review_id for review_id, _, _ in rows
+        if force or not np.array_equal(stored.get(review_id), signatures.get(review_id))
+    }
+    signatures = {review_id: signature for review_id, signature in signatures.items() if review_id in changed}
+    store(signatures, replace=changed & stored.keys())
+    return find_duplicates(signatures)
+
+
+@receiver(reviews_changed)
+def check_changed_reviews(sender, changes, **kwargs):
+    review_ids = {review_id for review_id, _, op in changes if op != ReviewChange.DELETE}
+    if review_ids:
+        check_reviews(Review.objects.filter(pk__in=review_ids).values_list('id', 'title', 'comment'))
+
+
+def flag_shared_buckets():
+    """Flag near-duplicates among everything indexed, bucket by bucket (after a backfill)"""
+    shared = ReviewBand.objects.values('key').annotate(reviews=Count('id')).filter(reviews__gt=1).order_by()
+    buckets = defaultdict(list)
+    rows = ReviewBand.objects.filter(key__in=shared.values('key')).values_list('key', 'review_id')
+    for key, review_id in rows.iterator():
+        buckets[key].append(review_id)
+
+    # Like find_duplicates, each review meets at most MAX_CANDIDATES others per bucket
+    limit = get_setting('MAX_CANDIDATES')
+    pairs = set()
+    for members in buckets.values():
+        members.sort()
+        pairs.update(
+            (members[i], members[j]) for i in range(len(members)) for j in range(max(0, i - limit), i)
+        )
+
+    flags, pairs = [], sorted(pairs)
+    for start in range(0, len(pairs), PAIR_BATCH):
+        batch = np.array(pairs[start:start + PAIR_BATCH])
+        signatures = _load(np.unique(batch).tolist())
+        batch = [pair for pair in batch.tolist() if pair[0] in signatures and pair[1] in signatures]
+        left = np.array([signatures[a] for a, _ in batch])
+        right = np.array([signatures[b] for _, b in batch])
+        flags += _flag(batch, (left == right).mean(axis=1) if batch else [])
+    return flags
@@ -0,0 +1,189 @@
+"""
+Write-coalescing ingest for quick_review submissions.
+
+When REVIEW_INGEST['ENABLED'] is on, the quick review endpoints validate the
+payload, append it to an in-process buffer and answer 202 with a receipt id.
+A background thread flushes the buffer with multi-row upserts every
+FLUSH_INTERVAL_MS, or as soon as MAX_BATCH rows are waiting. Conflicts with
+existing reviews are resolved by REVIEW_INGEST['POLICY'] (see services.py).
+
+A receipt id is a random key signed with the submitting user's id and the
+time. The flusher writes each batch's outcomes as ReviewReceipt rows in one
+INSERT, so any worker can answer a status poll. A validly signed id with no
+row yet is still in some worker's buffer: it reads as pending for
+PENDING_SECONDS, then as failed (the worker went away before flushing).
+Rows older than RECEIPT_TTL are ignored, and purged by purge_retention.
+"""
+import atexit
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ReviewReceipt
+from .services import POLICY_REJECT, POLICY_REPLACE, upsert_reviews
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_BATCH': 500,
+    'RECEIPT_TTL': 60 * 60,
+    'PENDING_SECONDS': 60,
+    'POLICY': POLICY_REPLACE,
+}
+
+RECEIPT_PENDING = 'pending'
+RECEIPT_STORED = 'stored'
+RECEIPT_REJECTED = 'rejected'
+RECEIPT_FAILED = 'failed'
+
+
+def get_setting(name):
+    return getattr(settings, 'REVIEW_INGEST', {}).get(name, DEFAULTS[name])
+
+
+def is_enabled():
+    return bool(get_setting('ENABLED'))
+
+
+def _signer(user_id):
+    # Salted per user: another user's receipt id does not verify
+    return signing.TimestampSigner(salt=f'reviews.ingest:{user_id}')
+
+
+def get_receipt(receipt_id, user):
+    """{'status', 'review_id', 'error'} for one of `user`'s receipts, or None"""
+    signer = _signer(user.pk)
+    try:
+        key = signer.unsign(receipt_id, max_age=get_setting('RECEIPT_TTL'))
+    except signing.BadSignature:
+        return None
+
+    receipt = ReviewReceipt.objects.filter(
+        key=key, user=user, created_at__gte=timezone.now() - timedelta(seconds=get_setting('RECEIPT_TTL'))
+    ).values('status', 'review_id', 'error').first()
+    if receipt is not None:
+        return receipt
+    try:
+        signer.unsign(receipt_id, max_age=get_setting('PENDING_SECONDS'))
+    except signing.SignatureExpired:
+        return {'status': RECEIPT_FAILED, 'review_id': None,
+                'error': 'The review was not stored; submit it again'}
+    return {'status': RECEIPT_PENDING, 'review_id': None, 'error': ''}
+
+
+class ReviewBuffer:
+    """Thread-safe buffer of pending reviews with a background flusher."""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._pending = []
+        self._thread = None
+
+    def submit(self, user, data):
+        key = uuid.uuid4().hex
+        row = {
+            'receipt_key': key,
+            'user_id': user.pk,
+            'service_name': data['service_name'],
+            'rating': data['rating'],
+            'title': data.get('title', ''),
+            'comment': data.get('comment', ''),
+            'submitted_at': timezone.now(),
+        }
+        with self._lock:
+            self._pending.append(row)
+            self._ensure_thread()
+            if len(self._pending) >= get_setting('MAX_BATCH'):
+                self._lock.notify()
+        return _signer(user.pk).sign(key)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='review-ingest', daemon=True
+            )
+            self._thread.start()
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _run(self):
+        while True:
+            interval = get_setting('FLUSH_INTERVAL_MS') / 1000
+            with self._lock:
+                self._lock.wait_for(
+                    lambda: len(self._pending) >= get_setting('MAX_BATCH'),
+                    timeout=interval,
+                )
+            self.flush()
+
+    def flush(self):
+        batch = self._take()
+        if not batch:
+            return 0
+
+        close_old_connections()
+        started = time.monotonic()
+        policy = get_setting('POLICY')
+        receipts = []
+        try:
+            stored = _write_batch(batch, policy)
+        except Exception:
+            logger.exception("Coalesced insert of %d reviews failed, retrying row by row", len(batch))
+            stored = {}
+            for row in batch:
+                try:
+                    stored.update(_write_batch([row], policy))
+                except Exception as e:
+                    receipts.append(_receipt(row, RECEIPT_FAILED, error=str(e)))
+
+        for row in batch:
+            review = stored.get((row['service_name'], row['user_id']))
+            if review is None:
+                continue
+            if policy == POLICY_REJECT and review.created_at != row['submitted_at']:
+                receipts.append(_receipt(row, RECEIPT_REJECTED, review.pk,
+                                         'You have already reviewed this service'))
+            else:
+                receipts.append(_receipt(row, RECEIPT_STORED, review.pk))
+
+        try:
+            ReviewReceipt.objects.bulk_create(receipts)
+        except Exception:
+            logger.exception("Could not record %d ingest receipts", len(receipts))
+        finally:
+            close_old_connections()
+
+        logger.debug("Flushed %d reviews in %.1fms", len(batch),
+                     (time.monotonic() - started) * 1000)
+        return len(batch)
+
+
+def _receipt(row, status, review_id=None, error=''):
+    return ReviewReceipt(key=row['receipt_key'], user_id=row['user_id'], status=status,
+                         review_id=review_id, error=error)
+
+
+def _write_batch(batch, policy):
+    """Upsert a batch and return {(service_name, user_id): review}."""
+    results = upsert_reviews(batch, policy)
+    return {key: review for key, (review, created) in results.items()}
+
+
+buffer = ReviewBuffer()
+atexit.register(buffer.flush)
+
+
+def submit(user, data):
+    return buffer.submit(user, data)
@@ -0,0 +1,216 @@
+"""
+Service leaderboard ranked by a Bayesian average rating.
+
+    score = (PRIOR_WEIGHT * PRIOR_MEAN + rating sum) / (PRIOR_WEIGHT + reviews)
+
+A service with a handful of reviews stays close to the prior; only a
+consistent record moves it far from it. The prior is a setting rather than
+the live global mean so that a service's score depends on its own reviews
+alone and can be updated on its own.
+
+ServiceRating holds each service's count, sum and score. When reviews
+commit (reviews_changed), the count and sum changes the writers reported
+are added in SQL, one UPDATE per service, with the score computed in the
+same statement; edits that leave the rating alone (helpful votes) cost
+nothing. Services whose change is not known (an upsert overwrote a review)
+or that have no row yet are re-aggregated instead, which is a range scan of
+the (service_name, rating, id) index. Names are grouped there as the
+database compares them (summaries.service_key).
+
+Each process keeps the board in a SortedList of (-score, service_name):
+a page is an O(log n + k) slice, and "rank of X" is an O(log n) index
+lookup. At most every REFRESH_SECONDS the list catches up with other
+processes' writes by re-reading the rows whose updated_at moved since its
+last sync, less an overlap (an index range read).
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+from django.dispatch import receiver
+from django.utils import timezone
+from sortedcontainers import SortedList
+
+from .models import Review, ServiceRating
+from .signals import reviews_changed
+from .summaries import service_key
+
+DEFAULTS = {
+    'PRIOR_MEAN': 3.0,
+    'PRIOR_WEIGHT': 10,
+    'REFRESH_SECONDS': 2,
+}
+# Rows committed slightly out of updated_at order are read again
+SYNC_OVERLAP = timedelta(seconds=30)
+MAX_PAGE = 100
+
+
+def get_setting(name):
+    return getattr(settings, 'LEADERBOARD', {}).get(name, DEFAULTS[name])
+
+
+def bayesian_score(review_count, rating_sum):
+    weight = get_setting('PRIOR_WEIGHT')
+    return (weight * get_setting('PRIOR_MEAN') + rating_sum) / (weight + review_count)
+
+
+def _ratings(stats):
+    return [
+        ServiceRating(service_name=name, review_count=count, rating_sum=total,
+                      score=bayesian_score(count, total))
+        for name, (count, total) in stats.items()
+    ]
+
+
+def _save(ratings):
+    ServiceRating.objects.bulk_create(
+        ratings, update_conflicts=True, unique_fields=['service_name'],
+        update_fields=['review_count', 'rating_sum', 'score', 'updated_at'],
+    )
+
+
+def _plus(field, delta):
+    """field + delta, floored at 0 (the columns are unsigned on MySQL)"""
+    if delta >= 0:
+        return F(field) + delta
+    return Case(When(**{f'{field}__gte': -delta}, then=F(field) - -delta), default=Value(0))
+
+
+def _apply(service_name, count, total):
+    """Add a known change to the service's row; False when it has none yet"""
+    review_count = _plus('review_count', count)
+    rating_sum = _plus('rating_sum', total)
+    weight = get_setting('PRIOR_WEIGHT')
+    return bool(ServiceRating.objects.filter(service_name=service_name).update(
+        # First: MySQL evaluates later assignments against the updated columns
+        score=(Value(weight * get_setting('PRIOR_MEAN')) + Cast(rating_sum, FloatField()))
+        / (Value(float(weight)) + Cast(review_count, FloatField())),
+        review_count=review_count,
+        rating_sum=rating_sum,
+        updated_at=timezone.now(),
+    ))
+
+
+def recompute(service_names):
+    """Aggregate the services' reviews again and store them"""
+    # One row per name as the database compares them, or the upsert could
+    # carry 'Netflix' and 'netflix' with conflicting numbers
+    stats = {}
+    for name in service_names:
+        stats.setdefault(service_key(name), [name, 0, 0])
+    rows = (
+        Review.objects.filter(service_name__in=service_names)
+        .values('service_name')
+        .annotate(count=Count('id'), total=Sum('rating'))
+        .order_by()
+    )
+    for row in rows:
+        entry = stats.get(service_key(row['service_name']))
+        if entry is not None:
+            entry[1] += row['count']
+            entry[2] += row['total']
+    _save(_ratings({name: (count, total) for name, count, total in stats.values()}))
+
+
+@receiver(reviews_changed)
+def update_services(sender, service_names, rating_deltas=None, **kwargs):
+    rating_deltas = rating_deltas or {}
+    applied, unknown = set(), set()
+    for name in service_names:
+        delta = rating_deltas.get(name)
+        if delta == (0, 0):
+            continue
+        if delta is not None and _apply(name, *delta):
+            applied.add(name)
+        else:
+            unknown.add(name)
+    if unknown:
+        recompute(unknown)
+    if applied or unknown:
+        board.load(ServiceRating.objects.filter(service_name__in=applied | unknown))
+
+
+def rebuild():
+    """Recompute every service (after changing the prior, or to backfill)"""
+    rows = Review.objects.values('service_name').annotate(count=Count('id'), total=Sum('rating')).order_by()
+    stats = {row['service_name']: (row['count'], row['total']) for row in rows.iterator()}
+    ServiceRating.objects.exclude(service_name__in=stats).update(
+        review_count=0, rating_sum=0, updated_at=timezone.now()
+    )
+    _save(_ratings(stats))
+    # Every row's updated_at moved, so other processes reload it all
+    board.reset()
+
+
+class Leaderboard:
+    """This process's ordered copy of ServiceRating"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.order = SortedList()
+            self.entries = {}  # service_name -> (score, review_count, rating_sum)
+            self.synced_to = None
+            self.checked_at = None
+
+    def put(self, service_name, score, review_count, rating_sum):
+        with self.lock:
+            previous = self.entries.pop(service_name, None)
+            if previous is not None:
+                self.order.remove((-previous[0], service_name))
+            if review_count:
+                self.entries[service_name] = (score, review_count, rating_sum)
+                self.order.add((-score, service_name))
+
+    def load(self, rows):
+        with self.lock:
+            for row in rows.values_list('service_name', 'score', 'review_count', 'rating_sum').iterator():
+                self.put(*row)
+
+    def sync(self):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < get_setting('REFRESH_SECONDS'):
+            return
+        with self.lock:
+            started = timezone.now()
+            rows = ServiceRating.objects.all()
+            if self.synced_to is not None:
+                rows = rows.filter(updated_at__gte=self.synced_to - SYNC_OVERLAP)
+            self.load(rows)
+            self.synced_to, self.checked_at = started, now
+
+    def _entry(self, rank, key):
+        score, service_name = -key[0], key[1]
+        _, review_count, rating_sum = self.entries[service_name]
+        return {
+            'rank': rank,
+            'service_name': service_name,
+            'score': round(score, 4),
+            'average_rating': round(rating_sum / review_count, 2),
+            'review_count': review_count,
+        }
+
+    def page(self, offset, limit):
+        self.sync()
+        with self.lock:
+            keys = self.order[offset:offset + limit]
+            return len(self.order), [self._entry(offset + i + 1, key) for i, key in enumerate(keys)]
+
+    def rank(self, service_name):
+        """The service's entry, or None when it has no reviews"""
+        self.sync()
+        with self.lock:
+            entry = self.entries.get(service_name)
+            if entry is None:
+                return None
+            key = (-entry[0], service_name)
+            return {**self._entry(self.order.index(key) + 1, key), 'of': len(self.order)}
+
+
+board = Leaderboard()
@@ -0,0 +1,346 @@
+"""
+Live review updates over Server-Sent Events.
+
+    GET /api/live/reviews/?services=a,b    (ASGI only, see LandingPage/asgi.py)
+
+Publishing happens in whichever process wrote the review: once the
+transaction commits, the new reviews and the refreshed summaries of the
+touched services are sent as JSON datagrams to every worker's Unix socket in
+LIVE_EVENTS['SOCKET_DIR']. Each ASGI worker runs one Broker that reads its
+socket and fans events out to its own subscribers.
+
+Idle connections cost two pending futures each. Heartbeats are pushed by a
+single broker task, and every subscriber has a bounded queue: summaries for
+the same topic are coalesced, other events drop the oldest entry, and a
+subscriber that drops more than MAX_DROPPED events in one stall is
+disconnected.
+"""
+import asyncio
+import atexit
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+from collections import deque
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.dispatch import receiver
+
+from .models import Review, ReviewChange
+from .serializers import ReviewSimpleSerializer
+from .signals import reviews_changed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SOCKET_DIR': '/tmp/verifeed-live',
+    'HEARTBEAT_SECONDS': 15,
+    'QUEUE_SIZE': 64,
+    'MAX_DROPPED': 256,
+    'MAX_TOPICS': 50,
+}
+
+MAX_DATAGRAM = 64 * 1024
+
+
+def get_setting(name):
+    return getattr(settings, 'LIVE_EVENTS', {}).get(name, DEFAULTS[name])
+
+
+def socket_dir():
+    path = Path(get_setting('SOCKET_DIR'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def service_topic(service_name):
+    return f'service:{service_name}'
+
+
+# ---------------------------------------------------------------------------
+# Publishing (any process, sync code)
+# ---------------------------------------------------------------------------
+
+_send_lock = threading.Lock()
+_send_socket = None
+
+
+def _listeners():
+    try:
+        return [entry.path for entry in os.scandir(socket_dir()) if entry.name.endswith('.sock')]
+    except FileNotFoundError:
+        return []
+
+
+def publish(topic, event, data):
+    """Broadcast an event to the subscribers of `topic` in every worker"""
+    global _send_socket
+    if not get_setting('ENABLED'):
+        return
+    paths = _listeners()
+    if not paths:
+        return
+
+    payload = json.dumps(
+        {'topic': topic, 'event': event, 'data': data}, cls=DjangoJSONEncoder
+    ).encode()
+    if len(payload) > MAX_DATAGRAM:
+        logger.warning("Dropping %s event for %s: %d bytes", event, topic, len(payload))
+        return
+
+    with _send_lock:
+        if _send_socket is None:
+            _send_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            _send_socket.setblocking(False)
+        for path in paths:
+            try:
+                _send_socket.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker that owned this socket is gone
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning("Live event socket %s is full, dropping %s", path, event)
+
+
+@receiver(reviews_changed)
+def publish_review_changes(sender, service_names, changes=(), **kwargs):
+    if not get_setting('ENABLED') or not _listeners():
+        return
+    from .summaries import build_summaries
+
+    created = [review_id for review_id, _, op in changes if op == ReviewChange.CREATE]
+    if created:
+        reviews = list(Review.objects.filter(id__in=created).select_related('user'))
+        for review, item in zip(reviews, ReviewSimpleSerializer(reviews, many=True).data):
+            publish(service_topic(review.service_name), 'review', item)
+
+    for name, summary in build_summaries(sorted(service_names)).items():
+        publish(service_topic(name), 'summary', summary)
+
+
+# ---------------------------------------------------------------------------
+# Subscribing (ASGI worker, async code)
+# ---------------------------------------------------------------------------
+
+class Subscription:
+    """Bounded per-connection queue of encoded SSE frames"""
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.dropped = 0  # since the client last caught up
+        self.closed = False
+
+    def push(self, frame, coalesce_key=None):
+        if coalesce_key is not None:
+            for i, (key, _) in enumerate(self.queue):
+                if key == coalesce_key:
+                    self.queue[i] = (coalesce_key, frame)
+                    self.ready.set()
+                    return
+        if len(self.queue) >= get_setting('QUEUE_SIZE'):
+            self.queue.popleft()
+            self.dropped += 1
+            if self.dropped > get_setting('MAX_DROPPED'):
+                self.closed = True
+        self.queue.append((coalesce_key, frame))
+        self.ready.set()
+
+    def drain(self):
+        frames = b''.join(frame for _, frame in self.queue)
+        self.queue.clear()
+        self.ready.clear()
+        # It caught up: only drops within one stall count towards MAX_DROPPED
+        self.dropped = 0
+        return frames
+
+
+class Broker:
+    """Per-process fan-out from the worker's datagram socket to subscribers"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.sequence = 0
+        self.sock = None
+        self.path = None
+        self.heartbeat_task = None
+
+    def start(self):
+        if self.sock is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self.path = str(socket_dir() / f'{os.getpid()}.sock')
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        loop.add_reader(self.sock.fileno(), self._on_readable)
+        self.heartbeat_task = loop.create_task(self._heartbeat())
+        atexit.register(self._unlink)
+
+    def _unlink(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def stop(self):
+        if self.sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.sock.fileno())
+        self.heartbeat_task.cancel()
+        self.sock.close()
+        self.sock = None
+        self._unlink()
+
+    def subscribe(self, topics):
+        self.start()
+        subscription = Subscription(topics)
+        for topic in topics:
+            self.subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for topic in subscription.topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def _on_readable(self):
+        while True:
+            try:
+                payload = self.sock.recv(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                message = json.loads(payload)
+            except ValueError:
+                continue
+            self.dispatch(message['topic'], message['event'], message['data'])
+
+    def dispatch(self, topic, event, data):
+        subscribers = self.subscribers.get(topic)
+        if not subscribers:
+            return
+        self.sequence += 1
+        frame = (
+            f'id: {self.sequence}\nevent: {event}\n'
+            f'data: {json.dumps(data, separators=(",", ":"))}\n\n'
+        ).encode()
+        coalesce_key = (topic, event) if event == 'summary' else None
+        for subscription in subscribers:
+            subscription.push(frame, coalesce_key)
+
+    async def _heartbeat(self):
+        frame = b': ping\n\n'
+        while True:
+            await asyncio.sleep(get_setting('HEARTBEAT_SECONDS'))
+            for subscription in {s for subs in self.subscribers.values() for s in subs}:
+                subscription.push(frame, coalesce_key='heartbeat')
+
+
+broker = Broker()
+
+
+def review_topics(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    names = {
+        name.strip()
+        for value in query.get('services', [])
+        for name in value.split(',')
+        if name.strip()
+    }
+    return [service_topic(name) for name in sorted(names)]
+
+
+def register_route(path, resolver):
+    """
+    Serve `path` as an SSE stream. `resolver(scope)` (sync or async) returns
+    the topics to subscribe to, or raises PermissionError.
+    """
+    LiveEventsApp.routes[path] = resolver
+
+
+class LiveEventsApp:
+    """ASGI wrapper serving the SSE routes and passing everything else to Django"""
+
+    routes = {
+        '/api/live/reviews/': review_topics,
+    }
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        route = self.routes.get(scope.get('path')) if scope['type'] == 'http' else None
+        if route is None:
+            return await self.application(scope, receive, send)
+        if scope['method'] != 'GET':
+            return await self._reject(send, 405, b'Method not allowed')
+
+        try:
+            topics = route(scope)
+            if inspect.isawaitable(topics):
+                topics = await topics
+        except PermissionError:
+            return await self._reject(send, 403, b'Forbidden')
+        if not topics:
+            return await self._reject(send, 400, b'Nothing to subscribe to')
+        if len(topics) > get_setting('MAX_TOPICS'):
+            return await self._reject(send, 400, b'Too many topics')
+        await self._stream(topics, receive, send)
+
+    async def _reject(self, send, status, message):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': message})
+
+    async def _stream(self, topics, receive, send):
+        # Consume the (empty) request body so the next receive() is the disconnect
+        while (await receive()).get('more_body'):
+            pass
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                (b'access-control-allow-origin', b'*'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+
+        subscription = broker.subscribe(topics)
+        disconnect = asyncio.ensure_future(receive())
+        try:
+            while not subscription.closed:
+                waiter = asyncio.ensure_future(subscription.ready.wait())
+                done, _ = await asyncio.wait(
+                    {waiter, disconnect}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnect in done:
+                    waiter.cancel()
+                    return
+                await send({'type': 'http.response.body',
+                            'body': subscription.drain(), 'more_body': True})
+            # Too slow to keep up; the client will reconnect
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnect.cancel()
+            broker.unsubscribe(subscription)
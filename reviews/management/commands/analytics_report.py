@@ -0,0 +1,33 @@
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews import analytics
+from reviews.snapshots import Snapshot
+
+
+class Command(BaseCommand):
+    help = "Print a report computed from the analytics snapshot (no database queries)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('report', choices=['ratings', 'timeseries', 'cohorts'])
+        parser.add_argument('--service', help="Service name (ratings, timeseries)")
+        parser.add_argument('--period', choices=analytics.PERIODS, default=None,
+                            help="Bucket size (timeseries: day, cohorts: month by default)")
+        parser.add_argument('--since', type=date.fromisoformat, help="First day counted (YYYY-MM-DD)")
+        parser.add_argument('--until', type=date.fromisoformat, help="Day after the last one counted")
+        parser.add_argument('--path', help="Snapshot directory (default: ANALYTICS['SNAPSHOT_DIR'])")
+
+    def handle(self, *args, **options):
+        snapshot = Snapshot(options['path'])
+        window = {'start': options['since'], 'end': options['until']}
+        if options['report'] == 'ratings':
+            data = analytics.rating_distribution(snapshot, options['service'], **window)
+        elif options['report'] == 'timeseries':
+            if not options['service']:
+                raise CommandError("timeseries needs --service")
+            data = analytics.service_timeseries(snapshot, options['service'], options['period'] or 'day', **window)
+        else:
+            data = analytics.reviewer_cohorts(snapshot, options['period'] or 'month', **window)
+        self.stdout.write(json.dumps(data, indent=2))
@@ -0,0 +1,60 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from reviews import duplicates
+from reviews.models import NearDuplicate, Review, ReviewBand, ReviewSignature
+
+
+class Command(BaseCommand):
+    help = "Compute MinHash signatures for unindexed reviews on a process pool, then flag near-duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count())
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Drop every signature and flag first (after changing SPAM_DETECTION)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['rebuild']:
+            for model in (NearDuplicate, ReviewBand, ReviewSignature):
+                model.objects.all().delete()
+
+        rows = (
+            Review.objects.filter(signature__isnull=True).order_by('id')
+            .values_list('id', 'title', 'comment')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        chunks = iter(lambda: list(islice(rows, options['chunk_size'])), [])
+
+        # Workers only hash text; this process reads and writes the database.
+        # Forked workers must not share its connection.
+        connections.close_all()
+        indexed = 0
+        with ProcessPoolExecutor(max_workers=options['processes']) as pool:
+            pending = set()
+            for chunk in chunks:
+                pending.add(pool.submit(duplicates.signatures_for, chunk))
+                if len(pending) >= 2 * options['processes']:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    indexed += self.store(done)
+            indexed += self.store(pending)
+
+        flags = duplicates.flag_shared_buckets()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} reviews and flagged {len(flags)} near-duplicates "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+    def store(self, futures):
+        count = 0
+        for future in futures:
+            signatures = future.result()
+            duplicates.store(signatures)
+            count += len(signatures)
+        return count
@@ -0,0 +1,75 @@
+import gzip
+import json
+import time
+
+import msgpack
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from LandingPage.compiled import serialize_list
+from LandingPage.renderers import FastJSONRenderer, MessagePackRenderer, from_columns
+from reviews.models import Feedback, Review
+from reviews.serializers import FeedbackSerializer, ReviewSerializer
+
+from .bench_serializers import create_rows
+
+
+class Command(BaseCommand):
+    help = "Compare JSON and MessagePack (row and columnar) list payloads: size, encode and decode time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Benchmark rows are rolled back at the end
+        with transaction.atomic():
+            self.run(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, rows, repeat):
+        users = create_rows(rows)
+        request = Request(APIRequestFactory().get('/bench/'))
+        request.user = users[0]
+        context = {'request': request}
+
+        cases = [
+            ('reviews', serialize_list(ReviewSerializer, ReviewSerializer.project(
+                Review.objects.filter(service_name__startswith='bench-'), None, request), context)),
+            ('feedback', serialize_list(FeedbackSerializer, FeedbackSerializer.project(
+                Feedback.objects.filter(message__startswith='Feedback '), None, request), context)),
+        ]
+        formats = [
+            ('json', FastJSONRenderer(), None, json.loads),
+            ('msgpack', MessagePackRenderer(), None, self.unpack),
+            ('msgpack columnar', MessagePackRenderer(), 'application/msgpack; layout=columnar',
+             lambda body: from_columns(self.unpack(body))),
+        ]
+        per_k = 1000 / rows
+        for label, data in cases:
+            self.stdout.write(f"{label} ({rows} rows)")
+            for name, renderer, media_type, decode in formats:
+                body = renderer.render(data, media_type, {})
+                if decode(body) != data:
+                    self.stderr.write(self.style.ERROR(f"  {name}: round trip differs"))
+                    continue
+                encode_ms = self.time(lambda: renderer.render(data, media_type, {}), repeat)
+                decode_ms = self.time(lambda: decode(body), repeat)
+                self.stdout.write(
+                    f"  {name:18} {len(body):9,d} B  gzip {len(gzip.compress(body)):8,d} B"
+                    f"   encode {encode_ms * per_k:6.2f} ms/1k   decode {decode_ms * per_k:6.2f} ms/1k"
+                )
+
+    @staticmethod
+    def unpack(body):
+        return msgpack.unpackb(body, raw=False)
+
+    def time(self, function, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - started)
+        return best * 1000
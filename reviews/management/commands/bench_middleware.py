@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = "Per-request cost of the full middleware chain vs the per-route API chain"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--path', default='/api/test-endpoint/')
+
+    def handle(self, *args, **options):
+        route_index = settings.MIDDLEWARE.index('LandingPage.middleware.RouteMiddleware')
+        full_chain = (
+            settings.MIDDLEWARE[:route_index] + settings.ROUTE_MIDDLEWARE[-1][1]
+            + settings.MIDDLEWARE[route_index + 1:]
+        )
+
+        # Browsers and the extension often send a session cookie along
+        session = SessionStore()
+        session['bench'] = True
+        session.create()
+        try:
+            with override_settings(MIDDLEWARE=full_chain):
+                before = self.measure(options['path'], options['requests'], session.session_key)
+            after = self.measure(options['path'], options['requests'], session.session_key)
+        finally:
+            session.delete()
+
+        for label, (per_request, queries) in (('full chain', before), ('per-route', after)):
+            self.stdout.write(f"{label:12} {per_request:8.1f} µs/request   {queries} queries/request")
+        self.stdout.write(f"saved        {before[0] - after[0]:8.1f} µs/request")
+
+    def measure(self, path, requests, session_key):
+        # Client() loads MIDDLEWARE when it is created
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        client.get(path)  # warm up
+        with CaptureQueriesContext(connection) as queries:
+            client.get(path)
+
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+        return elapsed / requests * 1e6, len(queries)
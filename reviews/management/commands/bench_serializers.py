@@ -0,0 +1,87 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from LandingPage.compiled import serialize_list
+from LandingPage.projection import Projection
+from LandingPage.renderers import FastJSONRenderer
+from reviews.models import Feedback, Review
+from reviews.serializers import FeedbackSerializer, ReviewSerializer
+
+User = get_user_model()
+
+
+def create_rows(rows):
+    """`rows` reviews and feedback entries spread over 50 users; returns the users"""
+    users = User.objects.bulk_create([
+        User(username=f'bench-{i}', email=f'bench-{i}@example.com') for i in range(50)
+    ])
+    Review.objects.bulk_create([
+        Review(service_name=f'bench-{i // len(users)}', user=users[i % len(users)],
+               rating=i % 5 + 1, comment=f'Benchmark review {i} — ok')
+        for i in range(rows)
+    ])
+    Feedback.objects.bulk_create([
+        Feedback(user=users[i % len(users)] if i % 7 else None, message=f'Feedback {i}')
+        for i in range(rows)
+    ])
+    return users
+
+
+class Command(BaseCommand):
+    help = "Compare DRF and compiled serialization of review/feedback lists (ms per 1k rows)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Benchmark rows are rolled back at the end
+        with transaction.atomic():
+            self.run(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def run(self, rows, repeat):
+        users = create_rows(rows)
+
+        cases = [
+            ('reviews', ReviewSerializer, Review.objects.filter(service_name__startswith='bench-'), ''),
+            ('reviews ?fields=rating,comment', ReviewSerializer,
+             Review.objects.filter(service_name__startswith='bench-'), 'fields=rating,comment'),
+            ('feedback', FeedbackSerializer, Feedback.objects.filter(message__startswith='Feedback '), ''),
+        ]
+        for label, serializer_class, queryset, query in cases:
+            request = Request(APIRequestFactory().get('/bench/', QUERY_STRING=query))
+            request.user = users[0]
+            context = {'request': request, 'projection': Projection.from_request(request)}
+            queryset = serializer_class.project(queryset, context['projection'], request)
+
+            def drf():
+                data = serializer_class(queryset.all(), many=True, context=context).data
+                return JSONRenderer().render(data)
+
+            def compiled():
+                return FastJSONRenderer().render(serialize_list(serializer_class, queryset.all(), context))
+
+            if drf() != compiled():
+                self.stderr.write(self.style.ERROR(f"{label}: output differs"))
+                continue
+            slow, fast = self.time(drf, repeat), self.time(compiled, repeat)
+            per_k = 1000 / rows
+            self.stdout.write(
+                f"{label:32} DRF {slow * per_k:8.2f} ms/1k   compiled {fast * per_k:7.2f} ms/1k"
+                f"   x{slow / fast:.1f}   (identical bytes)"
+            )
+
+    def time(self, function, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - started)
+        return best * 1000
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews import trending
+
+
+class Command(BaseCommand):
+    help = "Drop services whose trending activity has decayed away (--rebuild recomputes from reviews)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute all counters from recent reviews (after changing HALF_LIFE)")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            trending.rebuild()
+            self.stdout.write(self.style.SUCCESS("Rebuilt trending counters"))
+        count = trending.compact()
+        self.stdout.write(self.style.SUCCESS(f"Dropped {count} inactive services"))
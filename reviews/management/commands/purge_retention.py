@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.retention import get_setting, purge
+
+
+class Command(BaseCommand):
+    help = "Archive and delete rows older than their RETENTION policy, in small batches (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='labels',
+                            help="Only this model label, e.g. reviews.Feedback (repeatable)")
+
+    def handle(self, *args, **options):
+        policies = get_setting('POLICIES')
+        unknown = set(options['labels'] or ()) - set(policies)
+        if unknown:
+            raise CommandError(f"No retention policy for: {', '.join(sorted(unknown))}")
+        for result in purge(options['labels']):
+            self.stdout.write(self.style.SUCCESS(f"{result.label}: {result.report()}"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from reviews import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recompute every service's leaderboard score from its reviews (backfill, or after changing the prior)"
+
+    def handle(self, *args, **options):
+        leaderboard.rebuild()
+        count, _ = leaderboard.board.page(0, 0)
+        self.stdout.write(self.style.SUCCESS(f"Ranked {count} services"))
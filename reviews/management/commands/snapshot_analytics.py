@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews.snapshots import snapshot, snapshot_dir
+
+
+class Command(BaseCommand):
+    help = "Export changed days of reviews, helpful votes and feedback to the columnar analytics snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Snapshot directory (default: ANALYTICS['SNAPSHOT_DIR'])")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        exported = snapshot(options['path'])
+        summary = ', '.join(f"{table}: {days} days" for table, days in exported.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {options['path'] or snapshot_dir()} ({summary}) in {time.monotonic() - started:.1f}s"
+        ))
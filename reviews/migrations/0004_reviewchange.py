@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_alter_review_comment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_id', models.BigIntegerField()),
+                ('service_name', models.CharField(max_length=200)),
+                ('op', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['service_name', 'id'], name='reviews_rev_service_0340db_idx')],
+            },
+        ),
+    ]
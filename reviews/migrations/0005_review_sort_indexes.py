@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_reviewchange'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['service_name', 'created_at', 'id'], name='reviews_rev_service_39ccfa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['service_name', 'helpful_count', 'id'], name='reviews_rev_service_de7165_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['service_name', 'rating', 'id'], name='reviews_rev_service_608072_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='reviews_rev_created_2254c1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['helpful_count', 'id'], name='reviews_rev_helpful_7634cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['rating', 'id'], name='reviews_rev_rating_303390_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_review_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_name', models.CharField(max_length=200, unique=True)),
+                ('log_volume', models.FloatField()),
+                ('log_heat', models.FloatField(db_index=True)),
+                ('last_review_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -21,15 +21,42 @@ class Review(models.Model):
     helpful_count = models.PositiveIntegerField(default=0)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         unique_together = ['service_name', 'user']  # One review per user per service
+        # One per sort mode (see REVIEW_SORTS in views.py), per service and overall
+        indexes = [
+            models.Index(fields=['service_name', 'created_at', 'id']),
+            models.Index(fields=['service_name', 'helpful_count', 'id']),
+            models.Index(fields=['service_name', 'rating', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['helpful_count', 'id']),
+            models.Index(fields=['rating', 'id']),
+        ]
     
     def __str__(self):
          return f"{self.user.username} - {self.comment[:20]}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored service so a move can be logged as a deletion,
+        # and the stored rating so aggregates can apply the difference
+        instance._loaded_service_name = instance.__dict__.get('service_name')
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the row and its ReviewChange entry (post_save) in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
     @property
     def stars_display(self):
-        return '★' * self.rating + '☆' * (5 - self.rating)
+        return self.stars_for(self.rating)
+    
+    @staticmethod
+    def stars_for(rating):
+        return '★' * rating + '☆' * (5 - rating)
 
 class ReviewHelpful(models.Model):
     """Track users who found reviews helpful"""
@@ -46,4 +73,89 @@ class Feedback(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f'Feedback from {self.user.username if self.user else "Anonymous"} - {self.created_at}'
\ No newline at end of file
+        return f'Feedback from {self.user.username if self.user else "Anonymous"} - {self.created_at}'
+
+class ReviewChange(models.Model):
+    """Append-only log of review writes, read by the delta-sync feed"""
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OP_CHOICES = [(CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+
+    review_id = models.BigIntegerField()
+    service_name = models.CharField(max_length=200)
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['service_name', 'id'])]
+
+    def __str__(self):
+        return f'{self.op} review {self.review_id} ({self.service_name})'
+
+class ReviewReceipt(models.Model):
+    """Outcome of a review accepted by the ingest buffer (see ingest.py)"""
+    key = models.CharField(max_length=32, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=8)
+    review_id = models.BigIntegerField(null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.key}: {self.status}'
+
+class ServiceTrend(models.Model):
+    """
+    Exponentially decayed review activity per service (see trending.py).
+
+    Both columns are logs of sums of e^(λ·t) over the service's reviews, with
+    t measured from a fixed epoch, so they only ever grow and never need
+    rescaling: ordering by log_heat ranks services by current decayed heat.
+    """
+    service_name = models.CharField(max_length=200, unique=True)
+    log_volume = models.FloatField()  # reviews
+    log_heat = models.FloatField(db_index=True)  # reviews weighted by rating / 5
+    last_review_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.service_name
+
+
+class ServiceRating(models.Model):
+    """Per-service review count, rating sum and Bayesian score (see leaderboard.py)"""
+    service_name = models.CharField(max_length=200, unique=True)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.service_name}: {self.score:.3f}'
+
+
+class ReviewSignature(models.Model):
+    """MinHash signature of a review's text (see duplicates.py)"""
+    review = models.OneToOneField(Review, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='signature')
+    minhash = models.BinaryField()  # little-endian uint32 per hash function
+
+
+class ReviewBand(models.Model):
+    """LSH index: one row per band of each signature, keyed by the band's hash"""
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='+')
+    key = models.BigIntegerField(db_index=True)
+
+
+class NearDuplicate(models.Model):
+    """A review whose text nearly matches an earlier one"""
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='near_duplicates')
+    duplicate_of = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField()  # estimated Jaccard similarity of the shingles
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['review', 'duplicate_of']
+
+    def __str__(self):
+        return f'Review {self.review_id} ~ {self.duplicate_of_id} ({self.similarity:.2f})'
@@ -0,0 +1,232 @@
+"""
+Retention: archive and purge cold rows of append-mostly tables.
+
+    manage.py purge_retention [--model reviews.Feedback]
+
+RETENTION['POLICIES'] maps a model label to how long its rows stay:
+
+    'reviews.Feedback': {'AGE': timedelta(days=365), 'ARCHIVE': True}
+
+A row is cold once its FIELD (created_at by default) is older than AGE.
+Tables are walked in primary key order, BATCH_SIZE rows at a time, and
+stop at the first warm row, so a run reads the cold head of the table and
+one batch beyond it (ids and creation times grow together). With ARCHIVE,
+each batch is written as gzipped JSON lines, split by month:
+
+    <ARCHIVE_DIR>/<label>/<YYYY-MM>/<first id>-<last id>.jsonl.gz
+
+Archived rows are then deleted with raw DELETE statements of at most
+DELETE_CHUNK rows (DELETE ... LIMIT on MySQL), each its own short
+transaction, with PAUSE_SECONDS between them for replication and other
+writers to catch up. Raw deletes skip signals and cascades, so only list
+tables nothing else points at.
+
+A policy whose rows feed a stored counter names a BEFORE_DELETE function
+(dotted path). Its table is then deleted by selected ids instead, DELETE_CHUNK
+at a time, and the function is called with each chunk's ids in the same
+transaction as the delete. reviews.ReviewHelpful uses forget_helpful_votes:
+a purged vote is taken off its review's helpful_count (logged as a
+ReviewChange UPDATE), since the vote row is what stops the user from voting
+again. Counts therefore cover the votes still retained, and a user whose
+old vote was purged can vote once more without being counted twice.
+
+<label>/STATE.json records the last id archived, written after the batch's
+files and before its deletes. An interrupted run therefore resumes by
+deleting what it had already archived, and never archives a row twice.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from itertools import groupby, takewhile
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Case, F, When
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Review, ReviewChange, ReviewHelpful
+from .signals import record_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ARCHIVE_DIR': None,  # BASE_DIR / 'var' / 'archive'
+    'BATCH_SIZE': 5000,
+    'DELETE_CHUNK': 1000,
+    'PAUSE_SECONDS': 0.05,
+    'POLICIES': {},
+}
+POLICY_DEFAULTS = {
+    'FIELD': 'created_at',
+    'ARCHIVE': True,
+    'BEFORE_DELETE': None,
+}
+STATE = 'STATE.json'
+
+
+def get_setting(name):
+    return getattr(settings, 'RETENTION', {}).get(name, DEFAULTS[name])
+
+
+def archive_dir():
+    return Path(get_setting('ARCHIVE_DIR') or Path(settings.BASE_DIR) / 'var' / 'archive')
+
+
+def _read_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['archived_through']
+    except FileNotFoundError:
+        return None
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class Purge:
+    """One policy's run; the counters are its report"""
+
+    def __init__(self, label, policy):
+        self.label = label
+        self.model = apps.get_model(label)
+        self.field = policy.get('FIELD', POLICY_DEFAULTS['FIELD'])
+        self.archive = policy.get('ARCHIVE', POLICY_DEFAULTS['ARCHIVE'])
+        hook = policy.get('BEFORE_DELETE', POLICY_DEFAULTS['BEFORE_DELETE'])
+        self.before_delete = import_string(hook) if isinstance(hook, str) else hook
+        self.cutoff = timezone.now() - policy['AGE']
+        self.directory = archive_dir() / label
+        self.batch_size = get_setting('BATCH_SIZE')
+        self.chunk = get_setting('DELETE_CHUNK')
+        self.pause = get_setting('PAUSE_SECONDS')
+        self.archived = self.deleted = self.files = self.bytes = 0
+        self.seconds = 0.0
+
+    def run(self):
+        started = time.monotonic()
+        state = self.directory / STATE
+        through = _read_state(state)
+        if through is not None:
+            # Left over from an interrupted run
+            self.delete_through(through)
+
+        while True:
+            rows = list(
+                self.model._default_manager.filter(pk__gt=through or 0)
+                .order_by('pk').values()[:self.batch_size]
+            )
+            cold = list(takewhile(lambda row: row[self.field] < self.cutoff, rows))
+            if not cold:
+                break
+            through = cold[-1][self.model._meta.pk.attname]
+            if self.archive:
+                self.write_archive(cold)
+                self.archived += len(cold)
+                _write(state, json.dumps({'archived_through': through}).encode())
+            self.delete_through(through)
+            if len(cold) < len(rows) or len(rows) < self.batch_size:
+                break
+
+        self.seconds = time.monotonic() - started
+        logger.info("Retention %s: %s", self.label, self.report())
+        return self
+
+    def write_archive(self, rows):
+        pk = self.model._meta.pk.attname
+        for month, group in groupby(rows, lambda row: row[self.field].strftime('%Y-%m')):
+            group = list(group)
+            lines = ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in group)
+            data = gzip.compress(lines.encode(), compresslevel=6)
+            _write(self.directory / month / f'{group[0][pk]}-{group[-1][pk]}.jsonl.gz', data)
+            self.files += 1
+            self.bytes += len(data)
+
+    def delete_through(self, through):
+        """Delete cold rows up to `through` in DELETE_CHUNK statements"""
+        if self.before_delete:
+            return self.delete_selected(through)
+        meta, quote = self.model._meta, connection.ops.quote_name
+        table, pk = quote(meta.db_table), quote(meta.pk.column)
+        column = quote(meta.get_field(self.field).column)
+        condition = f'{pk} <= %s AND {column} < %s ORDER BY {pk} LIMIT %s'
+        if connection.vendor == 'mysql':
+            sql = f'DELETE FROM {table} WHERE {condition}'
+        else:
+            sql = f'DELETE FROM {table} WHERE {pk} IN (SELECT {pk} FROM {table} WHERE {condition})'
+        params = [through, connection.ops.adapt_datetimefield_value(self.cutoff), self.chunk]
+
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                count = cursor.rowcount
+            self.deleted += count
+            if count < self.chunk:
+                return
+            time.sleep(self.pause)
+
+    def delete_selected(self, through):
+        """delete_through() for BEFORE_DELETE policies: select, call the hook, delete"""
+        meta, quote = self.model._meta, connection.ops.quote_name
+        cold = self.model._default_manager.filter(
+            pk__lte=through, **{f'{self.field}__lt': self.cutoff}
+        ).order_by('pk').values_list('pk', flat=True)
+
+        while True:
+            with transaction.atomic():
+                pks = list(cold[:self.chunk])
+                if pks:
+                    self.before_delete(pks)
+                    placeholders = ', '.join(['%s'] * len(pks))
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f'DELETE FROM {quote(meta.db_table)} '
+                            f'WHERE {quote(meta.pk.column)} IN ({placeholders})', pks
+                        )
+                        self.deleted += cursor.rowcount
+            if len(pks) < self.chunk:
+                return
+            time.sleep(self.pause)
+
+    def report(self):
+        rate = self.deleted / self.seconds if self.seconds else 0
+        return (
+            f"{self.archived} rows archived to {self.files} files ({self.bytes / 1024:.0f} KiB), "
+            f"{self.deleted} deleted in {self.seconds:.1f}s ({rate:.0f} rows/s)"
+        )
+
+
+def forget_helpful_votes(pks):
+    """BEFORE_DELETE for reviews.ReviewHelpful: take the votes off helpful_count"""
+    votes = Counter(ReviewHelpful.objects.filter(pk__in=pks).values_list('review_id', flat=True))
+    by_count = defaultdict(list)
+    for review_id, count in votes.items():
+        by_count[count].append(review_id)
+    for count, review_ids in by_count.items():
+        # helpful_count is unsigned on MySQL: never subtract below zero
+        Review.objects.filter(pk__in=review_ids).update(
+            helpful_count=Case(When(helpful_count__gte=count, then=F('helpful_count') - count), default=0),
+            updated_at=Now(),
+        )
+    reviews = list(Review.objects.filter(pk__in=list(votes)).values_list('pk', 'service_name'))
+    record_changes(
+        [(pk, service_name, ReviewChange.UPDATE) for pk, service_name in reviews],
+        rating_deltas={service_name: (0, 0) for _, service_name in reviews},
+    )
+
+
+def purge(labels=None):
+    """Run the configured policies (or just `labels`); -> finished Purge objects"""
+    policies = get_setting('POLICIES')
+    return [Purge(label, policies[label]).run() for label in labels or policies]
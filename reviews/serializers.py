@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from LandingPage.projection import SparseFieldsMixin
 from .models import Review, ReviewHelpful, Feedback
+from .services import ReviewConflict, submit_review
 
 User = get_user_model()
 
@@ -35,19 +38,43 @@ class ReviewSimpleSerializer(serializers.ModelSerializer):
         return None
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = ReviewUserSerializer(read_only=True)
     stars_display = serializers.ReadOnlyField()
     user_has_voted_helpful = serializers.SerializerMethodField()
 
     class Meta:
         model = Review
-        fields = ['id', 'service_name', 'rating', 'comment', 'created_at']
+        fields = ['id', 'service_name', 'rating', 'comment', 'created_at',
+                  'user', 'stars_display', 'user_has_voted_helpful']
         read_only_fields = ['user', 'helpful_count', 'is_verified']
+        expandable_fields = ['user']
+        field_sources = {'stars_display': ['rating'], 'user_has_voted_helpful': []}
+
+    @classmethod
+    def annotate_projection(cls, queryset, fields, request):
+        if 'user_has_voted_helpful' in fields and request and request.user.is_authenticated:
+            queryset = queryset.annotate(voted_helpful=Exists(
+                ReviewHelpful.objects.filter(review=OuterRef('pk'), user=request.user)
+            ))
+        return queryset
+
+    def compile_field(self, name):
+        """Columns and function for computed fields (see LandingPage/compiled.py)"""
+        if name == 'stars_display':
+            return ['rating'], Review.stars_for
+        if name == 'user_has_voted_helpful':
+            request = self.context.get('request')
+            if request and request.user.is_authenticated:
+                return ['voted_helpful'], bool
+            return [], lambda: False
+        return None
 
     def get_user_has_voted_helpful(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            if hasattr(obj, 'voted_helpful'):
+                return obj.voted_helpful
             return ReviewHelpful.objects.filter(
                 review=obj, user=request.user
             ).exists()
@@ -58,23 +85,32 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Rating must be between 1 and 5.")
         return value
 
-    def validate(self, data):
-        request = self.context.get('request')
-        if request and request.method == 'POST':
-            if Review.objects.filter(
-                service_name=data['service_name'],
-                user=request.user
-            ).exists():
-                raise serializers.ValidationError(
-                    "You have already reviewed this service."
-                )
-        return data
-
-
-class FeedbackSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        # Duplicate (service_name, user) reviews are resolved by the
+        # submission policy in the INSERT itself, not by a prior query.
+        user = validated_data.pop('user')
+        try:
+            review, _ = submit_review(user, **validated_data)
+        except ReviewConflict:
+            raise serializers.ValidationError({
+                'non_field_errors': ["You have already reviewed this service."]
+            })
+        return review
+
+
+class FeedbackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = ReviewUserSerializer(read_only=True)
 
     class Meta:
         model = Feedback
         fields = ['id', 'user', 'message', 'created_at']
         read_only_fields = ['user', 'created_at']
+        expandable_fields = ['user']
+
+
+class QuickReviewIngestSerializer(serializers.Serializer):
+    """Synchronous validation for reviews accepted through the ingest buffer."""
+    service_name = serializers.CharField(max_length=200, default='General')
+    rating = serializers.IntegerField(min_value=1, max_value=5)
+    title = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    comment = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
@@ -0,0 +1,189 @@
+"""
+Review submission service.
+
+Reviews are written with a single INSERT ... ON CONFLICT (PostgreSQL, SQLite)
+or INSERT ... ON DUPLICATE KEY UPDATE (MySQL/MariaDB) statement instead of
+the old exists()-then-create round trips. What happens when the user already
+reviewed the service is decided by a policy:
+
+* ``reject``      - keep the stored review and raise ReviewConflict
+* ``replace``     - overwrite rating, title and comment
+* ``keep_newest`` - overwrite only if the submission is newer than the stored row
+
+Backends that support RETURNING hand back the resulting row from the same
+statement; MySQL needs one extra SELECT.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Review, ReviewChange
+from .signals import record_changes
+
+POLICY_REJECT = 'reject'
+POLICY_REPLACE = 'replace'
+POLICY_KEEP_NEWEST = 'keep_newest'
+POLICIES = (POLICY_REJECT, POLICY_REPLACE, POLICY_KEEP_NEWEST)
+
+INSERT_FIELDS = [
+    'service_name', 'user', 'rating', 'title', 'comment',
+    'created_at', 'updated_at', 'is_verified', 'helpful_count',
+]
+UPDATE_FIELDS = ['rating', 'title', 'comment']
+MIN_RATING, MAX_RATING = 1, 5
+
+
+class ReviewConflict(Exception):
+    """The user already has a review for this service and the policy is reject."""
+
+    def __init__(self, review):
+        self.review = review
+        super().__init__(f"Review {review.pk} already exists for {review.service_name}")
+
+
+def default_policy():
+    return getattr(settings, 'REVIEW_SUBMISSION_POLICY', POLICY_REJECT)
+
+
+def submit_review(user, service_name, rating, policy=None, **fields):
+    """
+    Create or update the user's review of a service in one statement.
+
+    Returns (review, created). Raises ReviewConflict under the reject policy.
+    """
+    policy = policy or default_policy()
+    row = dict(fields, user_id=user.pk, service_name=service_name, rating=rating)
+    review, created = upsert_reviews([row], policy)[(service_name, user.pk)]
+    if policy == POLICY_REJECT and not created:
+        raise ReviewConflict(review)
+    return review, created
+
+
+def upsert_reviews(rows, policy=None):
+    """
+    Upsert many reviews with one multi-row statement.
+
+    Each row is a dict with at least service_name, user_id and rating. An
+    optional ``submitted_at`` timestamp orders submissions for keep_newest.
+    Returns {(service_name, user_id): (review, created)}.
+    """
+    policy = policy or default_policy()
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown review submission policy: {policy}")
+
+    now = timezone.now()
+    latest = {}
+    for row in rows:
+        # Raw SQL skips the model's validators
+        if not MIN_RATING <= row['rating'] <= MAX_RATING:
+            raise ValueError(f"Rating must be between {MIN_RATING} and {MAX_RATING}, got {row['rating']}")
+        row = dict(row)
+        row['submitted_at'] = row.get('submitted_at') or now
+        key = (row['service_name'], row['user_id'])
+        previous = latest.get(key)
+        if previous is None or policy == POLICY_REPLACE or (
+            policy == POLICY_KEEP_NEWEST and row['submitted_at'] >= previous['submitted_at']
+        ):
+            latest[key] = row
+
+    sql, params = _build_upsert(list(latest.values()), policy)
+    results = {}
+    with transaction.atomic():
+        if connection.vendor == 'mysql':
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+        else:
+            for review in Review.objects.raw(sql, params):
+                results[(review.service_name, review.user_id)] = review
+
+        missing = [key for key in latest if key not in results]
+        if missing:
+            lookup = Q()
+            for service_name, user_id in missing:
+                lookup |= Q(service_name=service_name, user_id=user_id)
+            for review in Review.objects.filter(lookup):
+                results[(review.service_name, review.user_id)] = review
+
+        outcome = {}
+        changes = []
+        deltas, overwritten = {}, set()
+        for key, review in results.items():
+            submitted_at = latest[key]['submitted_at']
+            created = review.created_at == submitted_at
+            outcome[key] = (review, created)
+            if created:
+                changes.append((review.pk, review.service_name, ReviewChange.CREATE))
+                count, total = deltas.get(review.service_name, (0, 0))
+                deltas[review.service_name] = (count + 1, total + review.rating)
+            elif review.updated_at == submitted_at:
+                changes.append((review.pk, review.service_name, ReviewChange.UPDATE))
+                # The overwritten rating is not returned by the upsert
+                overwritten.add(review.service_name)
+        # Raw upserts bypass post_save, so log them here in the same transaction
+        record_changes(changes, rating_deltas={
+            service_name: delta for service_name, delta in deltas.items() if service_name not in overwritten
+        })
+
+    return outcome
+
+
+def _build_upsert(rows, policy):
+    meta = Review._meta
+    qn = connection.ops.quote_name
+    table = qn(meta.db_table)
+    fields = [meta.get_field(name) for name in INSERT_FIELDS]
+    columns = [field.column for field in fields]
+
+    params = []
+    for row in rows:
+        for field in fields:
+            if field.name in ('created_at', 'updated_at'):
+                value = row['submitted_at']
+            elif field.attname in row:
+                value = row[field.attname]
+            else:
+                value = field.get_default()
+            params.append(field.get_db_prep_save(value, connection))
+
+    placeholders = '(%s)' % ', '.join(['%s'] * len(columns))
+    sql = 'INSERT INTO %s (%s) VALUES %s' % (
+        table,
+        ', '.join(qn(c) for c in columns),
+        ', '.join([placeholders] * len(rows)),
+    )
+
+    updated = [meta.get_field(name).column for name in UPDATE_FIELDS]
+    stamp = qn(meta.get_field('updated_at').column)
+
+    if connection.vendor == 'mysql':
+        # MySQL evaluates assignments left to right, so updated_at goes last
+        # and the IF() conditions still see the stored timestamp.
+        if policy == POLICY_REJECT:
+            assignments = ['%s = %s' % (qn('id'), qn('id'))]
+        elif policy == POLICY_REPLACE:
+            assignments = ['%s = VALUES(%s)' % (qn(c), qn(c)) for c in updated]
+            assignments.append('%s = VALUES(%s)' % (stamp, stamp))
+        else:
+            assignments = [
+                '%s = IF(%s < VALUES(%s), VALUES(%s), %s)' % (qn(c), stamp, stamp, qn(c), qn(c))
+                for c in updated
+            ]
+            assignments.append('%s = GREATEST(%s, VALUES(%s))' % (stamp, stamp, stamp))
+        return sql + ' ON DUPLICATE KEY UPDATE ' + ', '.join(assignments), params
+
+    target = ', '.join(
+        qn(meta.get_field(name).column) for name in ('service_name', 'user')
+    )
+    if policy == POLICY_REJECT:
+        sql += ' ON CONFLICT (%s) DO NOTHING' % target
+    else:
+        assignments = ['%s = excluded.%s' % (qn(c), qn(c)) for c in updated]
+        assignments.append('%s = excluded.%s' % (stamp, stamp))
+        sql += ' ON CONFLICT (%s) DO UPDATE SET %s' % (target, ', '.join(assignments))
+        if policy == POLICY_KEEP_NEWEST:
+            sql += ' WHERE %s.%s < excluded.%s' % (table, stamp, stamp)
+    sql += ' RETURNING %s' % ', '.join(
+        qn(f.column) for f in meta.concrete_fields
+    )
+    return sql, params
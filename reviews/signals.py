@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import Review, ReviewChange
+
+# Sent once the transaction that changed reviews has committed.
+# Receivers get service_names, the set of services whose reviews changed,
+# changes, the (review_id, service_name, op) entries that were logged, and
+# rating_deltas, {service_name: (review count change, rating sum change)}
+# for the services whose change is known; aggregate the others again.
+reviews_changed = Signal()
+
+
+def record_changes(entries, using=None, rating_deltas=None):
+    """
+    Append (review_id, service_name, op) entries to the change log.
+
+    Call this inside the transaction that wrote the reviews; ORM saves and
+    deletes are logged automatically, raw/bulk writes must call it themselves.
+    Pass `rating_deltas` for the services whose count and rating sum change
+    is known.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+    ReviewChange.objects.using(using).bulk_create([
+        ReviewChange(review_id=review_id, service_name=service_name, op=op)
+        for review_id, service_name, op in entries
+    ])
+    service_names = {service_name for _, service_name, _ in entries}
+    transaction.on_commit(
+        lambda: reviews_changed.send(
+            sender=Review, service_names=service_names, changes=entries,
+            rating_deltas=rating_deltas or {},
+        ),
+        using=using,
+    )
+
+
+@receiver(post_save, sender=Review)
+def log_review_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    entries = [(instance.pk, instance.service_name,
+                ReviewChange.CREATE if created else ReviewChange.UPDATE)]
+    # A review moved to another service disappears from the old one
+    previous = getattr(instance, '_loaded_service_name', None)
+    if not created and previous and previous != instance.service_name:
+        entries.append((instance.pk, previous, ReviewChange.DELETE))
+
+    deltas = {}
+    rating = getattr(instance, '_loaded_rating', None)
+    if created:
+        deltas[instance.service_name] = (1, instance.rating)
+    elif previous and rating is not None:
+        if previous != instance.service_name:
+            deltas[previous] = (-1, -rating)
+            deltas[instance.service_name] = (1, instance.rating)
+        else:
+            deltas[previous] = (0, instance.rating - rating)
+    # else: saved without being loaded; the old rating is unknown
+
+    instance._loaded_service_name = instance.service_name
+    instance._loaded_rating = instance.rating
+    record_changes(entries, using, deltas)
+
+
+@receiver(post_delete, sender=Review)
+def log_review_delete(sender, instance, using=None, **kwargs):
+    record_changes([(instance.pk, instance.service_name, ReviewChange.DELETE)], using,
+                   {instance.service_name: (-1, -instance.rating)})
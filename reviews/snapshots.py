@@ -0,0 +1,242 @@
+"""
+Columnar snapshots of the review tables, for reporting off the database.
+
+    manage.py snapshot_analytics
+
+copies Review, ReviewHelpful and Feedback into .npy columns partitioned by
+the UTC day of created_at (ANALYTICS['SNAPSHOT_DIR']):
+
+    services.json                 service names; reviews.service indexes it
+    <table>/MANIFEST.json         {day: {"dir": ..., "signature": [...]}}
+    <table>/<day>@<n>/<col>.npy   one array per column, rows in id order
+
+Runs are incremental. One grouped query asks the database for a signature
+of every day (rows, max id and, for reviews, max updated_at), and only the
+days whose signature changed are exported again. Ids only grow, so an
+insert raises max id and a delete changes the row count or max id; every
+Review save sets updated_at, so edits (and helpful votes, which save the
+review) raise max updated_at.
+
+A day is written to a new directory and the manifest is swapped in with
+os.replace, so a report never sees a half-written day. The directories a
+run replaces are listed in <table>/STALE.json and only removed by the next
+run: a Snapshot maps files as it goes, and one that loaded the old manifest
+must still find them for its whole report. Readers therefore have until the
+next run; run one snapshot at a time, e.g. from cron.
+"""
+import json
+import os
+import shutil
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import Length, TruncDate
+
+from .models import Feedback, Review, ReviewHelpful
+
+MANIFEST = 'MANIFEST.json'
+STALE = 'STALE.json'
+SERVICES = 'services.json'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class Table:
+    def __init__(self, model, columns, changed=None):
+        self.model = model
+        self.columns = columns  # name -> (field name or expression, dtype)
+        self.changed = changed
+
+    def queryset(self):
+        queryset = self.model.objects.all()
+        expressions = {
+            name: source for name, (source, _) in self.columns.items() if not isinstance(source, str)
+        }
+        return queryset.annotate(**expressions) if expressions else queryset
+
+    def field_names(self):
+        return [source if isinstance(source, str) else name for name, (source, _) in self.columns.items()]
+
+
+TABLES = {
+    'reviews': Table(Review, {
+        'id': ('id', '<i8'),
+        'user_id': ('user_id', '<i8'),
+        'service': ('service_name', '<i4'),
+        'rating': ('rating', 'i1'),
+        'helpful_count': ('helpful_count', '<i4'),
+        'is_verified': ('is_verified', '?'),
+        'created_at': ('created_at', '<M8[s]'),
+    }, changed='updated_at'),
+    'helpful': Table(ReviewHelpful, {
+        'id': ('id', '<i8'),
+        'review_id': ('review_id', '<i8'),
+        'user_id': ('user_id', '<i8'),
+        'created_at': ('created_at', '<M8[s]'),
+    }),
+    'feedback': Table(Feedback, {
+        'id': ('id', '<i8'),
+        'user_id': ('user_id', '<i8'),  # -1: anonymous
+        'message_length': (Length('message'), '<i4'),
+        'created_at': ('created_at', '<M8[s]'),
+    }),
+}
+
+
+def snapshot_dir():
+    default = Path(settings.BASE_DIR) / 'var' / 'analytics'
+    return Path(getattr(settings, 'ANALYTICS', {}).get('SNAPSHOT_DIR', default))
+
+
+def _read_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path, data):
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _to_array(values, dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'M':
+        return np.array([int((value - EPOCH).total_seconds()) for value in values], '<i8').astype(dtype)
+    return np.array([-1 if value is None else value for value in values], dtype)
+
+
+def day_signatures(table):
+    """{day: [rows, max id, max changed]} from one grouped query"""
+    aggregates = {'rows': Count('id'), 'last_id': Max('id')}
+    if table.changed:
+        aggregates['changed'] = Max(table.changed)
+    rows = (
+        table.model.objects
+        .annotate(day=TruncDate('created_at', tzinfo=dt_timezone.utc))
+        .values('day').annotate(**aggregates).order_by()
+    )
+    return {
+        row['day'].isoformat(): [
+            row['rows'], row['last_id'],
+            row['changed'].isoformat() if row.get('changed') else None,
+        ]
+        for row in rows
+    }
+
+
+class ServiceNames:
+    """Append-only dictionary of service names"""
+
+    def __init__(self, root):
+        self.path = root / SERVICES
+        self.names = _read_json(self.path, [])
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        self.dirty = False
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+            self.dirty = True
+        return code
+
+    def save(self):
+        if self.dirty:
+            _write_json(self.path, self.names)
+            self.dirty = False
+
+
+def export_day(table, day, directory, services):
+    start = datetime.combine(datetime.fromisoformat(day).date(), time.min, dt_timezone.utc)
+    rows = (
+        table.queryset()
+        .filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+        .order_by('id')
+        .values_list(*table.field_names())
+    )
+    columns = list(zip(*rows.iterator())) or [()] * len(table.columns)
+    shutil.rmtree(directory, ignore_errors=True)  # left by an interrupted run
+    directory.mkdir(parents=True)
+    for (name, (_, dtype)), values in zip(table.columns.items(), columns):
+        if name == 'service':
+            values = [services.code(value) for value in values]
+        np.save(directory / f'{name}.npy', _to_array(values, dtype))
+    return len(columns[0])
+
+
+def snapshot(root=None):
+    """Bring every table's partitions up to date; -> {table: days exported}"""
+    root = Path(root or snapshot_dir())
+    root.mkdir(parents=True, exist_ok=True)
+    services = ServiceNames(root)
+    exported = {}
+    for name, table in TABLES.items():
+        table_dir = root / name
+        table_dir.mkdir(exist_ok=True)
+        manifest = _read_json(table_dir / MANIFEST, {})
+        # Replaced by the previous run; readers of its old manifest are done
+        for directory in _read_json(table_dir / STALE, []):
+            shutil.rmtree(table_dir / directory, ignore_errors=True)
+        signatures = day_signatures(table)
+
+        stale, days, count = [], {}, 0
+        for day, signature in signatures.items():
+            entry = manifest.get(day)
+            if entry is not None and entry['signature'] == signature:
+                days[day] = entry
+                continue
+            generation = int(entry['dir'].rpartition('@')[2]) + 1 if entry else 0
+            directory = f'{day}@{generation}'
+            export_day(table, day, table_dir / directory, services)
+            days[day] = {'dir': directory, 'signature': signature}
+            count += 1
+            if entry:
+                stale.append(entry['dir'])
+        stale += [entry['dir'] for day, entry in manifest.items() if day not in signatures]
+
+        # Partitions can name new services: save those before the manifest
+        services.save()
+        _write_json(table_dir / MANIFEST, dict(sorted(days.items())))
+        _write_json(table_dir / STALE, stale)
+        exported[name] = count
+    return exported
+
+
+class Snapshot:
+    """Read side: memory-mapped columns of the current partitions"""
+
+    def __init__(self, root=None):
+        self.root = Path(root or snapshot_dir())
+        self.services = _read_json(self.root / SERVICES, [])
+        self.manifests = {name: _read_json(self.root / name / MANIFEST, {}) for name in TABLES}
+
+    def service_code(self, service_name):
+        try:
+            return self.services.index(service_name)
+        except ValueError:
+            return None
+
+    def partitions(self, table, columns, start=None, end=None):
+        """Yield {column: memmap} per day, for days in [start, end)"""
+        for day, entry in self.manifests[table].items():
+            if (start and day < start.isoformat()) or (end and day >= end.isoformat()):
+                continue
+            directory = self.root / table / entry['dir']
+            yield {column: np.load(directory / f'{column}.npy', mmap_mode='r') for column in columns}
+
+    def columns(self, table, columns, start=None, end=None):
+        """Whole columns, concatenated across days"""
+        parts = list(self.partitions(table, columns, start, end))
+        return {
+            column: np.concatenate([part[column] for part in parts]) if parts
+            else np.empty(0, TABLES[table].columns[column][1])
+            for column in columns
+        }
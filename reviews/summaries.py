@@ -0,0 +1,104 @@
+"""
+Review summaries for one or many services.
+
+Counts for every requested service come from a single
+GROUP BY service_name, rating query. The optional "recent reviews" slice is
+fetched with a ROW_NUMBER() window partitioned by service, so the whole
+summary costs two queries regardless of how many services are asked for.
+
+Each service also has a summary version, for caches of rendered summaries
+to key on: the id of its latest ReviewChange entry, one indexed read. Every
+review write is logged there, and the database is shared by all workers,
+so none of them keeps serving a summary the others have invalidated.
+"""
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import RowNumber
+
+from .models import Review, ReviewChange
+from .serializers import ReviewSimpleSerializer
+
+MAX_SERVICES = 300
+MAX_RECENT = 20
+
+
+def service_key(name):
+    """
+    `name` as service_name comparisons see it: lowercased where the
+    database's collation folds case (MySQL's defaults), as is elsewhere
+    """
+    return name.lower() if connection.vendor == 'mysql' else name
+
+
+def empty_summary(service_name):
+    return {
+        'service_name': service_name,
+        'average_rating': 0,
+        'total_reviews': 0,
+        'rating_breakdown': {str(i): 0 for i in range(1, 6)},
+    }
+
+
+def build_summaries(service_names, recent=0, request=None):
+    """Return {service_name: summary} for the given names"""
+    names = list(dict.fromkeys(service_names))
+    summaries = {name: empty_summary(name) for name in names}
+    # MySQL's collation matches names case-insensitively, so rows can come
+    # back as 'netflix' for 'Netflix': match them up by service_key()
+    spellings = defaultdict(list)
+    for name in names:
+        spellings[service_key(name)].append(summaries[name])
+
+    rows = (
+        Review.objects.filter(service_name__in=names)
+        .values('service_name', 'rating')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        for summary in spellings.get(service_key(row['service_name']), ()):
+            summary['rating_breakdown'][str(row['rating'])] += row['count']
+
+    for summary in summaries.values():
+        breakdown = summary['rating_breakdown']
+        count = sum(breakdown.values())
+        if count:
+            summary['total_reviews'] = count
+            summary['average_rating'] = round(
+                sum(int(stars) * stars_count for stars, stars_count in breakdown.items()) / count, 1
+            )
+
+    if recent:
+        for summary in summaries.values():
+            summary['recent_reviews'] = []
+        reviews = list(recent_reviews(names, recent))
+        data = ReviewSimpleSerializer(reviews, many=True, context={'request': request}).data
+        for review, item in zip(reviews, data):
+            for summary in spellings.get(service_key(review.service_name), ()):
+                if len(summary['recent_reviews']) < recent:
+                    summary['recent_reviews'].append(item)
+
+    return summaries
+
+
+def recent_reviews(service_names, limit):
+    """Newest `limit` reviews per service, in one windowed query"""
+    return (
+        Review.objects.filter(service_name__in=service_names)
+        .select_related('user')
+        .annotate(recent_rank=Window(
+            RowNumber(),
+            partition_by=F('service_name'),
+            order_by=F('created_at').desc(),
+        ))
+        .filter(recent_rank__lte=limit)
+        .order_by('service_name', 'recent_rank')
+    )
+
+
+def summary_version(service_name):
+    """Opaque token that changes whenever the service's reviews do"""
+    # Like build_summaries, this follows the database's collation
+    return ReviewChange.objects.filter(service_name=service_name).aggregate(last=Max('id'))['last'] or 0
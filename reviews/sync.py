@@ -0,0 +1,143 @@
+"""
+Delta-sync feed over the ReviewChange log.
+
+A client without a token first receives a snapshot of the current reviews of
+its services (paged by review id), then only the changes logged since its
+last token. Tokens are signed and bound to the set of services they were
+issued for.
+
+Change ids are handed out when a row is inserted, not when its transaction
+commits, so a lower id can become visible after a higher one. The feed
+therefore never moves past entries younger than COMMIT_LAG: a page stops
+at the first of them and the client picks them up on its next poll.
+
+Moving a review logs a delete for its old service. Tombstones are only sent
+for reviews no longer in any of the token's services; one that moved
+between two of them comes back as an upsert.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.core import signing
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Review, ReviewChange
+from .serializers import ReviewSimpleSerializer
+
+TOKEN_SALT = 'reviews.sync'
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+MAX_SERVICES = 300
+COMMIT_LAG = timedelta(seconds=5)
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+def _scope(service_names):
+    return hashlib.sha256('\n'.join(sorted(service_names)).encode()).hexdigest()[:16]
+
+
+def make_token(service_names, change_id, snapshot_after=None):
+    return signing.dumps(
+        {'s': _scope(service_names), 'c': change_id, 'r': snapshot_after},
+        salt=TOKEN_SALT, compress=True,
+    )
+
+
+def read_token(token, service_names):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidSyncToken("Malformed sync token")
+    if data.get('s') != _scope(service_names):
+        raise InvalidSyncToken("Sync token was issued for a different set of services")
+    return data['c'], data.get('r')
+
+
+def build_feed(service_names, token=None, limit=DEFAULT_LIMIT, request=None):
+    """Return the next page of changes for the services and a new token"""
+    if token:
+        change_id, snapshot_after = read_token(token, service_names)
+    else:
+        # Changes that may still be committing are replayed after the snapshot
+        change_id = ReviewChange.objects.filter(
+            created_at__lte=timezone.now() - COMMIT_LAG
+        ).aggregate(last=Max('id'))['last'] or 0
+        snapshot_after = 0
+
+    if snapshot_after is not None:
+        return _snapshot_page(service_names, change_id, snapshot_after, limit, request)
+    return _change_page(service_names, change_id, limit, request)
+
+
+def _serialize(reviews, request):
+    data = ReviewSimpleSerializer(reviews, many=True, context={'request': request}).data
+    return [{'op': 'upsert', 'id': review.pk, 'review': item} for review, item in zip(reviews, data)]
+
+
+def _snapshot_page(service_names, change_id, snapshot_after, limit, request):
+    reviews = list(
+        Review.objects.filter(service_name__in=service_names, id__gt=snapshot_after)
+        .select_related('user')
+        .order_by('id')[:limit]
+    )
+    has_more = len(reviews) == limit
+    next_after = reviews[-1].pk if has_more else None
+    return {
+        'changes': _serialize(reviews, request),
+        'token': make_token(service_names, change_id, next_after),
+        'has_more': has_more,
+    }
+
+
+def _change_page(service_names, change_id, limit, request):
+    entries = list(
+        ReviewChange.objects.filter(service_name__in=service_names, id__gt=change_id)
+        .order_by('id')
+        .values_list('id', 'review_id', 'service_name', 'op', 'created_at')[:limit]
+    )
+    has_more = len(entries) == limit
+    settled = timezone.now() - COMMIT_LAG
+    for index, entry in enumerate(entries):
+        if entry[4] > settled:
+            entries, has_more = entries[:index], False
+            break
+    if entries:
+        change_id = entries[-1][0]
+
+    # Collapse to the last operation per review and service within this page.
+    # A move logs UPDATE for the new service and DELETE for the old one.
+    latest = {}
+    for _, review_id, service_name, op, _ in entries:
+        latest.pop((review_id, service_name), None)
+        latest[(review_id, service_name)] = op
+
+    reviews = {
+        review.pk: review
+        for review in Review.objects.filter(
+            id__in={review_id for review_id, _ in latest}, service_name__in=service_names
+        ).select_related('user')
+    }
+
+    changes, upserts, sent = [], [], set()
+    for (review_id, service_name), op in latest.items():
+        if review_id in sent:
+            continue
+        if review_id in reviews:
+            # Still in a synced service (perhaps moved there): send it as it is now
+            upserts.append(reviews[review_id])
+            sent.add(review_id)
+        elif op == ReviewChange.DELETE:
+            changes.append({'op': 'delete', 'id': review_id, 'service_name': service_name})
+            sent.add(review_id)
+        # else: deleted or moved later; its tombstone is further down the log
+    changes.extend(_serialize(upserts, request))
+
+    return {
+        'changes': changes,
+        'token': make_token(service_names, change_id),
+        'has_more': has_more,
+    }
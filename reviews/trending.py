@@ -0,0 +1,144 @@
+"""
+"Trending now": services whose recent review activity is highest.
+
+Every review adds e^(λ·t) to its service's counters, t being its creation
+time in seconds since EPOCH and λ = ln 2 / HALF_LIFE. Measured at any later
+time, a review then weighs half as much per HALF_LIFE elapsed. Since all
+services decay at the same rate, the stored sums rank services correctly
+at any moment without being touched. They are kept as logarithms
+(log-sum-exp), so they stay small for centuries.
+
+- Heat is the sum weighted by rating / 5, so a burst of 5-star reviews
+  trends more than a burst of 1-star ones. The top K is an index scan on
+  ServiceTrend.log_heat.
+- Counters are updated in SQL, without reading them first, once each
+  batch of reviews commits (reviews_changed).
+- manage.py compact_trends drops services whose activity has decayed
+  away, and --rebuild recomputes every counter from the reviews.
+
+Edits and deletions do not subtract: trending is about recent activity.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Review, ReviewChange, ServiceTrend
+from .signals import reviews_changed
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+DEFAULTS = {
+    'HALF_LIFE': timedelta(hours=6),
+    # Services below this many (decayed) reviews are dropped by compaction
+    'MIN_VOLUME': 0.05,
+}
+MAX_TOP = 100
+
+
+def get_setting(name):
+    return getattr(settings, 'TRENDING', {}).get(name, DEFAULTS[name])
+
+
+def decay_rate():
+    return math.log(2) / get_setting('HALF_LIFE').total_seconds()
+
+
+def log_time(moment):
+    """λ·t: the log of one review's weight, relative to EPOCH"""
+    return decay_rate() * (moment - EPOCH).total_seconds()
+
+
+def log_add(a, b):
+    """log(e^a + e^b) without overflow"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _log_add_sql(field, value):
+    value = Value(value, output_field=FloatField())
+    return Greatest(F(field), value) + Ln(1 + Exp(-Abs(F(field) - value)))
+
+
+def record_reviews(reviews):
+    """Add (service_name, rating, created_at) events to the counters"""
+    totals = defaultdict(lambda: [None, None, None])
+    for service_name, rating, created_at in reviews:
+        weight = log_time(created_at)
+        # Rows written before ratings were range-checked may hold 0 or less
+        rating = min(max(rating, 1), 5)
+        entry = totals[service_name]
+        entry[0] = log_add(entry[0], weight)
+        entry[1] = log_add(entry[1], weight + math.log(rating / 5))
+        entry[2] = max(entry[2] or created_at, created_at)
+
+    for service_name, (log_volume, log_heat, last_review_at) in totals.items():
+        _add(service_name, log_volume, log_heat, last_review_at)
+
+
+def _add(service_name, log_volume, log_heat, last_review_at):
+    trends = ServiceTrend.objects.filter(service_name=service_name)
+    update = dict(
+        log_volume=_log_add_sql('log_volume', log_volume),
+        log_heat=_log_add_sql('log_heat', log_heat),
+        last_review_at=Greatest(F('last_review_at'), Value(last_review_at)),
+    )
+    if trends.update(**update):
+        return
+    try:
+        with transaction.atomic():
+            ServiceTrend.objects.create(
+                service_name=service_name, log_volume=log_volume,
+                log_heat=log_heat, last_review_at=last_review_at,
+            )
+    except IntegrityError:
+        # Another worker created it first
+        trends.update(**update)
+
+
+@receiver(reviews_changed)
+def track_new_reviews(sender, changes=(), **kwargs):
+    created = [review_id for review_id, _, op in changes if op == ReviewChange.CREATE]
+    if created:
+        record_reviews(
+            Review.objects.filter(id__in=created).values_list('service_name', 'rating', 'created_at')
+        )
+
+
+def top(limit=10, now=None):
+    """The `limit` hottest services, with their current decayed numbers"""
+    now_log = log_time(now or timezone.now())
+    trends = ServiceTrend.objects.order_by('-log_heat')[:min(limit, MAX_TOP)]
+    return [{
+        'service_name': trend.service_name,
+        'heat': round(math.exp(trend.log_heat - now_log), 4),
+        'recent_reviews': round(math.exp(trend.log_volume - now_log), 4),
+        'average_rating': round(5 * math.exp(trend.log_heat - trend.log_volume), 2),
+        'last_review_at': trend.last_review_at,
+    } for trend in trends]
+
+
+def compact(now=None):
+    """Delete services whose decayed volume fell below MIN_VOLUME; returns the count"""
+    threshold = log_time(now or timezone.now()) + math.log(get_setting('MIN_VOLUME'))
+    deleted, _ = ServiceTrend.objects.filter(log_volume__lt=threshold).delete()
+    return deleted
+
+
+def rebuild(now=None):
+    """Recompute every counter from the reviews that still carry weight"""
+    now = now or timezone.now()
+    horizon = get_setting('HALF_LIFE') * -math.log2(get_setting('MIN_VOLUME') / 100)
+    with transaction.atomic():
+        ServiceTrend.objects.all().delete()
+        record_reviews(
+            Review.objects.filter(created_at__gte=now - horizon)
+            .values_list('service_name', 'rating', 'created_at').iterator()
+        )
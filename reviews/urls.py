@@ -13,18 +13,30 @@ urlpatterns = [
     # Review-related endpoints
     path('reviews/<int:review_id>/helpful/', 
          views.ReviewHelpfulToggleView.as_view(), name='review-helpful-toggle'),
+    path('services/summaries/', 
+         api_views.service_review_summaries, name='service-review-summaries'),
+    path('services/trending/', 
+         api_views.trending_services, name='trending-services'),
+    path('services/leaderboard/', 
+         api_views.service_leaderboard, name='service-leaderboard'),
     path('services/<str:service_name>/reviews/', 
          views.ServiceReviewsView.as_view(), name='service-reviews'),
     path('services/<str:service_name>/summary/', 
          api_views.service_review_summary, name='service-review-summary'),
+    path('services/<str:service_name>/rank/', 
+         api_views.service_rank, name='service-rank'),
     path('users/<int:user_id>/reviews/', 
          views.UserReviewsView.as_view(), name='user-reviews'),
+    path('sync/reviews/', 
+         api_views.review_sync_feed, name='review-sync-feed'),
     path('user/stats/', 
          api_views.user_review_stats, name='user-review-stats'),
     
     # MAIN FEEDBACK/REVIEW ENDPOINTS (frontend calls)
     path('quick-review/', views.quick_review, name='quick-review-main'),
     path('reviews/quick-review/', views.QuickReviewView.as_view(), name='quick-review-class'),
+    path('quick-review/receipts/<str:receipt_id>/', 
+         views.quick_review_receipt, name='quick-review-receipt'),
     
     # PUBLIC ENDPOINT (review summaries)
     path("service_review_summary/<str:service_name>/", 
@@ -1,5 +1,5 @@
-from rest_framework import viewsets, generics, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
+from rest_framework import viewsets, generics, status, permissions, serializers
+from rest_framework.decorators import action, api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.views import APIView
@@ -9,16 +9,57 @@ from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView, CreateView
 from django.contrib import messages
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.db.models import Avg, Count
+from LandingPage.compiled import serialize_list
+from LandingPage.compression import cache_compressed
+from LandingPage.pagination import KeysetPagination
+from LandingPage.projection import Projection, ProjectionMixin
+from LandingPage.throttling import UserBucketThrottle
 from .models import Review, ReviewHelpful, Feedback
-from .serializers import ReviewSerializer, FeedbackSerializer, ReviewSimpleSerializer
+from .serializers import ReviewSerializer, FeedbackSerializer, QuickReviewIngestSerializer
+from .services import ReviewConflict, submit_review
+from .summaries import build_summaries, summary_version
+from . import ingest
+import logging
 
-class ReviewViewSet(viewsets.ModelViewSet):
+logger = logging.getLogger(__name__)
+# Per-request debug records, sampled (see LOGGING in settings)
+request_logger = logging.getLogger('reviews.requests')
+
+# ?sort= modes for review lists; each matches an index on Review
+REVIEW_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'helpful': ('-helpful_count', '-id'),
+    'rating_desc': ('-rating', '-id'),
+    'rating_asc': ('rating', 'id'),
+}
+
+
+def wants_keyset(request):
+    return 'sort' in request.query_params or 'cursor' in request.query_params
+
+
+class ReviewViewSet(ProjectionMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all().select_related('user')
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     authentication_classes = [JWTAuthentication]  # ✅ CONSISTENT JWT AUTH
+    sort_modes = REVIEW_SORTS
+    default_sort = 'newest'
+
+    @property
+    def paginator(self):
+        # ?sort= / ?cursor= page by keyset instead of page number
+        if not hasattr(self, '_paginator') and wants_keyset(self.request):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        # Reads load only what ?fields= / ?expand= render
+        if self.action in ['list', 'retrieve']:
+            return self.project(Review.objects.all(), rows=self.action == 'list')
+        return super().get_queryset()
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -54,20 +95,28 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if not request.user.is_authenticated:
             return Response({'error': 'Authentication required'},
                           status=status.HTTP_401_UNAUTHORIZED)
-        reviews = Review.objects.filter(user=request.user)
-        serializer = self.get_serializer(reviews, many=True)
-        return Response(serializer.data)
+        reviews = self.project(Review.objects.filter(user=request.user))
+        return Response(serialize_list(ReviewSerializer, reviews, self.get_serializer_context()))
 
-class ServiceReviewsView(generics.ListAPIView):
+class ServiceReviewsView(ProjectionMixin, generics.ListAPIView):
     serializer_class = ReviewSerializer
+    sort_modes = REVIEW_SORTS
+    default_sort = 'newest'
 
     def get_queryset(self):
         service_name = self.kwargs['service_name']
-        return Review.objects.filter(service_name=service_name).select_related('user')
+        return Review.objects.filter(service_name=service_name)
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        reviews = self.project(queryset)
+        page = {}
+        if wants_keyset(request):
+            # A page in the requested order instead of every review
+            paginator = KeysetPagination()
+            reviews = paginator.paginate_queryset(reviews, request, self)
+            page['next'] = paginator.get_next_link()
+        reviews = serialize_list(ReviewSerializer, reviews, self.get_serializer_context())
         stats = queryset.aggregate(
             avg_rating=Avg('rating'),
             total_reviews=Count('id'),
@@ -77,7 +126,8 @@ class ServiceReviewsView(generics.ListAPIView):
             rating_breakdown[f'{i}_star'] = queryset.filter(rating=i).count()
         
         return Response({
-            'reviews': serializer.data,
+            'reviews': reviews,
+            **page,
             'statistics': {
                 'average_rating': round(stats['avg_rating'] or 0, 1),
                 'total_reviews': stats['total_reviews'],
@@ -85,16 +135,18 @@ class ServiceReviewsView(generics.ListAPIView):
             }
         })
 
-class UserReviewsView(generics.ListAPIView):
+class UserReviewsView(ProjectionMixin, generics.ListAPIView):
     serializer_class = ReviewSerializer
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
-        return Review.objects.filter(user_id=user_id).select_related('user')
+        return self.project(Review.objects.filter(user_id=user_id), rows=True)
 
 class ReviewHelpfulToggleView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]  
+    throttle_classes = [UserBucketThrottle]
+    throttle_scope = 'review_helpful'
 
     def post(self, request, review_id):
         review = get_object_or_404(Review, id=review_id)
@@ -128,9 +180,29 @@ class ReviewListView(ListView):
     def get_queryset(self):
         return Review.objects.all().select_related('user').order_by('-created_at')
 
+def enqueue_quick_review(request, data):
+    """Validate a quick review and hand it to the ingest buffer (202 + receipt)"""
+    serializer = QuickReviewIngestSerializer(data=data)
+    if not serializer.is_valid():
+        return Response({
+            'error': 'Validation failed',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    receipt_id = ingest.submit(request.user, serializer.validated_data)
+    return Response({
+        'message': 'Review accepted',
+        'receipt_id': receipt_id,
+        'status_url': request.build_absolute_uri(
+            reverse('quick-review-receipt', args=[receipt_id])
+        ),
+    }, status=status.HTTP_202_ACCEPTED)
+
 class QuickReviewView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]  
+    throttle_classes = [UserBucketThrottle]
+    throttle_scope = 'quick_review'
 
     def get(self, request):
         """GET method for testing"""
@@ -142,10 +214,11 @@ class QuickReviewView(APIView):
 
     def post(self, request):
         """POST method for submitting reviews"""
-        print(f"🔍 QuickReviewView POST called by user: {request.user}")
-        print(f"🔍 User authenticated: {request.user.is_authenticated}")
-        print(f"🔍 Request data: {request.data}")
-        print(f"🔍 Request headers: {request.META.get('HTTP_AUTHORIZATION', 'No auth header')}")
+        request_logger.info("QuickReviewView POST by %s", request.user, extra={
+            'authenticated': request.user.is_authenticated,
+            'data': request.data,
+            'authorization': request.META.get('HTTP_AUTHORIZATION'),
+        })
         
         try:
             # Enhanced data handling for different input formats
@@ -170,22 +243,31 @@ class QuickReviewView(APIView):
                     'error': 'Comment is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            if ingest.is_enabled():
+                return enqueue_quick_review(request, data)
+            
             serializer = ReviewSerializer(data=data, context={'request': request})
             if serializer.is_valid():
-                review = serializer.save(user=request.user)
+                try:
+                    review = serializer.save(user=request.user)
+                except serializers.ValidationError as e:
+                    return Response({
+                        'error': 'Validation failed',
+                        'details': e.detail
+                    }, status=status.HTTP_400_BAD_REQUEST)
                 return Response({
                     'message': 'Review submitted successfully',
                     'review': ReviewSerializer(review, context={'request': request}).data
                 }, status=status.HTTP_201_CREATED)
             else:
-                print(f"🔴 Serializer errors: {serializer.errors}")
+                logger.warning("QuickReviewView validation failed", extra={'errors': serializer.errors})
                 return Response({
                     'error': 'Validation failed',
                     'details': serializer.errors
                 }, status=status.HTTP_400_BAD_REQUEST)
                 
         except Exception as e:
-            print(f"🔴 Exception in QuickReviewView: {str(e)}")
+            logger.exception("Exception in QuickReviewView")
             return Response({
                 'error': 'Internal server error',
                 'details': str(e)
@@ -208,9 +290,12 @@ class AddReviewView(CreateView):
 def submit_feedback(request):
     if request.method == 'GET':
         # GET is public - anyone can view feedback
-        qs = Feedback.objects.select_related('user').order_by('-created_at')
-        serializer = FeedbackSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        projection = Projection.from_request(request)
+        qs = FeedbackSerializer.project(Feedback.objects.order_by('-created_at'), projection, request)
+        return Response(serialize_list(FeedbackSerializer, qs, {
+            'request': request,
+            'projection': projection
+        }))
     
     if request.method == 'POST':
         # POST requires authentication
@@ -229,11 +314,13 @@ def submit_feedback(request):
 @api_view(['POST'])
 @authentication_classes([JWTAuthentication]) 
 @permission_classes([IsAuthenticated])
+@throttle_classes([UserBucketThrottle.for_scope('quick_review')])
 def quick_review(request):
     """Main quick review endpoint - matches frontend API call"""
-    print(f"🔍 quick_review called by: {request.user}")
-    print(f"🔍 Authenticated: {request.user.is_authenticated}")
-    print(f"🔍 Data: {request.data}")
+    request_logger.info("quick_review called by %s", request.user, extra={
+        'authenticated': request.user.is_authenticated,
+        'data': request.data,
+    })
     
     try:
         data = request.data.copy()
@@ -245,9 +332,12 @@ def quick_review(request):
         if not data.get('service_name'):
             data['service_name'] = 'General'
         
+        if ingest.is_enabled():
+            return enqueue_quick_review(request, data)
+        
         # Create review directly 
-        review = Review.objects.create(
-            user=request.user,
+        review, created = submit_review(
+            request.user,
             service_name=data.get('service_name', 'General'),
             rating=int(data.get('rating', 5)),
             comment=data.get('comment', ''),
@@ -264,36 +354,42 @@ def quick_review(request):
                 'user': request.user.username,
                 'created_at': review.created_at
             }
-        }, status=status.HTTP_201_CREATED)
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
         
+    except ReviewConflict as e:
+        return Response({
+            'error': 'You have already reviewed this service',
+            'existing_review_id': e.review.id
+        }, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
-        print(f"🔴 Error in quick_review: {str(e)}")
+        logger.exception("Error in quick_review")
         return Response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+def quick_review_receipt(request, receipt_id):
+    """Poll the status of a review accepted by the ingest buffer"""
+    receipt = ingest.get_receipt(receipt_id, request.user)
+    if receipt is None:
+        return Response({'error': 'Unknown receipt'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'receipt_id': receipt_id,
+        'status': receipt['status'],
+        'review_id': receipt['review_id'],
+        'error': receipt['error'] or None,
+    })
+
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@cache_compressed(lambda request, service_name: f'summary:{summary_version(service_name)}')
 def service_review_summary(request, service_name):
     """Public endpoint for service review summaries"""
-    reviews = Review.objects.filter(service_name=service_name).select_related('user')
-    
-    stats = reviews.aggregate(
-        avg_rating=Avg("rating"),
-        total_reviews=Count("id"),
-    )
-    
-    rating_breakdown = {str(i): reviews.filter(rating=i).count() for i in range(1, 6)}
-    
-    recent = reviews.order_by('-created_at')[:20]
-    
-    return Response({
-        "service_name": service_name,
-        "average_rating": round(stats["avg_rating"] or 0, 1),
-        "total_reviews": stats["total_reviews"],
-        "rating_breakdown": rating_breakdown,
-        "recent_reviews": ReviewSimpleSerializer(recent, many=True, context={'request': request}).data,
-    })
+    summary = build_summaries([service_name], recent=20, request=request)[service_name]
+    return Response(summary)
 
 @api_view(['POST', 'GET'])
 @permission_classes([AllowAny])
@@ -0,0 +1,33 @@
+from django.contrib import admin
+from .models import DetectionJob, MediaFingerprint, UploadSession, VerificationResult
+
+@admin.register(VerificationResult)
+class VerificationResultAdmin(admin.ModelAdmin):
+    list_display = ['content_sha256', 'source_url', 'verdict', 'confidence', 'model_version', 'created_at', 'expires_at']
+    list_filter = ['verdict', 'model_version', 'created_at']
+    search_fields = ['content_sha256', 'source_url']
+    readonly_fields = ['created_at']
+
+
+@admin.register(MediaFingerprint)
+class MediaFingerprintAdmin(admin.ModelAdmin):
+    list_display = ['result', 'frame_index', 'phash', 'dhash', 'created_at']
+    raw_id_fields = ['result']
+
+
+@admin.register(DetectionJob)
+class DetectionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'priority', 'progress', 'created_at', 'finished_at']
+    list_filter = ['status', 'priority', 'created_at']
+    search_fields = ['id', 'user__username', 'source_url', 'content_sha256']
+    raw_id_fields = ['user', 'result']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'filename', 'status', 'offset', 'length', 'created_at', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['id', 'user__username', 'filename']
+    raw_id_fields = ['user', 'job']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class VerificationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'verification'
+
+    def ready(self):
+        from reviews.live import register_route
+        from .hashindex import get_index
+        from .jobs import job_topics
+
+        # Map the perceptual hash index once per worker process
+        get_index()
+        register_route('/api/live/jobs/', job_topics)
@@ -0,0 +1,319 @@
+"""
+Batch verification for a page worth of media.
+
+prepare() settles as much of a batch as it can without the detector:
+
+1. entries are deduplicated by content hash, or by normalized URL when no
+   hash is known. An upload is hashed (a differing sha256 is rejected) and
+   its URL, if any, dropped: the file is what gets analysed;
+2. cached verdicts for every distinct item come back in one query. A bare
+   sha256 that misses is reported as "uncached" and never analysed;
+3. the misses go through pre-checks evaluated over the whole batch at once
+   (dimensions, bytes per pixel, JPEG quality, EXIF and PNG text): images
+   too small to analyse are skipped, files whose metadata names an image
+   generator are settled as fake, and uploads near-identical to analysed
+   media reuse its verdict. Pre-check verdicts are stored under the
+   PREFILTER_VERSION model version, so they answer this batch but are never
+   served from the cache as detector results;
+4. whatever is left becomes one DetectionJob per distinct item.
+
+stream() then yields NDJSON, one line per client id and state: settled items
+at once and a "queued" line with the job id for the rest. Under ASGI,
+astream() also yields a final line as each job finishes, until the wait
+budget runs out; it sleeps with asyncio, so following jobs holds no thread.
+Under WSGI there is no such wait. Clients keep the last line they saw per id
+and follow unfinished jobs through the job API.
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import phash, verdicts
+from .detectors import Detection
+from .models import DetectionJob, VerificationResult
+from .serializers import VerificationResultSerializer
+
+DEFAULT_MAX_ITEMS = 100
+DEFAULT_WAIT_SECONDS = 20
+POLL_INTERVAL = 0.25
+
+MIN_SIDE = 64
+MIN_BITS_PER_PIXEL = 0.15
+MIN_JPEG_QUALITY = 40
+GENERATOR_MARKERS = (
+    'stable diffusion', 'midjourney', 'dall-e', 'dall·e', 'novelai',
+    'comfyui', 'automatic1111', 'invokeai', 'adobe firefly',
+)
+# PNG text chunks written by Stable Diffusion front-ends
+GENERATOR_TEXT_KEYS = ('parameters', 'prompt', 'workflow', 'sd-metadata')
+EDITOR_MARKERS = ('photoshop', 'gimp', 'snapseed', 'facetune', 'lightroom', 'picsart')
+TEXT_KEYS = ('Software', 'Comment', 'comment', 'Description', 'Author')
+
+EXIF_SOFTWARE = 0x0131
+EXIF_ARTIST = 0x013B
+EXIF_DESCRIPTION = 0x010E
+
+# Luminance table from ITU-T T.81 Annex K; libjpeg scales it by quality
+_JPEG_LUMA_MEAN = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+]).mean()
+
+SKIPPED = 'skipped'
+CACHED = 'cached'
+PREFILTERED = 'prefiltered'
+QUEUED = 'queued'
+UNCACHED = 'uncached'
+PREFILTER_VERSION = 'prefilter'
+
+
+def get_setting(name, default):
+    return getattr(settings, 'VERIFICATION', {}).get(name, default)
+
+
+def max_items():
+    return get_setting('BATCH_MAX_ITEMS', DEFAULT_MAX_ITEMS)
+
+
+@dataclass
+class Item:
+    """One distinct media item and the client ids that referred to it"""
+    key: str
+    ids: list = field(default_factory=list)
+    sha256: str = ''
+    url: str = ''
+    media: object = None
+    width: int = 0
+    height: int = 0
+    size: int = 0
+    quality: int = 0
+    is_jpeg: bool = False
+    metadata: str = ''
+    generator_keys: bool = False
+    flags: list = field(default_factory=list)
+    status: str = ''
+    result: object = None
+    job: object = None
+
+
+def collect(entries):
+    """Deduplicate validated entries into Items"""
+    items = {}
+    for entry in entries:
+        media = entry.get('media')
+        try:
+            sha256 = verdicts.content_hash(media, entry.get('sha256'))
+        except verdicts.HashMismatch as e:
+            raise verdicts.HashMismatch(f'Item "{entry["id"]}": {e}') from None
+        url = (entry.get('url') or '') if media is None else ''
+        key = f'sha256:{sha256}' if sha256 else f'url:{verdicts.hash_url(url)}'
+
+        item = items.get(key)
+        if item is None:
+            item = items[key] = Item(key=key, sha256=sha256)
+        item.ids.append(entry['id'])
+        item.media = item.media or media
+        # Never store a URL next to an upload's verdict
+        item.url = '' if item.media is not None else item.url or url
+        item.width = item.width or entry.get('width') or 0
+        item.height = item.height or entry.get('height') or 0
+        item.size = item.size or entry.get('bytes') or 0
+    return list(items.values())
+
+
+def resolve_cached(items):
+    """Attach live cached results to items, with one query for the whole batch"""
+    shas = [item.sha256 for item in items if item.sha256]
+    url_hashes = {verdicts.hash_url(item.url): item for item in items if item.url}
+    if not shas and not url_hashes:
+        return
+    results = VerificationResult.objects.filter(
+        Q(content_sha256__in=shas) | Q(source_url_hash__in=list(url_hashes)),
+        model_version=verdicts.current_model_version(),
+        expires_at__gt=timezone.now(),
+    ).order_by('created_at')
+
+    by_sha, by_url = {}, {}
+    for result in results:
+        if result.content_sha256:
+            by_sha[result.content_sha256] = result
+        if result.source_url_hash:
+            by_url[result.source_url_hash] = result
+    for item in items:
+        result = by_sha.get(item.sha256) or (by_url.get(verdicts.hash_url(item.url)) if item.url else None)
+        if result is not None:
+            item.status, item.result = CACHED, result
+
+
+def inspect(item):
+    """Read dimensions and metadata from an upload's header without decoding it"""
+    media = item.media
+    item.size = getattr(media, 'size', None) or item.size
+    try:
+        image = Image.open(media)
+        item.width, item.height = image.size
+        item.is_jpeg = image.format == 'JPEG'
+        exif = image.getexif()
+        text = [str(exif.get(tag, '')) for tag in (EXIF_SOFTWARE, EXIF_ARTIST, EXIF_DESCRIPTION)]
+        text += [str(image.info[key]) for key in TEXT_KEYS if key in image.info]
+        item.metadata = ' '.join(text)
+        item.generator_keys = any(key in image.info for key in GENERATOR_TEXT_KEYS)
+        tables = getattr(image, 'quantization', None)
+        if item.is_jpeg and tables:
+            scale = np.mean(tables[0]) / _JPEG_LUMA_MEAN * 100
+            item.quality = int(round((200 - scale) / 2 if scale <= 100 else 5000 / scale))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError, SyntaxError):
+        pass
+    media.seek(0)
+
+
+def prechecks(items):
+    """Boolean flag arrays for the metadata heuristics, one entry per item"""
+    width = np.array([item.width for item in items], dtype=np.int64)
+    height = np.array([item.height for item in items], dtype=np.int64)
+    size = np.array([item.size for item in items], dtype=np.float64)
+    quality = np.array([item.quality for item in items], dtype=np.int64)
+    text = np.char.lower(np.array([item.metadata for item in items], dtype=str))
+
+    known = (width > 0) & (height > 0)
+    short_side = np.minimum(width, height)
+    bits_per_pixel = np.divide(size * 8, width * height, out=np.full(len(items), np.inf),
+                               where=known & (size > 0))
+
+    def mentions(markers):
+        found = np.zeros(len(items), dtype=bool)
+        for marker in markers:
+            found |= np.char.find(text, marker) >= 0
+        return found
+
+    return {
+        'too-small': known & (short_side < MIN_SIDE),
+        'generator-metadata': mentions(GENERATOR_MARKERS)
+                              | np.array([item.generator_keys for item in items], dtype=bool),
+        'edited': mentions(EDITOR_MARKERS),
+        'heavy-compression': (bits_per_pixel < MIN_BITS_PER_PIXEL)
+                             | ((quality > 0) & (quality < MIN_JPEG_QUALITY)),
+        'generator-dimensions': known & (short_side >= 512) & (width % 64 == 0) & (height % 64 == 0),
+    }
+
+
+def prefilter(items):
+    """Skip or settle misses from their metadata flags alone"""
+    for item in items:
+        if item.media is not None:
+            inspect(item)
+    flags = prechecks(items)
+    for position, item in enumerate(items):
+        item.flags = [name for name, values in flags.items() if values[position]]
+
+    for item in items:
+        if 'too-small' in item.flags:
+            item.status = SKIPPED
+        elif 'generator-metadata' in item.flags:
+            detection = Detection(verdict=VerificationResult.FAKE, confidence=0.99,
+                                  details={'prefilter': 'generator-metadata'})
+            item.status = PREFILTERED
+            item.result = verdicts.store(detection, sha256=item.sha256, url=item.url,
+                                         model_version=PREFILTER_VERSION)
+
+
+def reuse_near_duplicates(items):
+    uploads = [item for item in items if item.media is not None]
+    fingerprints = [phash.hash_media(item.media) for item in uploads]
+    for item, prints, (original, distance) in zip(
+        uploads, fingerprints, verdicts.find_near_duplicates(fingerprints)
+    ):
+        if original is not None:
+            item.status = CACHED
+            item.result = verdicts.reuse_verdict(original, distance, prints, sha256=item.sha256, url=item.url)
+
+
+def queue_jobs(user, items):
+    jobs = DetectionJob.objects.bulk_create([
+        DetectionJob(
+            user=user,
+            priority=DetectionJob.PRIORITY_INTERACTIVE,
+            source_url=item.url,
+            content_sha256=item.sha256,
+            media=item.media,
+        )
+        for item in items
+    ])
+    for item, job in zip(items, jobs):
+        item.status, item.job = QUEUED, job
+
+
+def prepare(user, entries):
+    """Settle what can be settled up front and queue the rest; returns the Items"""
+    items = collect(entries)
+    resolve_cached(items)
+    for item in items:
+        if not item.status and item.media is None and not item.url:
+            item.status = UNCACHED
+    misses = [item for item in items if not item.status]
+    if misses:
+        prefilter(misses)
+        misses = [item for item in misses if not item.status]
+    if misses:
+        reuse_near_duplicates(misses)
+        misses = [item for item in misses if not item.status]
+    if misses:
+        queue_jobs(user, misses)
+
+    # Near-duplicate reuses are hits too; queued items are counted by their job
+    hits = sum(1 for item in items if item.status == CACHED)
+    verdicts.record_lookup(True, hits)
+    verdicts.record_lookup(False, sum(1 for item in items if item.status not in (CACHED, QUEUED)))
+    return items
+
+
+def _lines(item, status):
+    row = {'status': status, 'flags': item.flags}
+    if item.result is not None:
+        row['result'] = VerificationResultSerializer(item.result).data
+    if item.job is not None:
+        row['job'] = str(item.job.pk)
+        if item.job.error:
+            row['error'] = item.job.error
+    for client_id in item.ids:
+        yield json.dumps(dict(row, id=client_id), cls=JSONEncoder) + '\n'
+
+
+def stream(items):
+    """NDJSON lines for prepared items as they stand"""
+    for item in items:
+        yield from _lines(item, item.status)
+
+
+def _finished(job_ids):
+    return list(
+        DetectionJob.objects.filter(pk__in=job_ids, status__in=DetectionJob.FINISHED)
+        .select_related('result')
+    )
+
+
+async def astream(items, wait):
+    """stream(), then a line per queued job as it finishes, for up to `wait` seconds"""
+    for line in stream(items):
+        yield line
+
+    pending = {item.job.pk: item for item in items if item.status == QUEUED}
+    deadline = time.monotonic() + wait
+    while pending and time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        for job in await sync_to_async(_finished)(list(pending)):
+            item = pending.pop(job.pk)
+            item.job, item.result = job, job.result
+            for line in _lines(item, job.status):
+                yield line
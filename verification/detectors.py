@@ -0,0 +1,64 @@
+"""
+Pluggable deepfake detectors.
+
+The backend in use is VERIFICATION['DETECTOR'] (a dotted path). A detector
+receives the media's SHA-256, its source URL and, when the bytes are
+available, a binary file object, and returns a Detection.
+"""
+import hashlib
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class Detection:
+    verdict: str
+    confidence: float
+    details: dict = field(default_factory=dict)
+
+
+class BaseDetector:
+    model_version = 'base'
+
+    def detect(self, sha256=None, url=None, fileobj=None, progress=None):
+        """
+        Analyse one media item.
+
+        `progress`, when given, is called with a float in [0, 1] as analysis
+        advances.
+        """
+        raise NotImplementedError
+
+
+class StubDetector(BaseDetector):
+    """Deterministic stand-in for local development and tests"""
+    model_version = 'stub-1'
+
+    def detect(self, sha256=None, url=None, fileobj=None, progress=None):
+        key = sha256 or hashlib.sha256((url or '').encode()).hexdigest()
+        score = int(key[:8], 16) / 0xFFFFFFFF
+        if progress:
+            progress(1.0)
+        if score >= 0.7:
+            verdict = 'fake'
+        elif score <= 0.3:
+            verdict = 'real'
+        else:
+            verdict = 'uncertain'
+        confidence = round(abs(score - 0.5) * 2, 3)
+        return Detection(verdict=verdict, confidence=confidence, details={'score': round(score, 3)})
+
+
+_detector = None
+
+
+def get_detector():
+    global _detector
+    if _detector is None:
+        path = getattr(settings, 'VERIFICATION', {}).get(
+            'DETECTOR', 'verification.detectors.StubDetector'
+        )
+        _detector = import_string(path)()
+    return _detector
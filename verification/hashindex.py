@@ -0,0 +1,255 @@
+"""
+Multi-index hashing (MIH) over 64-bit perceptual hashes.
+
+Each hash is split into four 16-bit chunks. Two hashes within Hamming
+distance r must agree to within r // 4 bits on at least one chunk, so a query
+only enumerates the few chunk values near its own, finds them with a binary
+search in per-chunk sorted tables and checks the candidates with a vectorized
+popcount.
+
+On-disk layout (VERIFICATION['PHASH_INDEX_DIR']):
+
+    CURRENT              name of the live generation directory
+    gen-<n>/hashes.npy   uint64 hashes            (memory-mapped)
+    gen-<n>/ids.npy      int64 VerificationResult ids
+    gen-<n>/keys<k>.npy  sorted uint16 values of chunk k
+    gen-<n>/order<k>.npy positions sorting chunk k
+    gen-<n>/delta.bin    (hash, id) pairs appended since the build
+
+Workers map the base arrays at startup and pick up new delta records on each
+query. `manage.py build_phash_index` folds the delta into a new generation.
+Appends and builds hold an flock on <root>/LOCK, and an append re-reads
+CURRENT under it, so no record lands in a generation that was just retired.
+"""
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no cross-process locking (Windows)
+    fcntl = None
+
+CHUNKS = 4
+CHUNK_BITS = 16
+DELTA_DTYPE = np.dtype([('hash', '<u8'), ('id', '<i8')])
+_lock = threading.Lock()
+
+
+def index_dir():
+    default = Path(settings.BASE_DIR) / 'var' / 'phash'
+    return Path(getattr(settings, 'VERIFICATION', {}).get('PHASH_INDEX_DIR', default))
+
+
+@contextmanager
+def _locked(root):
+    """Exclusive lock on the index directory, across threads and processes"""
+    root.mkdir(parents=True, exist_ok=True)
+    with _lock, open(root / 'LOCK', 'a') as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+def to_unsigned(value):
+    return value & 0xFFFFFFFFFFFFFFFF
+
+
+def to_signed(value):
+    """Hashes are stored in signed BIGINT columns"""
+    value = to_unsigned(value)
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _chunks(hashes):
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    shifts = np.arange(CHUNKS, dtype=np.uint64) * np.uint64(CHUNK_BITS)
+    return ((hashes[..., None] >> shifts) & np.uint64(0xFFFF)).astype(np.uint16)
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius):
+    """All 16-bit masks with at most `radius` bits set"""
+    masks = [0]
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), flips):
+            masks.append(sum(1 << bit for bit in bits))
+    return np.array(masks, dtype=np.uint16)
+
+
+def _expand(starts, stops):
+    """Concatenation of arange(start, stop) for every pair, without a Python loop"""
+    lengths = stops - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if not len(lengths):
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class HashIndex:
+    def __init__(self, root=None):
+        self.root = Path(root or index_dir())
+        self.generation = None
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.keys = []
+        self.orders = []
+        self.delta = np.empty(0, dtype=DELTA_DTYPE)
+        self.delta_offset = 0
+        self.refresh()
+
+    # -- loading -----------------------------------------------------------
+
+    def _current(self):
+        try:
+            return (self.root / 'CURRENT').read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        generation = self._current()
+        if generation != self.generation:
+            self._load(generation)
+        self._read_delta()
+
+    def _load(self, generation):
+        self.generation = generation
+        self.delta = np.empty(0, dtype=DELTA_DTYPE)
+        self.delta_offset = 0
+        if generation is None:
+            return
+        path = self.root / generation
+
+        def load(name):
+            # Plain ndarray views over the mapping skip np.memmap's per-slice overhead
+            return np.load(path / name, mmap_mode='r').view(np.ndarray)
+
+        self.hashes = load('hashes.npy')
+        self.ids = load('ids.npy')
+        self.keys = [load(f'keys{k}.npy') for k in range(CHUNKS)]
+        self.orders = [load(f'order{k}.npy') for k in range(CHUNKS)]
+
+    def _delta_path(self):
+        return self.root / self.generation / 'delta.bin' if self.generation else None
+
+    def _read_delta(self):
+        path = self._delta_path()
+        if path is None:
+            return
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        size -= size % DELTA_DTYPE.itemsize
+        if size > self.delta_offset:
+            new = np.fromfile(path, dtype=DELTA_DTYPE, offset=self.delta_offset,
+                              count=(size - self.delta_offset) // DELTA_DTYPE.itemsize)
+            self.delta = np.concatenate([self.delta, new])
+            self.delta_offset = size
+
+    # -- queries -----------------------------------------------------------
+
+    def __len__(self):
+        return len(self.hashes) + len(self.delta)
+
+    def search(self, value, radius):
+        """[(result_id, distance)] for stored hashes within `radius` bits of `value`"""
+        self.refresh()
+        query = np.uint64(to_unsigned(value))
+        matches = {}
+
+        if len(self.hashes):
+            masks = _flip_masks(radius // CHUNKS)
+            chunks = _chunks(query)
+            positions = []
+            for k in range(CHUNKS):
+                probes = chunks[k] ^ masks
+                lo = np.searchsorted(self.keys[k], probes, side='left')
+                hi = np.searchsorted(self.keys[k], probes, side='right')
+                positions.append(self.orders[k][_expand(lo, hi)])
+            # A candidate may repeat across chunks; that is cheaper than np.unique
+            candidates = np.concatenate(positions)
+            if len(candidates):
+                distances = np.bitwise_count(self.hashes[candidates] ^ query)
+                for position, distance in zip(candidates[distances <= radius], distances[distances <= radius]):
+                    matches[int(self.ids[position])] = int(distance)
+
+        if len(self.delta):
+            distances = np.bitwise_count(self.delta['hash'] ^ query)
+            for result_id, distance in zip(self.delta['id'][distances <= radius], distances[distances <= radius]):
+                matches[int(result_id)] = min(int(distance), matches.get(int(result_id), 64))
+
+        return sorted(matches.items(), key=lambda item: item[1])
+
+    # -- updates -----------------------------------------------------------
+
+    def add(self, entries):
+        """Append (hash, result_id) pairs to the live generation's delta log"""
+        entries = list(entries)
+        if not entries:
+            return
+        with _locked(self.root):
+            # A build may have swapped generations since our last look
+            self.refresh()
+            if self.generation is None:
+                _build(self.root, [], [])
+                self.refresh()
+            records = np.array(
+                [(to_unsigned(h), result_id) for h, result_id in entries], dtype=DELTA_DTYPE
+            )
+            with open(self._delta_path(), 'ab') as fh:
+                fh.write(records.tobytes())
+        self.refresh()
+
+
+def build(root, hashes, ids):
+    """Write a new generation from scratch and make it current; returns its name"""
+    root = Path(root)
+    with _locked(root):
+        return _build(root, hashes, ids)
+
+
+def _build(root, hashes, ids):
+    existing = [int(p.name[4:]) for p in root.glob('gen-*') if p.name[4:].isdigit()]
+    generation = f'gen-{max(existing, default=0) + 1}'
+    path = root / generation
+    path.mkdir()
+
+    hashes = np.array([to_unsigned(h) for h in hashes], dtype=np.uint64)
+    np.save(path / 'hashes.npy', hashes)
+    np.save(path / 'ids.npy', np.asarray(ids, dtype=np.int64))
+    chunks = _chunks(hashes).reshape(len(hashes), CHUNKS)
+    for k in range(CHUNKS):
+        order = np.argsort(chunks[:, k], kind='stable').astype(np.uint32)
+        np.save(path / f'keys{k}.npy', chunks[order, k])
+        np.save(path / f'order{k}.npy', order)
+    (path / 'delta.bin').touch()
+
+    tmp = root / 'CURRENT.tmp'
+    tmp.write_text(generation)
+    os.replace(tmp, root / 'CURRENT')
+
+    # Keep the previous generation for workers that have not switched yet
+    for number in existing:
+        if number < max(existing):
+            shutil.rmtree(root / f'gen-{number}', ignore_errors=True)
+    return generation
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = HashIndex()
+    return _index
@@ -0,0 +1,274 @@
+"""
+Asynchronous detection jobs.
+
+submit_job() stores the request and returns immediately. If the verdict is
+already cached, the job finishes on the spot. Otherwise it waits in the
+DetectionJob table, where (priority, created_at) order is the priority queue.
+
+`manage.py run_detection_workers` runs a Dispatcher. It claims queued jobs
+with SELECT ... FOR UPDATE SKIP LOCKED, but only as many as it has free
+processes, so interactive jobs are never stuck behind a backlog of bulk ones.
+It then runs them in a ProcessPoolExecutor. Workers report progress to the
+job row and publish it to the live event channel (topic "job:<id>"), where
+GET /api/live/jobs/?id=<id>&access=<jwt> streams it as SSE.
+
+A claimed job holds a lease of LEASE_SECONDS, which its dispatcher renews
+while the job runs. Every dispatcher requeues running jobs whose lease ran
+out (their dispatcher died), up to MAX_ATTEMPTS claims; past that, or when
+a cancel was requested, the job is finished instead.
+"""
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews import live
+
+from . import verdicts
+from .models import DetectionJob
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 0.5
+LEASE_SECONDS = 60
+MAX_ATTEMPTS = 3
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_topic(job_id):
+    return f'job:{job_id}'
+
+
+def job_event(job):
+    return {
+        'id': str(job.id),
+        'status': job.status,
+        'progress': job.progress,
+        'result_id': job.result_id,
+        'error': job.error,
+    }
+
+
+def publish(job):
+    live.publish(job_topic(job.id), 'job', job_event(job))
+
+
+async def job_topics(scope):
+    """SSE route resolver: the job's topic, if the access token owns the job"""
+    query = parse_qs(scope.get('query_string', b'').decode())
+    job_id = query.get('id', [''])[0]
+    try:
+        user_id = AccessToken(query.get('access', [''])[0])['user_id']
+        owned = await sync_to_async(
+            DetectionJob.objects.filter(pk=job_id, user_id=user_id).exists
+        )()
+    except (TokenError, KeyError, ValidationError):
+        owned = False
+    if not owned:
+        raise PermissionError(job_id)
+    return [job_topic(job_id)]
+
+
+def submit_job(user, media=None, url='', priority=DetectionJob.PRIORITY_INTERACTIVE, sha256='',
+               stored_media=''):
+    """
+    Create a job, finishing it immediately when the verdict is cached.
+
+    `stored_media` is the storage name of a file already in place (a finished
+    upload, whose `sha256` the server computed); it is used as the job's media
+    without being copied. A client-supplied `sha256` is checked against
+    `media` (HashMismatch). With nothing to analyse, a bare hash that is not
+    cached, returns None.
+    """
+    sha256 = verdicts.content_hash(media, sha256)
+    if media is not None or stored_media:
+        url = ''
+
+    # Counted here only when settled here; otherwise the job's verify() counts it
+    cached = verdicts.lookup(sha256=sha256, url=url, record=False)
+    if cached is None and media is None and not stored_media and not url:
+        verdicts.record_lookup(False)
+        return None
+    if cached is not None:
+        verdicts.record_lookup(True)
+    job = DetectionJob(user=user, priority=priority, source_url=url or '', content_sha256=sha256 or '')
+    if cached is not None:
+        now = timezone.now()
+        job.status = DetectionJob.DONE
+        job.progress = 1.0
+        job.result = cached
+        job.started_at = job.finished_at = now
+    elif media is not None:
+        job.media = media
+    elif stored_media:
+        job.media.name = stored_media
+    job.save()
+    return job
+
+
+def cancel_job(job):
+    """Cancel a queued job at once, or ask the worker to stop a running one"""
+    if DetectionJob.objects.filter(pk=job.pk, status=DetectionJob.QUEUED).update(
+        status=DetectionJob.CANCELLED, finished_at=timezone.now()
+    ):
+        job.refresh_from_db()
+        publish(job)
+    elif job.status == DetectionJob.RUNNING:
+        DetectionJob.objects.filter(pk=job.pk).update(cancel_requested=True)
+        job.refresh_from_db()
+    return job
+
+
+class ProgressReporter:
+    """Detector progress callback: throttled row updates and cancellation checks"""
+
+    def __init__(self, job):
+        self.job = job
+        self.last = 0
+
+    def __call__(self, fraction):
+        now = time.monotonic()
+        if fraction < 1 and now - self.last < PROGRESS_INTERVAL:
+            return
+        self.last = now
+        self.job.progress = round(min(max(fraction, 0), 1), 3)
+        DetectionJob.objects.filter(pk=self.job.pk).update(progress=self.job.progress)
+        if DetectionJob.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise JobCancelled()
+        publish(self.job)
+
+
+def run_job(job_id):
+    """Run one claimed job; executed inside a pool process"""
+    close_old_connections()
+    job = DetectionJob.objects.get(pk=job_id)
+    try:
+        if job.media:
+            with job.media.open('rb') as fh:
+                result, _ = verdicts.verify(
+                    fileobj=fh, url=job.source_url, sha256=job.content_sha256 or None,
+                    progress=ProgressReporter(job),
+                )
+        else:
+            result, _ = verdicts.verify(
+                url=job.source_url, sha256=job.content_sha256 or None,
+                progress=ProgressReporter(job),
+            )
+        if result is None:
+            raise ValueError('Nothing to analyse: the hash is not cached and there is no media or URL.')
+        job.status, job.result, job.progress = DetectionJob.DONE, result, 1.0
+    except JobCancelled:
+        job.status = DetectionJob.CANCELLED
+    except Exception as e:
+        logger.exception("Detection job %s failed", job_id)
+        job.status, job.error = DetectionJob.FAILED, str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'progress', 'error', 'finished_at'])
+    publish(job)
+    close_old_connections()
+    return job.status
+
+
+def _init_worker():
+    # Connections inherited from the dispatcher must not be shared
+    connections.close_all()
+
+
+class Dispatcher:
+    def __init__(self, processes=2, poll_interval=0.5):
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.running = {}
+        self.renewed_at = 0
+
+    def claim(self, limit):
+        with transaction.atomic():
+            jobs = list(
+                DetectionJob.objects.select_for_update(skip_locked=True)
+                .filter(status=DetectionJob.QUEUED)
+                .order_by('priority', 'created_at')[:limit]
+            )
+            ids = [job.pk for job in jobs]
+            now = timezone.now()
+            DetectionJob.objects.filter(pk__in=ids).update(
+                status=DetectionJob.RUNNING, started_at=now,
+                lease_expires_at=now + timedelta(seconds=LEASE_SECONDS), attempts=F('attempts') + 1,
+            )
+        for job in jobs:
+            job.status = DetectionJob.RUNNING
+            publish(job)
+        return ids
+
+    def renew_leases(self):
+        """Extend the leases of our running jobs and requeue orphaned ones"""
+        now = timezone.now()
+        if self.running:
+            DetectionJob.objects.filter(pk__in=list(self.running), status=DetectionJob.RUNNING).update(
+                lease_expires_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+
+        expired = DetectionJob.objects.filter(
+            Q(lease_expires_at__lt=now) | Q(lease_expires_at__isnull=True), status=DetectionJob.RUNNING,
+        ).exclude(pk__in=list(self.running))
+        finished = {
+            DetectionJob.CANCELLED: expired.filter(cancel_requested=True),
+            DetectionJob.FAILED: expired.filter(attempts__gte=MAX_ATTEMPTS),
+        }
+        for status, jobs in finished.items():
+            for job in jobs:
+                job.status, job.finished_at, job.lease_expires_at = status, now, None
+                if status == DetectionJob.FAILED:
+                    job.error = f'Worker lost {job.attempts} times'
+                job.save(update_fields=['status', 'finished_at', 'lease_expires_at', 'error'])
+                publish(job)
+                logger.warning("Job %s abandoned by its worker: %s", job.pk, status)
+        requeued = expired.update(
+            status=DetectionJob.QUEUED, started_at=None, progress=0, lease_expires_at=None
+        )
+        if requeued:
+            logger.warning("Requeued %s jobs whose worker lease expired", requeued)
+
+    def run(self, once=False):
+        connections.close_all()
+        # Workers rely on inheriting the dispatcher's configured Django; spawn and
+        # forkserver (the macOS and Python 3.14 defaults) would start them bare
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=context,
+                                 initializer=_init_worker) as pool:
+            while True:
+                for job_id, future in list(self.running.items()):
+                    if future.done():
+                        del self.running[job_id]
+                        if future.exception():
+                            logger.error("Worker crashed on job %s: %s", job_id, future.exception())
+                            DetectionJob.objects.filter(pk=job_id, status=DetectionJob.RUNNING).update(
+                                status=DetectionJob.FAILED, error=str(future.exception()),
+                                finished_at=timezone.now(),
+                            )
+
+                if time.monotonic() - self.renewed_at >= LEASE_SECONDS / 3:
+                    self.renew_leases()
+                    self.renewed_at = time.monotonic()
+
+                free = self.processes - len(self.running)
+                claimed = self.claim(free) if free else []
+                for job_id in claimed:
+                    self.running[job_id] = pool.submit(run_job, job_id)
+
+                if once and not self.running and not claimed:
+                    return
+                if not claimed:
+                    time.sleep(self.poll_interval)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from verification.uploads import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete resumable uploads that expired before completing, with their partial files"
+
+    def handle(self, *args, **options):
+        count = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} expired uploads"))
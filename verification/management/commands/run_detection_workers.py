@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from verification.jobs import Dispatcher
+
+
+class Command(BaseCommand):
+    help = "Run queued detection jobs on a process pool, highest priority first"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int,
+            default=getattr(settings, 'VERIFICATION', {}).get('WORKERS', 2),
+        )
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Starting detection workers ({options['processes']} processes)")
+        Dispatcher(processes=options['processes']).run(once=options['once'])
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_sha256', models.CharField(blank=True, max_length=64)),
+                ('source_url', models.URLField(blank=True, max_length=2000)),
+                ('source_url_hash', models.CharField(blank=True, max_length=64)),
+                ('verdict', models.CharField(choices=[('real', 'Real'), ('fake', 'Fake'), ('uncertain', 'Uncertain')], max_length=10)),
+                ('confidence', models.FloatField()),
+                ('model_version', models.CharField(max_length=50)),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['content_sha256', 'model_version', 'expires_at'], name='verificatio_content_a43a64_idx'), models.Index(fields=['source_url_hash', 'model_version', 'expires_at'], name='verificatio_source__568bed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('verification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frame_index', models.PositiveIntegerField(default=0)),
+                ('phash', models.BigIntegerField()),
+                ('dhash', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='verification.verificationresult')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def relabel_prefilter_verdicts(apps, schema_editor):
+    # Pre-check verdicts were stored as detector results; take them out of the cache
+    VerificationResult = apps.get_model('verification', 'VerificationResult')
+    VerificationResult.objects.filter(details__has_key='prefilter').update(model_version='prefilter')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('verification', '0005_detectionjob_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(relabel_prefilter_verdicts, migrations.RunPython.noop),
+    ]
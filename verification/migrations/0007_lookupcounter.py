@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('verification', '0006_prefilter_verdicts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LookupCounter',
+            fields=[
+                ('name', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,133 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class VerificationResult(models.Model):
+    """Cached deepfake verdict, keyed by content hash and/or source URL"""
+    REAL = 'real'
+    FAKE = 'fake'
+    UNCERTAIN = 'uncertain'
+    VERDICT_CHOICES = [(REAL, 'Real'), (FAKE, 'Fake'), (UNCERTAIN, 'Uncertain')]
+
+    content_sha256 = models.CharField(max_length=64, blank=True)
+    source_url = models.URLField(max_length=2000, blank=True)
+    # URLs are too long to index on MySQL, so lookups go through their hash
+    source_url_hash = models.CharField(max_length=64, blank=True)
+    verdict = models.CharField(max_length=10, choices=VERDICT_CHOICES)
+    confidence = models.FloatField()
+    model_version = models.CharField(max_length=50)
+    details = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['content_sha256', 'model_version', 'expires_at']),
+            models.Index(fields=['source_url_hash', 'model_version', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.verdict} ({self.confidence:.2f}) - {self.content_sha256[:12] or self.source_url[:40]}"
+
+
+class MediaFingerprint(models.Model):
+    """Perceptual hashes of an image or sampled frame (see phash.py / hashindex.py)"""
+    result = models.ForeignKey(VerificationResult, on_delete=models.CASCADE, related_name='fingerprints')
+    frame_index = models.PositiveIntegerField(default=0)
+    phash = models.BigIntegerField()
+    dhash = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.phash & 0xFFFFFFFFFFFFFFFF:016x} (frame {self.frame_index})"
+
+
+class LookupCounter(models.Model):
+    """Verdict cache hits or misses, shared by every process (see verdicts.stats)"""
+    name = models.CharField(max_length=10, primary_key=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.count}"
+
+
+class DetectionJob(models.Model):
+    """An asynchronous verification request, run by manage.py run_detection_workers"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'),
+        (FAILED, 'Failed'), (CANCELLED, 'Cancelled'),
+    ]
+    FINISHED = (DONE, FAILED, CANCELLED)
+
+    # Lower runs first: extension checks go ahead of bulk rescans
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BULK = 10
+    PRIORITIES = {'interactive': PRIORITY_INTERACTIVE, 'bulk': PRIORITY_BULK}
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='detection_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.PositiveSmallIntegerField(default=PRIORITY_INTERACTIVE)
+    source_url = models.URLField(max_length=2000, blank=True)
+    media = models.FileField(upload_to='verification/jobs/', max_length=255, blank=True)
+    content_sha256 = models.CharField(max_length=64, blank=True)
+    progress = models.FloatField(default=0)
+    cancel_requested = models.BooleanField(default=False)
+    result = models.ForeignKey(VerificationResult, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Renewed by the dispatcher while the job runs; expired leases are requeued
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'created_at']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """A resumable upload of large media, assembled on disk (see uploads.py)"""
+    UPLOADING = 'uploading'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(UPLOADING, 'Uploading'), (COMPLETE, 'Complete'), (FAILED, 'Failed')]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255, blank=True)
+    # Storage name of the file being assembled; becomes the job's media as is
+    path = models.CharField(max_length=255)
+    length = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    # Running CRC-32 of the bytes received so far, and the client's expected total
+    crc32 = models.BigIntegerField(default=0)
+    expected_crc32 = models.BigIntegerField(null=True, blank=True)
+    priority = models.PositiveSmallIntegerField(default=DetectionJob.PRIORITY_INTERACTIVE)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=UPLOADING)
+    job = models.OneToOneField(DetectionJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.offset}/{self.length})"
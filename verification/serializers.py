@@ -0,0 +1,74 @@
+from rest_framework import serializers
+from .models import DetectionJob, VerificationResult
+
+
+class VerificationResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VerificationResult
+        fields = ['id', 'content_sha256', 'source_url', 'verdict', 'confidence',
+                  'model_version', 'details', 'created_at', 'expires_at']
+        read_only_fields = fields
+
+
+class VerificationRequestSerializer(serializers.Serializer):
+    """A media item to verify: the file itself, its SHA-256, its URL, or several"""
+    media = serializers.FileField(required=False)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+    url = serializers.URLField(max_length=2000, required=False)
+
+    def validate(self, data):
+        if not any(data.get(key) for key in ('media', 'sha256', 'url')):
+            raise serializers.ValidationError("Provide media, sha256 or url.")
+        return data
+
+
+class DetectionJobSerializer(serializers.ModelSerializer):
+    result = VerificationResultSerializer(read_only=True)
+
+    class Meta:
+        model = DetectionJob
+        fields = ['id', 'status', 'priority', 'source_url', 'content_sha256', 'progress',
+                  'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class DetectionJobRequestSerializer(VerificationRequestSerializer):
+    priority = serializers.ChoiceField(choices=list(DetectionJob.PRIORITIES), default='interactive')
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """
+    One media reference in a batch. `file` names a multipart part holding the
+    upload; width, height and bytes are what the page already knows about it.
+    """
+    id = serializers.CharField(max_length=200)
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)
+    url = serializers.URLField(max_length=2000, required=False)
+    file = serializers.CharField(max_length=100, required=False)
+    width = serializers.IntegerField(min_value=0, required=False)
+    height = serializers.IntegerField(min_value=0, required=False)
+    bytes = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, data):
+        name = data.pop('file', None)
+        if name:
+            files = self.context.get('files', {})
+            if name not in files:
+                raise serializers.ValidationError({'file': f'No uploaded file named "{name}".'})
+            data['media'] = files[name]
+        if not any(data.get(key) for key in ('media', 'sha256', 'url')):
+            raise serializers.ValidationError("Provide file, sha256 or url.")
+        return data
+
+
+class BatchVerificationSerializer(serializers.Serializer):
+    items = BatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        limit = self.context.get('max_items')
+        if limit and len(items) > limit:
+            raise serializers.ValidationError(f"At most {limit} items per batch.")
+        ids = [item['id'] for item in items]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Item ids must be unique.")
+        return items
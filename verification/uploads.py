@@ -0,0 +1,268 @@
+"""
+Resumable uploads for media too large for a single request.
+
+The protocol is the core of tus 1.0 (https://tus.io/protocols/resumable-upload)
+with its creation, checksum, termination and expiration extensions:
+
+    POST   uploads/       Upload-Length, Upload-Metadata   -> 201, Location
+    HEAD   uploads/<id>/  -> Upload-Offset, the byte to resume from
+    PATCH  uploads/<id>/  Upload-Offset, the next bytes as the body
+    DELETE uploads/<id>/  abandon the upload
+
+Each PATCH body is streamed from the socket to a temporary file and then
+appended to a file under MEDIA_ROOT, so neither memory nor
+DATA_UPLOAD_MAX_MEMORY_SIZE bounds the media size. A PATCH may carry Upload-Checksum ("<algorithm> <base64
+digest>") for its own bytes; on a mismatch the chunk is dropped. Bytes of a
+chunk cut off by a disconnect are kept, and HEAD tells the client where to
+pick up. The session also keeps a running CRC-32 of every byte received
+(Upload-CRC32 on each response). If the client declared the expected total
+in the "crc32" metadata key, the two are compared when the last byte lands.
+
+The finished file becomes a DetectionJob's media where it lies. It is
+hashed by streaming it from disk, before the session row is locked, and is
+never copied or read back whole.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from . import jobs, verdicts
+from .models import DetectionJob, UploadSession
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,checksum,termination,expiration'
+CHECKSUM_ALGORITHMS = ('crc32', 'md5', 'sha1', 'sha256')
+UPLOAD_DIR = 'verification/uploads'
+READ_SIZE = 256 * 1024
+
+DEFAULT_MAX_SIZE = 2 * 1024 ** 3
+DEFAULT_TTL = timedelta(days=1)
+
+
+class UploadError(Exception):
+    """A request the upload cannot accept; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_setting(name, default):
+    return getattr(settings, 'VERIFICATION', {}).get(name, default)
+
+
+def max_size():
+    return get_setting('UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+def parse_metadata(header):
+    """Upload-Metadata: comma-separated "key base64(value)" pairs"""
+    metadata = {}
+    for pair in filter(None, (part.strip() for part in (header or '').split(','))):
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode() if value else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Invalid Upload-Metadata value for "{key}".')
+    return metadata
+
+
+def parse_checksum(header):
+    """Upload-Checksum -> (hash object, expected digest), or (None, None)"""
+    if not header:
+        return None, None
+    algorithm, _, value = header.strip().partition(' ')
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(f'Unsupported checksum algorithm "{algorithm}".')
+    try:
+        expected = base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise UploadError('Invalid Upload-Checksum digest.')
+    return (_Crc32() if algorithm == 'crc32' else hashlib.new(algorithm)), expected
+
+
+class _Crc32:
+    """hashlib-style wrapper so CRC-32 chunk checksums share the code path"""
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def digest(self):
+        return self.value.to_bytes(4, 'big')
+
+
+def clean_filename(name):
+    try:
+        return get_valid_filename(os.path.basename(name))[:255]
+    except SuspiciousFileOperation:
+        return ''
+
+
+def file_path(session):
+    return default_storage.path(session.path)
+
+
+def create_session(user, length, metadata):
+    if length < 0:
+        raise UploadError('Upload-Length must not be negative.')
+    if length > max_size():
+        raise UploadError(f'Uploads are limited to {max_size()} bytes.', status=413)
+
+    expected_crc32 = None
+    if metadata.get('crc32'):
+        try:
+            expected_crc32 = int(metadata['crc32'], 16)
+        except ValueError:
+            raise UploadError('The crc32 metadata value must be hexadecimal.')
+    priority = metadata.get('priority', 'interactive')
+    if priority not in DetectionJob.PRIORITIES:
+        raise UploadError(f'Unknown priority "{priority}".')
+
+    filename = clean_filename(metadata.get('filename', ''))
+    session = UploadSession(
+        user=user,
+        filename=filename,
+        length=length,
+        expected_crc32=expected_crc32,
+        priority=DetectionJob.PRIORITIES[priority],
+        expires_at=timezone.now() + get_setting('UPLOAD_TTL', DEFAULT_TTL),
+    )
+    extension = os.path.splitext(filename)[1][:10].lower()
+    session.path = f'{UPLOAD_DIR}/{session.id}{extension}'
+    path = file_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    session.save()
+    return session
+
+
+def _check(session, offset, length):
+    if session.status != UploadSession.UPLOADING:
+        raise UploadError(f'Upload is {session.status}.', status=409)
+    if session.expires_at <= timezone.now():
+        raise UploadError('Upload has expired.', status=410)
+    if offset != session.offset:
+        raise UploadError(f'Upload-Offset must be {session.offset}.', status=409)
+    if offset + length > session.length:
+        raise UploadError('Chunk runs past Upload-Length.', status=413)
+
+
+def append(session, offset, stream, length, checksum=None):
+    """
+    Write up to `length` bytes from `stream` at `offset` and advance the
+    session. Finishes the upload when its last byte arrives.
+
+    The body is spooled to an anonymous temporary file first, so the
+    session row is only locked to re-check the offset and append the chunk,
+    not while a slow client sends it.
+    """
+    digest, expected = parse_checksum(checksum)
+    session = UploadSession.objects.get(pk=session.pk)
+    _check(session, offset, length)
+
+    path = file_path(session)
+    # The CRC so far is fixed by the offset, which is re-checked under the lock
+    crc, written = session.crc32, 0
+    with tempfile.TemporaryFile(dir=os.path.dirname(path)) as chunk:
+        while written < length:
+            try:
+                data = stream.read(min(READ_SIZE, length - written)) if stream else b''
+            except OSError:
+                break  # client went away; keep what arrived
+            if not data:
+                break
+            chunk.write(data)
+            crc = zlib.crc32(data, crc)
+            if digest is not None:
+                digest.update(data)
+            written += len(data)
+
+        if digest is not None and (written != length or digest.digest() != expected):
+            raise UploadError('Checksum mismatch.', status=460)
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            _check(session, offset, length)
+            chunk.seek(0)
+            with open(path, 'r+b') as fh:
+                # Anything past the recorded offset is left over from a failed write
+                fh.seek(offset)
+                fh.truncate()
+                shutil.copyfileobj(chunk, fh, READ_SIZE)
+            session.offset += written
+            session.crc32 = crc
+            session.save(update_fields=['offset', 'crc32', 'updated_at'])
+
+    if session.offset == session.length:
+        session = finish(session)
+    return session
+
+
+def finish(session):
+    """
+    Check the whole-file CRC and hand the file to the detection queue.
+
+    The file is complete once offset reaches length, so no append can
+    change it: it is hashed before the session row is locked, and the lock
+    only re-checks the status.
+    """
+    session = UploadSession.objects.get(pk=session.pk)
+    if session.status != UploadSession.UPLOADING or session.offset != session.length:
+        return session
+    with default_storage.open(session.path, 'rb') as fh:
+        sha256 = verdicts.hash_file(fh)
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != UploadSession.UPLOADING:
+            return session
+
+        if session.expected_crc32 is not None and session.expected_crc32 != session.crc32:
+            session.status = UploadSession.FAILED
+            session.save(update_fields=['status', 'updated_at'])
+            default_storage.delete(session.path)
+            return session
+
+        job = jobs.submit_job(session.user, sha256=sha256, priority=session.priority,
+                              stored_media=session.path)
+        if not job.media:
+            # Cached verdict: the bytes are not needed
+            default_storage.delete(session.path)
+
+        session.status = UploadSession.COMPLETE
+        session.job = job
+        session.save(update_fields=['status', 'job', 'updated_at'])
+    return session
+
+
+def terminate(session):
+    default_storage.delete(session.path)
+    session.delete()
+
+
+def purge_expired(now=None):
+    """Delete unfinished uploads past their expiry and their partial files"""
+    expired = UploadSession.objects.filter(
+        expires_at__lte=now or timezone.now(),
+    ).exclude(status=UploadSession.COMPLETE)
+    count = 0
+    for session in expired.iterator():
+        terminate(session)
+        count += 1
+    return count
@@ -0,0 +1,16 @@
+from django.urls import path
+from . import views
+
+app_name = 'verification'
+
+urlpatterns = [
+    path('lookup/', views.lookup_verdict, name='lookup'),
+    path('verify/', views.verify_media, name='verify'),
+    path('verify/batch/', views.verify_batch, name='verify-batch'),
+    path('uploads/', views.media_uploads, name='uploads'),
+    path('uploads/<uuid:upload_id>/', views.media_upload_detail, name='upload-detail'),
+    path('stats/', views.verification_stats, name='stats'),
+    path('jobs/', views.detection_jobs, name='jobs'),
+    path('jobs/<uuid:job_id>/', views.detection_job_detail, name='job-detail'),
+    path('jobs/<uuid:job_id>/cancel/', views.cancel_detection_job, name='job-cancel'),
+]
@@ -0,0 +1,258 @@
+"""
+Verdict cache for verification requests.
+
+Results are stored once per (content hash, model version) and looked up with
+a single indexed read. A result stops being served once it passes its
+expires_at or when the detector's model_version changes. Hit and miss
+counters are LookupCounter rows, so every process adds to the same totals;
+only misses reach the detector, and a reused near-duplicate verdict counts
+as a hit.
+
+Uploaded images are also fingerprinted with perceptual hashes, so a
+re-encoded or resized copy of already analysed media reuses its verdict.
+
+A client-supplied sha256 is only ever a lookup key. Verdicts are stored
+under the hash of the bytes the detector actually saw, an uploaded file's
+verdict is never stored under a URL, and a bare hash that misses the cache
+is not analysed.
+"""
+import hashlib
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models import Q
+from django.utils import timezone
+
+from . import phash
+from .detectors import Detection, get_detector
+from .hashindex import get_index, to_signed
+from .models import LookupCounter, MediaFingerprint, VerificationResult
+
+DEFAULT_TTL = timedelta(days=7)
+DEFAULT_PHASH_RADIUS = 6
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'igshid', 'mc_cid', 'mc_eid', 'ref_src')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def result_ttl():
+    return getattr(settings, 'VERIFICATION', {}).get('TTL', DEFAULT_TTL)
+
+
+def phash_radius():
+    return getattr(settings, 'VERIFICATION', {}).get('PHASH_RADIUS', DEFAULT_PHASH_RADIUS)
+
+
+def current_model_version():
+    return get_detector().model_version
+
+
+def normalize_url(url):
+    """Canonical form of a media URL: lower-cased host, no fragment or tracking params"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def hash_url(url):
+    return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+
+def hash_file(fileobj, chunk_size=1024 * 1024):
+    """SHA-256 of a file object (or Django UploadedFile) without loading it whole"""
+    digest = hashlib.sha256()
+    if hasattr(fileobj, 'chunks'):
+        chunks = fileobj.chunks(chunk_size)
+    else:
+        chunks = iter(lambda: fileobj.read(chunk_size), b'')
+    for chunk in chunks:
+        digest.update(chunk)
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+    return digest.hexdigest()
+
+
+class HashMismatch(ValueError):
+    pass
+
+
+def content_hash(fileobj=None, sha256=None):
+    """
+    The hash of `fileobj`, checked against a client-supplied `sha256`;
+    without a file, just `sha256` (unverified, for lookups only)
+    """
+    if fileobj is None:
+        return (sha256 or '').lower()
+    actual = hash_file(fileobj)
+    if sha256 and sha256.lower() != actual:
+        raise HashMismatch('sha256 does not match the uploaded file.')
+    return actual
+
+
+def record_lookup(hit, count=1):
+    if not count:
+        return
+    name = 'hits' if hit else 'misses'
+    counter = LookupCounter.objects.filter(name=name)
+    if counter.update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic():
+            LookupCounter.objects.create(name=name, count=count)
+    except IntegrityError:
+        # Another process created it first
+        counter.update(count=F('count') + count)
+
+
+def stats():
+    counts = dict(LookupCounter.objects.values_list('name', 'count'))
+    hits, misses = counts.get('hits', 0), counts.get('misses', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def lookup(sha256=None, url=None, record=True):
+    """
+    Return the live cached result for a content hash or URL (either
+    matching), or None; counted as a hit or miss unless `record` is False
+    """
+    condition = Q()
+    if sha256:
+        condition |= Q(content_sha256=sha256.lower())
+    if url:
+        condition |= Q(source_url_hash=hash_url(url))
+    if not condition:
+        return None
+
+    result = VerificationResult.objects.filter(
+        condition,
+        model_version=current_model_version(),
+        expires_at__gt=timezone.now(),
+    ).order_by('created_at').first()
+    if record:
+        record_lookup(result is not None)
+    return result
+
+
+def store(detection, sha256='', url='', model_version=None):
+    """Save a verdict; one under another `model_version` is never served by lookup()"""
+    now = timezone.now()
+    return VerificationResult.objects.create(
+        content_sha256=(sha256 or '').lower(),
+        source_url=normalize_url(url) if url else '',
+        source_url_hash=hash_url(url) if url else '',
+        verdict=detection.verdict,
+        confidence=detection.confidence,
+        model_version=model_version or current_model_version(),
+        details=detection.details,
+        expires_at=now + result_ttl(),
+    )
+
+
+def find_near_duplicates(fingerprint_lists):
+    """
+    For each list of fingerprints, the best live result within PHASH_RADIUS
+    bits and its distance, or (None, None). One query covers all the lists.
+    """
+    index = get_index()
+    per_item = []
+    for fingerprints in fingerprint_lists:
+        distances = {}
+        for _, value, _ in fingerprints:
+            for result_id, distance in index.search(value, phash_radius()):
+                distances[result_id] = min(distance, distances.get(result_id, 64))
+        per_item.append(distances)
+
+    candidate_ids = set().union(*per_item)
+    live = {}
+    if candidate_ids:
+        live = {
+            result.pk: result for result in VerificationResult.objects.filter(
+                id__in=candidate_ids,
+                model_version=current_model_version(),
+                expires_at__gt=timezone.now(),
+            )
+        }
+
+    matches = []
+    for distances in per_item:
+        best = min((pk for pk in distances if pk in live), key=distances.get, default=None)
+        matches.append((live[best], distances[best]) if best is not None else (None, None))
+    return matches
+
+
+def find_near_duplicate(fingerprints):
+    """Best live result whose fingerprint is within PHASH_RADIUS bits, with its distance"""
+    return find_near_duplicates([fingerprints])[0]
+
+
+def reuse_verdict(original, distance, fingerprints, sha256='', url=''):
+    """Store a near-identical item's verdict for this content"""
+    detection = Detection(
+        verdict=original.verdict,
+        confidence=original.confidence,
+        details=dict(original.details, near_duplicate_of=original.pk, distance=distance),
+    )
+    result = store(detection, sha256=sha256, url=url)
+    save_fingerprints(result, fingerprints)
+    return result
+
+
+def save_fingerprints(result, fingerprints):
+    MediaFingerprint.objects.bulk_create([
+        MediaFingerprint(result=result, frame_index=frame, phash=to_signed(p), dhash=to_signed(d))
+        for frame, p, d in fingerprints
+    ])
+    entries = [(p, result.pk) for _, p, _ in fingerprints]
+    transaction.on_commit(lambda: get_index().add(entries))
+
+
+def verify(fileobj=None, url=None, sha256=None, progress=None):
+    """
+    Return (result, cached) for a media item, or (None, False) for a bare
+    sha256 that is not cached.
+
+    With `fileobj`, its hash is computed (HashMismatch if `sha256` disagrees)
+    and `url` is ignored. Only a cache miss runs the detector. Before that, an
+    uploaded image is compared with the perceptual hash index and a
+    near-identical item's verdict is reused.
+    """
+    sha256 = content_hash(fileobj, sha256)
+    if fileobj is not None:
+        url = None
+    result = lookup(sha256=sha256, url=url, record=False)
+    if result is not None:
+        record_lookup(True)
+        return result, True
+    if fileobj is None:
+        if not url:
+            record_lookup(False)
+            return None, False
+        # Unverified: what the URL serves decides the verdict
+        sha256 = ''
+
+    fingerprints = phash.hash_media(fileobj) if fileobj is not None else []
+    if fingerprints:
+        original, distance = find_near_duplicate(fingerprints)
+        if original is not None:
+            record_lookup(True)
+            return reuse_verdict(original, distance, fingerprints, sha256=sha256, url=url), True
+
+    record_lookup(False)
+    detection = get_detector().detect(sha256=sha256, url=url, fileobj=fileobj, progress=progress)
+    result = store(detection, sha256=sha256, url=url)
+    save_fingerprints(result, fingerprints)
+    return result, False
@@ -0,0 +1,257 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import http_date
+import json
+import logging
+from . import batch, jobs, uploads, verdicts
+from .models import DetectionJob, UploadSession
+from .serializers import (
+    BatchVerificationSerializer, DetectionJobRequestSerializer, DetectionJobSerializer,
+    VerificationRequestSerializer, VerificationResultSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def lookup_verdict(request):
+    """Return a cached verdict by sha256 or url without running the detector"""
+    params = request.data if request.method == 'POST' else request.query_params
+    serializer = VerificationRequestSerializer(data={
+        key: params[key] for key in ('sha256', 'url') if params.get(key)
+    })
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = verdicts.lookup(**serializer.validated_data)
+    if result is None:
+        return Response({'cached': False}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'cached': True,
+        'result': VerificationResultSerializer(result).data
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser, JSONParser])
+def verify_media(request):
+    """Verify an uploaded file or URL, analysing it only on a cache miss"""
+    serializer = VerificationRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    try:
+        result, cached = verdicts.verify(
+            fileobj=data.get('media'),
+            url=data.get('url'),
+            sha256=data.get('sha256'),
+        )
+    except verdicts.HashMismatch as e:
+        return Response({'sha256': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+    if result is None:
+        # A bare hash is a lookup: there is nothing to analyse
+        return Response({'cached': False}, status=status.HTTP_404_NOT_FOUND)
+    logger.info("Verification %s for %s", 'hit' if cached else 'miss', result.content_sha256 or result.source_url)
+    
+    return Response({
+        'cached': cached,
+        'result': VerificationResultSerializer(result).data
+    }, status=status.HTTP_200_OK if cached else status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, MultiPartParser, FormParser])
+def verify_batch(request):
+    """
+    Verify a page worth of media in one round trip.
+    
+    Takes {"items": [...]} as JSON, or as a multipart field next to the
+    uploads the items name. Streams NDJSON per-item results. Under ASGI,
+    ?wait=<seconds> bounds how long queued items are followed; under WSGI
+    they are not, so no worker thread waits on them: poll jobs/<id>/.
+    """
+    items = request.data.get('items')
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except ValueError:
+            return Response({'items': ['Invalid JSON.']}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = BatchVerificationSerializer(
+        data={'items': items},
+        context={'files': request.FILES, 'max_items': batch.max_items()}
+    )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    max_wait = batch.get_setting('BATCH_WAIT_SECONDS', batch.DEFAULT_WAIT_SECONDS)
+    try:
+        wait = min(max(float(request.query_params.get('wait', max_wait)), 0), max_wait)
+    except ValueError:
+        wait = max_wait
+    
+    try:
+        prepared = batch.prepare(request.user, serializer.validated_data['items'])
+    except verdicts.HashMismatch as e:
+        return Response({'items': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+    if isinstance(request._request, ASGIRequest):
+        content = batch.astream(prepared, wait)
+    else:
+        content = batch.stream(prepared)
+    response = StreamingHttpResponse(content, content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def verification_stats(request):
+    """Verdict cache hit-rate counters"""
+    return Response(verdicts.stats())
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser, JSONParser])
+def detection_jobs(request):
+    """List the user's detection jobs, or submit one and get its id back at once"""
+    if request.method == 'GET':
+        qs = DetectionJob.objects.filter(user=request.user).select_related('result')
+        serializer = DetectionJobSerializer(qs[:100], many=True)
+        return Response(serializer.data)
+    
+    serializer = DetectionJobRequestSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    try:
+        job = jobs.submit_job(
+            request.user,
+            media=data.get('media'),
+            url=data.get('url', ''),
+            sha256=data.get('sha256', ''),
+            priority=DetectionJob.PRIORITIES[data['priority']],
+        )
+    except verdicts.HashMismatch as e:
+        return Response({'sha256': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+    if job is None:
+        return Response({'cached': False}, status=status.HTTP_404_NOT_FOUND)
+    return Response(
+        DetectionJobSerializer(job).data,
+        status=status.HTTP_200_OK if job.status == DetectionJob.DONE else status.HTTP_202_ACCEPTED
+    )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def detection_job_detail(request, job_id):
+    """Poll a detection job"""
+    job = get_object_or_404(DetectionJob.objects.select_related('result'), pk=job_id, user=request.user)
+    return Response(DetectionJobSerializer(job).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def cancel_detection_job(request, job_id):
+    """Cancel a queued or running detection job"""
+    job = get_object_or_404(DetectionJob, pk=job_id, user=request.user)
+    if job.status in DetectionJob.FINISHED:
+        return Response({
+            'error': f'Job is already {job.status}'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    job = jobs.cancel_job(job)
+    return Response(DetectionJobSerializer(job).data)
+
+
+def _tus_response(session=None, data=None, status=status.HTTP_204_NO_CONTENT):
+    response = Response(data, status=status)
+    response['Tus-Resumable'] = uploads.TUS_VERSION
+    response['Cache-Control'] = 'no-store'
+    if session is not None:
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.length)
+        response['Upload-CRC32'] = f'{session.crc32:08x}'
+        response['Upload-Expires'] = http_date(session.expires_at.timestamp())
+    return response
+
+def _upload_state(session):
+    return {
+        'id': str(session.id),
+        'status': session.status,
+        'offset': session.offset,
+        'length': session.length,
+        'crc32': f'{session.crc32:08x}',
+        'job': DetectionJobSerializer(session.job).data if session.job else None,
+    }
+
+@api_view(['OPTIONS', 'POST'])
+@permission_classes([IsAuthenticated])
+def media_uploads(request):
+    """Start a resumable (tus) upload of large media for verification"""
+    if request.method == 'OPTIONS':
+        response = _tus_response()
+        response['Tus-Version'] = uploads.TUS_VERSION
+        response['Tus-Extension'] = uploads.TUS_EXTENSIONS
+        response['Tus-Max-Size'] = str(uploads.max_size())
+        response['Tus-Checksum-Algorithm'] = ','.join(uploads.CHECKSUM_ALGORITHMS)
+        return response
+    
+    try:
+        length = int(request.headers['Upload-Length'])
+        session = uploads.create_session(
+            request.user, length, uploads.parse_metadata(request.headers.get('Upload-Metadata'))
+        )
+    except (KeyError, ValueError):
+        return _tus_response(data={'error': 'Upload-Length header is required'},
+                             status=status.HTTP_400_BAD_REQUEST)
+    except uploads.UploadError as e:
+        return _tus_response(data={'error': str(e)}, status=e.status)
+    
+    response = _tus_response(session, _upload_state(session), status=status.HTTP_201_CREATED)
+    response['Location'] = request.build_absolute_uri(
+        reverse('verification:upload-detail', args=[session.id])
+    )
+    return response
+
+@api_view(['HEAD', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def media_upload_detail(request, upload_id):
+    """Resume point (HEAD), next chunk (PATCH) or cancellation (DELETE) of an upload"""
+    session = get_object_or_404(UploadSession.objects.select_related('job'), pk=upload_id, user=request.user)
+    
+    if request.method == 'HEAD':
+        return _tus_response(session, status=status.HTTP_200_OK)
+    
+    if request.method == 'DELETE':
+        uploads.terminate(session)
+        return _tus_response()
+    
+    if request.content_type != 'application/offset+octet-stream':
+        return _tus_response(data={'error': 'Content-Type must be application/offset+octet-stream'},
+                             status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.headers.get('Content-Length') or 0)
+    except (KeyError, ValueError):
+        return _tus_response(data={'error': 'Upload-Offset header is required'},
+                             status=status.HTTP_400_BAD_REQUEST)
+    try:
+        session = uploads.append(session, offset, request.stream, length,
+                                 checksum=request.headers.get('Upload-Checksum'))
+    except uploads.UploadError as e:
+        session.refresh_from_db()
+        return _tus_response(session, {'error': str(e)}, status=e.status)
+    
+    if session.status == UploadSession.FAILED:
+        return _tus_response(session, {'error': 'CRC-32 of the assembled file does not match'}, status=460)
+    if session.status == UploadSession.COMPLETE:
+        return _tus_response(session, _upload_state(session), status=status.HTTP_200_OK)
+    return _tus_response(session)